@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Faculty-scholar interest affinity, stored as dense matrices instead of nested dictionaries.
+Rows are faculty and columns are scholars; each email is mapped to a row/column id once.
+The scholar-major views (SF) are transposes of the faculty-major matrices (FS), not copies.
+"""
+
+import numpy as np
+
+# interests are ranked 0,1,2 in registration; a match is weighted by (4-facRank)*(4-scholRank)
+RANKWEIGHT = 4
+
+
+class AffinityMatrix:
+    def __init__(self, facIDs, scholIDs, inUni, backup):
+        self.facIDs = facIDs  # row id -> faculty email
+        self.scholIDs = scholIDs  # column id -> scholar email
+        self.facIndex = {email: i for i, email in enumerate(facIDs)}  # faculty email -> row id
+        self.scholIndex = {email: j for j, email in enumerate(scholIDs)}  # scholar email -> column id
+        self.inUni = inUni  # restricted to faculty at universities the scholar is interested in
+        self.backup = backup  # restricted to faculty at universities that the scholar is not interested in
+
+    # faculty-major (FS) and scholar-major (SF) views of the same data
+    @property
+    def FS(self):
+        return self.inUni
+
+    @property
+    def SF(self):
+        return self.inUni.T
+
+    @property
+    def FSbk(self):
+        return self.backup
+
+    @property
+    def SFbk(self):
+        return self.backup.T
+
+    def score(self, fac, schol, backup=False):
+        mat = self.backup if backup else self.inUni
+        return int(mat[self.facIndex[fac], self.scholIndex[schol]])
+
+    # order faculty for a scholar (or scholars for a faculty) by decreasing affinity; ties keep registration order
+    def ranked_faculty(self, schol, backup=False):
+        row = (self.SFbk if backup else self.SF)[self.scholIndex[schol]]
+        return [self.facIDs[i] for i in np.argsort(-row, kind="stable")]
+
+    def ranked_scholars(self, fac, backup=False):
+        row = (self.FSbk if backup else self.FS)[self.facIndex[fac]]
+        return [self.scholIDs[j] for j in np.argsort(-row, kind="stable")]
+
+    def candidate_index(self, facCancel):
+        return CandidateIndex(self, facCancel)
+
+
+# Ranked candidate lists for every person, built once before scheduling since scores never change.
+# Zero-score pairs and cancelled faculty are dropped, so the fill passes only walk real candidates.
+class CandidateIndex:
+    def __init__(self, affinity, facCancel):
+        facIDs = np.array(affinity.facIDs, dtype=object)
+        scholIDs = np.array(affinity.scholIDs, dtype=object)
+        active = np.array([fac not in facCancel for fac in affinity.facIDs], dtype=bool)
+        self.FS = ranked_rows(affinity.FS, scholIDs, affinity.facIDs, active)
+        self.FSbk = ranked_rows(affinity.FSbk, scholIDs, affinity.facIDs, active)
+        self.SF = ranked_rows(np.where(active[:, None], affinity.inUni, 0).T, facIDs, affinity.scholIDs)
+        self.SFbk = ranked_rows(np.where(active[:, None], affinity.backup, 0).T, facIDs, affinity.scholIDs)
+
+    # The same lists for a subset of the people (sets of emails), e.g. one cluster of shard.py; order is kept
+    def restricted(self, faculty, scholars):
+        sub = CandidateIndex.__new__(CandidateIndex)
+        sub.FS = {fac: tuple(s for s in ranked if s in scholars) for fac, ranked in self.FS.items() if fac in faculty}
+        sub.FSbk = {fac: tuple(s for s in ranked if s in scholars) for fac, ranked in self.FSbk.items() if fac in faculty}
+        sub.SF = {schol: tuple(f for f in ranked if f in faculty) for schol, ranked in self.SF.items() if schol in scholars}
+        sub.SFbk = {schol: tuple(f for f in ranked if f in faculty) for schol, ranked in self.SFbk.items() if schol in scholars}
+        return sub
+
+
+# for each row of the score matrix, the column ids with a positive score, highest first; ties keep registration order
+def ranked_rows(mat, colIDs, rowIDs, active=None):
+    ranked = {}
+    for i, row in enumerate(mat):
+        if active is not None and not active[i]:
+            continue
+        nz = np.flatnonzero(row > 0)
+        ranked[rowIDs[i]] = tuple(colIDs[nz[np.argsort(-row[nz], kind="stable")]])
+    return ranked
+
+
+# weight matrix of people x interned interests: RANKWEIGHT - rank of that interest for that person, 0 if not listed
+def rank_weights(people, nInterests):
+    weights = np.zeros((len(people), nInterests), dtype=np.int16)
+    for person in people:
+        for rank, interest in enumerate(person.interests):
+            weights[person.id, interest] = RANKWEIGHT - rank
+    return weights
+
+
+# Build the affinity matrices from a registry.Registry; rows and columns are the registry ids.
+# Faculty in facCancel keep their row (no registered faculty member is cancelled yet when this runs); the candidate
+# index leaves them out.
+def build_affinity(registry, facCancel):
+    facIDs = [fac.email for fac in registry.faculty]
+    scholIDs = [schol.email for schol in registry.scholars]
+
+    # an interest only contributes if chosen by both sides; the product is 0 for everything else
+    nInterests = len(registry.interests)
+    facWeights = rank_weights(registry.faculty, nInterests)
+    scholWeights = rank_weights(registry.scholars, nInterests)
+    total = (facWeights.astype(np.int32) @ scholWeights.T.astype(np.int32)).astype(np.int16)
+
+    # uniMatch[f, s] is True if faculty f is at a university scholar s is interested in
+    uniMatch = registry.at_listed_university()
+
+    inUni = np.where(uniMatch, total, 0).astype(np.int16)
+    backup = np.where(uniMatch, 0, total).astype(np.int16)
+    return AffinityMatrix(facIDs, scholIDs, inUni, backup)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Benchmark for the scheduling pipeline on synthetic events.
+generate_event writes Qualtrics-shaped input files (same rows and columns the loaders in ingest.py expect) for any
+number of faculty, scholars, universities and research interests, with skewed choices and blacked-out slots.
+Each scale is then run in a fresh process through ingest, affinity build, greedy tries and export, reporting the wall
+time of every stage, peak memory, tries until everyone has their minimum, the best deficit and the dead ends per try
+(placements that failed although both people had open slots). Every try is scored with score.py in one call at the
+end; the JSON lines carry the quality metrics of the kept schedule and their range over all tries.
+
+Example:
+    python benchmark.py --scales 1,10,100 --json bench.jsonl
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import ingest
+from affinity import build_affinity
+from registry import build_registry
+from export import export_schedules
+from scheduler import ScheduleModel, build_schedule
+from score import ScheduleScorer
+from slots import SLOTSTRATEGIES
+from ingest import facRegHeaderColumns, scholRegHeaderColumns
+from instrument import Metrics
+from slotgrid import load_slot_grid, uniform_grid
+from shard import ShardPlan, sharded_schedule
+
+# Size of the sample event (1x)
+BASEFACULTY = 150
+BASESCHOLARS = 100
+BENCHLINK = "https://example.org/meeting-links"
+FIRSTNAMES = ["Ana", "Ben", "Cara", "Dev", "Eli", "Fay", "Gus", "Hana", "Ivo", "Jun", "Kai", "Lea", "Max", "Nia", "Omar", "Pia"]
+
+
+# weights for choosing among n people: the k-th most popular gets 1/(k+1)^skew (0 = everyone equally likely)
+def popularity(n, skew, rng):
+    weights = [1 / (k + 1) ** skew for k in range(n)]
+    rng.shuffle(weights)
+    return weights
+
+
+def write_sheet(rows, path, fmt):
+    df = pd.DataFrame(rows)
+    if fmt == "xlsx":
+        df.to_excel(path + ".xlsx", header=False, index=False)
+    else:
+        df.to_csv(path + ".tsv", sep="\t", header=False, index=False)
+
+
+# Write a synthetic event to dataDir (Faculty/Scholar Registration, Choices and Cancel files).
+# choiceSkew shapes how concentrated choices are on popular people; blackoutRate is the chance a faculty slot is "No".
+# Availability answers go in the columns of grid (a slotgrid.SlotGrid; the default grid if None).
+def generate_event(dataDir, nFaculty, nScholars, nUnis=6, nInterests=40, nCategories=8, choiceSkew=1.0,
+                   blackoutRate=0.1, cancelRate=0.01, seed=0, fmt="xlsx", grid=None):
+    rng = random.Random(seed)
+    TIMEZONESLOTS = (grid or load_slot_grid()).availability
+    os.makedirs(dataDir, exist_ok=True)
+    unis = [f"University {u}" for u in range(nUnis)]
+    interests = [f"interest {i}" for i in range(nInterests)]
+    categories = [f"category {c}" for c in range(nCategories)]
+    interestWeights = popularity(nInterests, choiceSkew, rng)
+
+    fac = []
+    width = max(facRegHeaderColumns.values()) + 2
+    for i in range(nFaculty):
+        row = [""] * width
+        first, last = rng.choice(FIRSTNAMES), f"Faculty{i}"
+        row[facRegHeaderColumns["FirstName"]] = first
+        row[facRegHeaderColumns["LastName"]] = last
+        row[facRegHeaderColumns["email"]] = f"{first}.{last}@faculty.edu"
+        row[facRegHeaderColumns["University"]] = rng.choice(unis)
+        row[facRegHeaderColumns["ResearchCat"]] = ",".join(rng.sample(categories, 2))
+        for k, interest in enumerate(rng.choices(interests, interestWeights, k=3)):
+            row[facRegHeaderColumns[f"ResearchInt{k + 1}"]] = interest
+        row[facRegHeaderColumns["MeetingType"]] = "Zoom"
+        row[facRegHeaderColumns["MeetingLink"]] = f"https://zoom.example/{i}"
+        fac.append(row)
+    # Qualtrics: a line of question ids, the header line, a line of import ids, then the data
+    write_sheet([[f"Q{c}" for c in range(width)], [f"column {c}" for c in range(width)], ["import"] * width] + fac,
+                os.path.join(dataDir, "Faculty_Registration"), fmt)
+
+    schol = []
+    width = max(scholRegHeaderColumns.values()) + 2
+    for i in range(nScholars):
+        row = [""] * width
+        first, last = rng.choice(FIRSTNAMES), f"Scholar{i}"
+        row[scholRegHeaderColumns["FirstName"]] = first
+        row[scholRegHeaderColumns["LastName"]] = last
+        row[scholRegHeaderColumns["email"]] = f"{first}.{last}@scholar.edu"
+        row[scholRegHeaderColumns["SchoolChoice"]] = "\n".join(rng.sample(unis, min(nUnis, rng.randint(1, 3))))
+        row[scholRegHeaderColumns["ResearchCat"]] = "\n".join(rng.sample(categories, 2))
+        for k, interest in enumerate(rng.choices(interests, interestWeights, k=3)):
+            row[scholRegHeaderColumns[f"ResearchInt{k + 1}"]] = interest
+        schol.append(row)
+    write_sheet([[f"column {c}" for c in range(width)]] + schol, os.path.join(dataDir, "Scholar_Registration"), fmt)
+
+    width = max(max(slots) for slots in TIMEZONESLOTS.values()) + 1
+    scholWeights = popularity(nScholars, choiceSkew, rng)
+    rows = [["header"] * width] * 3
+    for r in fac:
+        row = [""] * width
+        row[3] = r[facRegHeaderColumns["email"]]
+        for k, s in enumerate(rng.choices(schol, scholWeights, k=rng.randint(0, 5))):
+            row[6 + k] = f"{s[scholRegHeaderColumns['FirstName']]} {s[scholRegHeaderColumns['LastName']]}"
+        timezone = rng.choice(list(TIMEZONESLOTS))
+        row[11] = timezone.title()
+        for c in TIMEZONESLOTS[timezone]:
+            row[c] = "No" if rng.random() < blackoutRate else "Yes"
+        rows.append(row)
+    write_sheet(rows, os.path.join(dataDir, "Faculty_Choices"), fmt)
+
+    facWeights = popularity(nFaculty, choiceSkew, rng)
+    rows = [["header"] * 10]
+    for s in schol:
+        row = [""] * 10
+        row[3] = s[scholRegHeaderColumns["email"]]
+        for k, f in enumerate(rng.choices(fac, facWeights, k=rng.randint(0, 4))):
+            row[5 + k] = (f"{f[facRegHeaderColumns['FirstName']]} {f[facRegHeaderColumns['LastName']]}"
+                          f" - {f[facRegHeaderColumns['University']]}")
+        rows.append(row)
+    write_sheet(rows, os.path.join(dataDir, "Scholar_Choices"), fmt)
+
+    for name, people, cols in (("Faculty_Cancel", fac, facRegHeaderColumns), ("Scholar_Cancel", schol, scholRegHeaderColumns)):
+        cancelled = [p for p in people if rng.random() < cancelRate]
+        write_sheet([["first", "last", "email"]] + [[p[cols["FirstName"]], p[cols["LastName"]], p[cols["email"]]] for p in cancelled],
+                    os.path.join(dataDir, name), fmt)
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kilobytes on Linux
+
+
+# Run the pipeline once on the event in workDir/Data; returns a dictionary of results
+def run_pipeline(workDir, maxTries, minInt, maxInt, seed, slotStrategy="random", localSearch=True, grid=None, shards=1,
+                 workers=1):
+    data = os.path.join(workDir, "Data")
+    grid = grid or load_slot_grid()
+    maxInt = maxInt or len(grid)
+    timings = {}
+    quiet = io.StringIO()
+
+    def stage(name, func, *args):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(quiet):
+            result = func(*args)
+        timings[name] = time.perf_counter() - start
+        quiet.seek(0)
+        quiet.truncate()
+        return result
+
+    inputs = {"slotGrid": grid}
+    files = {name: ingest.input_file(os.path.join(data, name)) for name in
+             ("Faculty_Cancel", "Scholar_Cancel", "Faculty_Registration", "Scholar_Registration", "Faculty_Choices", "Scholar_Choices")}
+
+    def load_cancellations():
+        ingest.load_faculty_cancel(files["Faculty_Cancel"], inputs)
+        ingest.load_scholar_cancel(files["Scholar_Cancel"], inputs)
+
+    def load_registrations():
+        ingest.load_faculty_registration(files["Faculty_Registration"], inputs)
+        ingest.load_scholar_registration(files["Scholar_Registration"], inputs)
+
+    def load_choices():
+        ingest.load_faculty_choices(files["Faculty_Choices"], inputs)
+        ingest.load_scholar_choices(files["Scholar_Choices"], inputs)
+
+    stage("cancellations", load_cancellations)
+    stage("registrations", load_registrations)
+    inputs["registry"] = stage("registry", build_registry, inputs)
+    affinity = stage("affinity", build_affinity, inputs["registry"], inputs["facCancel"])
+    stage("choices", load_choices)
+    snapshotFile = ingest.cache_path(files["Faculty_Registration"], "inputs.pkl")
+    inputs["affinity"] = affinity
+    stage("snapshot save", ingest.save_snapshot, snapshotFile, list(files.values()), inputs)
+    stage("snapshot load", ingest.load_snapshot, snapshotFile, list(files.values()))
+
+    facCancel = inputs["facCancel"]
+    candidates = stage("candidates", affinity.candidate_index, facCancel)
+    model = ScheduleModel(inputs["Faculty"], inputs["Scholars"], inputs["FacAvail"], facCancel, inputs["FacChoices"],
+                          inputs["ScholChoices"], inputs["FacChosenBy"], inputs["ScholChosenBy"], affinity, candidates,
+                          maxInt, minInt, minInt, localSearch=localSearch, slotStrategy=slotStrategy,
+                          grid=grid.truncate(maxInt))
+
+    if shards > 1:
+        plan = stage("shard plan", ShardPlan, model, inputs["ScholarUni"], shards)
+
+    # greedy tries until nobody is below the minimum (but the floor, see prune.py), or maxTries
+    floor = stage("try bound", model.try_bound).floor
+    scorer = ScheduleScorer(model)
+    encoded = []  # every try, scored together at the end
+    rng = random.Random(seed)
+    tryMetrics = Metrics()  # only to count the abandoned tries (see prune.py), which needs localSearch=False
+    best = None
+    triesToSuccess = None
+    deadEnds = 0
+    start = time.perf_counter()
+    for tries in range(1, maxTries + 1):
+        if shards > 1:
+            state, _ = sharded_schedule(model, plan, workers, seed=rng.getrandbits(64), report=False)
+        else:
+            state, _ = build_schedule(model, rng, report=False, metrics=tryMetrics, abortAbove=None if best is None else best[0])
+        deadEnds += state.deadEnds
+        encoded.append(scorer.encode(state))
+        deficit = state.stats.deficit()
+        if best is None or deficit < best[0]:
+            best = (deficit, state, len(encoded) - 1)
+        if deficit <= floor:
+            triesToSuccess = tries
+            break
+    timings["schedule"] = time.perf_counter() - start
+    state = best[1]
+    scores = stage("score", lambda: scorer.score(np.stack([e[0] for e in encoded]), np.stack([e[1] for e in encoded])))
+
+    scholE2N = inputs["scholE2N"]
+    facultyEMAILtoNAME = inputs["facultyEMAILtoNAME"]
+    times = grid.truncate(maxInt).labels()
+    scholars = [(scholE2N[s], [facultyEMAILtoNAME.get(f, "NA") for f in state.SCHOLsched[s]], []) for s in model.Scholars]
+    faculty = [(facultyEMAILtoNAME[f], [scholE2N.get(s, "NA") for s in state.FACsched[f]], []) for f in state.FACsched]
+    out = os.path.join(workDir, "OUT")
+    stage("export", lambda: (export_schedules(scholars, os.path.join(out, "ScholarSchedules"), "ScholarName", "", times, BENCHLINK,
+                                              sheetTitle="ScholarSchedule"),
+                             export_schedules(faculty, os.path.join(out, "FacultySchedules"), "FacultyName", "", times, BENCHLINK,
+                                              sheetTitle="FacultySchedule")))
+
+    return {
+        "faculty": len(state.FACsched),
+        "scholars": len(model.Scholars),
+        "seconds": timings,
+        "total seconds": sum(timings.values()),
+        "tries": tries,
+        "tries to success": triesToSuccess,
+        "abandoned tries": sum(n for phase, n in tryMetrics.runs.items() if phase.startswith("pruned after")),
+        "best deficit": best[0],
+        "floor": floor,
+        "slot strategy": slotStrategy,
+        "slots": maxInt,
+        "dead ends per try": deadEnds / tries,
+        "quality": dict(scorer.rows(scores, best[2])),  # of the kept schedule; see score.py
+        "quality range": {name: [float(np.nanmin(v)), float(np.nanmax(v))] for name, v in scores.items() if v.ndim == 1},  # over all tries
+        "seconds per try": timings["schedule"] / tries,
+        "peak rss mb": peak_rss_mb(),
+    }
+
+
+# One scale in its own process, so peak memory is measured per scale
+def run_scale(scale, options):
+    workDir = tempfile.mkdtemp(prefix=f"bench{scale}x_")
+    grid = None
+    if (options["sessions"], options["session_slots"], options["session_capacity"]) != (1, 8, None):
+        grid = uniform_grid(options["sessions"], options["session_slots"], options["session_capacity"])
+    try:
+        start = time.perf_counter()
+        generate_event(os.path.join(workDir, "Data"), int(BASEFACULTY * scale), int(BASESCHOLARS * scale),
+                       nUnis=options["unis"], nInterests=options["interests"], choiceSkew=options["skew"],
+                       blackoutRate=options["blackout"], seed=options["seed"], fmt=options["format"], grid=grid)
+        generated = time.perf_counter() - start
+        result = run_pipeline(workDir, options["max_tries"], options["min_interviews"], options["max_interviews"], options["seed"],
+                              options["slot_strategy"], options["local_search"], grid, options["shards"], options["workers"])
+        result.update(scale=scale, generate_seconds=generated)
+        return result
+    finally:
+        if not options["keep"]:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+
+def print_table(results):
+    stages = list(results[0]["seconds"])
+    print(f"\n{'scale':>6} {'faculty':>8} {'scholars':>8} " + " ".join(f"{s:>13}" for s in stages)
+          + f" {'total s':>8} {'peak MB':>8} {'tries':>6} {'success':>8} {'abandoned':>9} {'deficit':>8} {'dead ends':>9}")
+    for r in results:
+        print(f"{r['scale']:>5}x {r['faculty']:8d} {r['scholars']:8d} " + " ".join(f"{r['seconds'][s]:13.3f}" for s in stages)
+              + f" {r['total seconds']:8.2f} {r['peak rss mb']:8.0f} {r['tries']:6d} {str(r['tries to success']):>8} {r['abandoned tries']:9d} {r['best deficit']:8d} {r['dead ends per try']:9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the scheduler on synthetic events at several scales.")
+    parser.add_argument("--scales", default="1,10,100", help="comma separated multiples of the sample event (%(default)s)")
+    parser.add_argument("--unis", type=int, default=6, help="number of universities (default: %(default)s)")
+    parser.add_argument("--interests", type=int, default=40, help="size of the research interest vocabulary (default: %(default)s)")
+    parser.add_argument("--skew", type=float, default=1.0, help="popularity skew of choices and interests; 0 for uniform (default: %(default)s)")
+    parser.add_argument("--blackout", type=float, default=0.1, help="chance a faculty slot is unavailable (default: %(default)s)")
+    parser.add_argument("--max-tries", type=int, default=20, help="greedy tries per scale (default: %(default)s)")
+    parser.add_argument("--min-interviews", type=int, default=3, help="minimum interviews per person (default: %(default)s)")
+    parser.add_argument("--max-interviews", type=int, default=None, help="maximum interviews per person (default: every slot)")
+    parser.add_argument("--sessions", type=int, default=1, help="sessions in the slot grid (default: %(default)s)")
+    parser.add_argument("--session-slots", type=int, default=8, help="slots per session (default: %(default)s)")
+    parser.add_argument("--session-capacity", type=int, default=None, help="most interviews per person in a session (default: no limit)")
+    parser.add_argument("--slot-strategy", choices=sorted(SLOTSTRATEGIES), default="random", help="how placements pick a slot (default: %(default)s)")
+    parser.add_argument("--no-local-search", dest="local_search", action="store_false", help="greedy tries only, without the local search; only then are tries that can no longer beat the best one abandoned early (prune.py)")
+    parser.add_argument("--shards", type=int, default=1, help="university clusters scheduled separately, then reconciled (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for the clusters (default: %(default)s)")
+    parser.add_argument("--format", choices=["xlsx", "tsv"], default="xlsx", help="input file format to generate (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the generator and the tries (default: %(default)s)")
+    parser.add_argument("--json", help="also append one JSON line per scale to this file")
+    parser.add_argument("--keep", action="store_true", help="keep the generated events and outputs (printed per scale)")
+    args = parser.parse_args(argv)
+    options = vars(args)
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for scale in [float(s) if "." in s else int(s) for s in args.scales.split(",")]:
+        # not a multiprocessing.Pool: its workers are daemonic and could not start the --workers processes of the clusters
+        with ProcessPoolExecutor(1, mp_context=ctx) as pool:
+            result = pool.submit(run_scale, scale, options).result()
+        results.append(result)
+        print(f"{scale}x: {result['faculty']} faculty, {result['scholars']} scholars in {result['total seconds']:.2f}s "
+              f"(generated in {result['generate_seconds']:.1f}s), peak {result['peak rss mb']:.0f} MB", file=sys.stderr)
+        if args.json:
+            with open(args.json, "a") as fh:
+                fh.write(json.dumps(result) + "\n")
+    print_table(results)
+
+
+if __name__ == "__main__":
+    main()
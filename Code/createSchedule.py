@@ -8,10 +8,24 @@ This code was developed by Ryan Hernandez. Any questions? Reach out directly: ry
 """
 
 import pandas as pd
+import argparse
 import os
-import re
-from collections import defaultdict
 import random
+import signal
+import time
+
+import ingest
+import instrument
+from affinity import build_affinity
+from registry import build_registry
+from scheduler import ScheduleModel, build_schedule, check_schedules, tally, multi_start, schedule_rank
+from solver import solve_milp
+from repair import load_published, repair_schedule
+from export import export_schedules, EXPORTMODES
+from slots import SLOTSTRATEGIES
+from slotgrid import load_slot_grid
+from shard import ShardPlan, sharded_schedule
+from score import ScheduleScorer
 
 # Verbosity and Debug options
 VERBOSE = False  # Set this variable to True to print out verbose messages; primarily for debugging
@@ -22,1129 +36,317 @@ DEBUGPAUSE = False  # Set this variable to True to pause at debug messages
 DIR = "../"
 DIROUT = "../OUT/"
 
+# Command line options; without any, the script runs interactively with the settings in this file
+parser = argparse.ArgumentParser(description="Build interview schedules for the matchmaking event from the registration and choice files.")
+parser.add_argument("--input-dir", default=DIR, help="directory holding Data/ with the input files (default: %(default)s)")
+parser.add_argument("--output-dir", default=DIROUT, help="directory the schedules are written to (default: %(default)s)")
+parser.add_argument("--seed", type=int, default=None, help="random seed, to reproduce a run")
+parser.add_argument("--max-tries", type=int, default=100, help="scheduling tries before giving up on a schedule where everyone has their minimum (default: %(default)s)")
+parser.add_argument("--time-budget", type=float, default=None, help="seconds to spend searching before keeping the best schedule so far (also the milp solver's time limit)")
+parser.add_argument("--patience", type=int, default=None, help="keep searching after everyone has their minimum, for more interviews and chosen pairs, until this many tries in a row bring no improvement")
+parser.add_argument("--checkpoint", metavar="FILE", default=None, help="file the best schedule so far is saved to (default: checkpoint.pkl in the output directory)")
+parser.add_argument("--checkpoint-every", type=float, default=30, help="seconds between checkpoints of an improved schedule (default: %(default)s)")
+parser.add_argument("--resume", action="store_true", help="start from the best schedule in the checkpoint, if it was made from the same inputs and options")
+parser.add_argument("--min-scholar", type=int, default=3, help="minimum interviews for each scholar (default: %(default)s)")
+parser.add_argument("--min-faculty", type=int, default=3, help="minimum interviews for each faculty member (default: %(default)s)")
+parser.add_argument("--max-interviews", type=int, default=None, help="maximum interviews per person, i.e. number of slots used (default: every slot of the grid)")
+parser.add_argument("--slot-grid", metavar="FILE", default=None, help="JSON file with the sessions, slot times and per-session capacities (default: Data/Slot_Grid.json if there is one, else 8 slots in one session)")
+parser.add_argument("--solver", choices=["greedy", "milp"], default="greedy", help="scheduling backend (default: %(default)s)")
+parser.add_argument("--slot-strategy", choices=sorted(SLOTSTRATEGIES), default="random", help="how a placement picks among the slots open for both people (default: %(default)s)")
+parser.add_argument("--no-local-search", dest="local_search", action="store_false", help="skip the local search that fixes people left below their minimum by a greedy try; only then are tries that can no longer beat the best schedule abandoned early")
+parser.add_argument("--workers", type=int, default=1, help="worker processes for the greedy tries (default: %(default)s)")
+parser.add_argument("--shards", type=int, default=1, help="for very large events: split the universities into this many clusters, schedule them in parallel and reconcile (default: %(default)s, no split)")
+parser.add_argument("--export-mode", choices=EXPORTMODES, default="files", help="individual schedules as one workbook per person (files), one sheet per person in a single workbook (workbook) or per-person workbooks in one zip file (zip) (default: %(default)s)")
+parser.add_argument("--export-workers", type=int, default=1, help="worker processes writing the individual schedules (default: %(default)s)")
+parser.add_argument("--repair", action="store_true", help="patch the published schedule in the output directory for new cancellations")
+parser.add_argument("--batch", action="store_true", help="never prompt; stop at --max-tries or --time-budget and write the best schedule found")
+parser.add_argument("--verbose", action="store_true", help="print verbose messages")
+parser.add_argument("--metrics", metavar="FILE", default=None, help="append the wall time and counters of every phase to FILE as JSON lines")
+parser.add_argument("--summary", action="store_true", help="print a table of per-phase timings and counters at the end")
+args = parser.parse_args()
+
+VERBOSE = VERBOSE or args.verbose
+BATCH = args.batch  # no prompts, for unattended runs
+DIR = args.input_dir
+DIROUT = args.output_dir
+# Every random choice in a run comes from one generator seeded with SEED, which is recorded in the output workbooks;
+# rerunning with --seed SEED (and the same inputs and options) rebuilds the same schedule
+SEED = args.seed if args.seed is not None else random.randrange(2**32)
+rng = random.Random(SEED)
+# Timings and counters of every phase (loading, each scheduling pass, exports); see instrument.py
+metrics = instrument.Metrics(args.metrics)
+
 if not os.path.exists(DIROUT):
     os.makedirs(DIROUT)
 
-#this is a simple function to remove non-printable control characters.
-def clean_string(text):
-    return ''.join(c for c in text if c.isprintable())
-
-def randomize_order(items):
-    randomized_items = list(items)
-    random.shuffle(randomized_items)
-    return randomized_items
-
-# Set the start/stop times of each interview; this also sets the maximum number of interviews
-TIMES = [
-    "9:45-9:55P/11:45-11:55C",
-    "10:00-10:10P/12:00-12:10C",
-    "10:15-10:25P/12:15-12:45C",
-    "10:30-10:40P/12:30-12:40C",
-    "11:15-11:25P/1:15-1:25C",
-    "11:30-11:40P/1:30-1:40C",
-    "11:45-11:55P/1:45-1:55C",
-    "12:00-12:10P/2:00-2:10C"
-]
+# Set the sessions and start/stop times of each interview (see slotgrid.py); this also sets the maximum number of interviews
+slotGridFile = args.slot_grid or os.path.join(DIR, "Data/Slot_Grid.json")
+if args.slot_grid is None and not os.path.exists(slotGridFile):
+    slotGridFile = None  # the default grid of slotgrid.DEFAULTGRID
+SLOTGRID = load_slot_grid(slotGridFile)
+TIMES = SLOTGRID.labels()
 if VERBOSE:
     print("Interview Times:")
     for time_slot in TIMES:
         print(time_slot)
 
-# Initialize dictionaries to store various information
-Faculty = {}  # Faculty who registered; the keys of this dictionary are email addresses, and other info is stored in a list
-##  {email} ->
-##  [0]=name;
-##  [1]=meeting link;
-##  [2]=University;
-##  [3]=total number of research interests;
-##  [4-k]=each of their research interests;
-nFaculty = 0
-facultyNAMEtoEMAIL = {}  # Map faculty names to their email
-facultyEMAILtoNAME = {}  # Map faculty emails to their name
-FacAvail = {}  # Record whether faculty are available; default is yes
-cat2fac = {}  # Map of research categories to faculty
-facCatPop = {}  # Popularity of categories
-nfacCatPop = 0  # Total number of research categories selected across faculty
-int2fac = {}  # Map of research interests to faculty
-facIntPop = {}  # Popularity of interests
-nfacIntPop = 0  # Total number of research interests selected across faculty
-fac2uni = {} # map faculty to their university
-uni2fac = {} # map university to their faculty
-nUniFac = {} # track number of faculty at each university
-
-facCancel = {}  # Keep track of faculty that cancel to remove from schedule
-nfacCancel = 0  # Total number of faculty that have canceled
-scholCancel = {}  # Keep track of scholars that cancel to remove from schedule
-nscholCancel = 0  # Total number of scholars that have canceled
-
-# File path for the faculty cancellations
-faculty_cancel_file = os.path.join(DIR, "Data/Faculty_Cancel.xlsx")
-
-# Check if the file path is not empty
-if faculty_cancel_file:
-    try:
-        # Read the Excel file into a pandas DataFrame
-        df = pd.read_excel(faculty_cancel_file, skiprows=0, header=None)
-
-        # Initialize line count
-        nlines = 0
-
-        # Iterate over the DataFrame rows
-        for index, row in df.iterrows():
-            data = row.tolist()
-            nlines += 1
-            if nlines == 1:  # Skip header line
-                continue
-
-            # Concatenate the first and second columns to form the full name
-            first_name = str(data[0]).strip().lower()
-            last_name = str(data[1]).strip().lower()
-            full_name = first_name + last_name
-            email = clean_string(str(data[2]).strip().lower())
-
-            # Remove all control characters and non-printable characters
-            full_name = clean_string(full_name)
-
-            # Store the name in the facCancel dictionary if it doesn't exist
-            if email not in facCancel:
-                nfacCancel += 1
-                facCancel[email] = 1
-
-        print(f"there are {nfacCancel} faculty cancellations")
-        # Print the contents of the facCancel dictionary
-        if VERBOSE & nfacCancel>0:
-            print("\nFaculty Cancellations:")
-            for name in facCancel:
-                print(f"{name}")
-
-    except Exception as e:
-        print(f"Cannot read {faculty_cancel_file}\nError: {e}")
-
-# File path for the scholar cancellations
-scholar_cancel_file = os.path.join(DIR, "Data/Scholar_Cancel.xlsx")
-
-# Check if the file path is not empty
-if scholar_cancel_file:
-    try:
-        # Read the Excel file into a pandas DataFrame
-        df = pd.read_excel(scholar_cancel_file, skiprows=0, header=None)
-
-        # Initialize line count
-        nlines = 0
-
-        # Iterate over the DataFrame rows
-        for index, row in df.iterrows():
-            data = row.tolist()
-            nlines += 1
-            if nlines == 1:  # Skip header line
-                continue
-
-            # store emails
-            email = clean_string(str(data[2]).strip())
-
-            # Store the name in the scholCancel dictionary if it doesn't exist
-            if email not in scholCancel:
-                nscholCancel += 1
-                scholCancel[email] = 1
-
-        print(f"there are {nscholCancel} scholar cancellations")
-        # Print the contents of the facCancel dictionary
-        if VERBOSE & nscholCancel>0:
-            print("\nScholar cancellations:")
-            for name, count in scholCancel.items():
-                print(f"{name}")
-
-    except Exception as e:
-        print(f"Cannot read {scholar_cancel_file}\nError: {e}")
-
-# Indicates if some/all faculty meeting links are in a separate file
-meetinglinkFile = 0
-
-# Dictionary to store all the faculty meeting links, with email addresses as keys
-FacultyMeetingType = {}
-FacultyMeetingLinks = {}
-nFacultyMeetingLinks = 0  # Total number of meeting links
 
+# Input files, as .xlsx workbooks or raw tab/comma separated exports (see ingest.INPUTFORMATS)
+# Parsed tables and the finished input model are cached in Data/.cache so unchanged files are not parsed again
+meetinglinkFile = 0  # Indicates if some/all faculty meeting links are in a separate file
+faculty_cancel_file = ingest.input_file(os.path.join(DIR, "Data/Faculty_Cancel"))
+scholar_cancel_file = ingest.input_file(os.path.join(DIR, "Data/Scholar_Cancel"))
+facMeetingFile = ingest.input_file(os.path.join(DIR, "Data/MissingFacultyMeetingLinks"))
+facRegFile = ingest.input_file(os.path.join(DIR, "Data/Faculty_Registration"))
+scholRegFile = ingest.input_file(os.path.join(DIR, "Data/Scholar_Registration"))
+facChoiceFile = ingest.input_file(os.path.join(DIR, "Data/Faculty_Choices"))
+scholChoiceFile = ingest.input_file(os.path.join(DIR, "Data/Scholar_Choices"))
+inputFiles = [faculty_cancel_file, scholar_cancel_file, facRegFile, scholRegFile, facChoiceFile, scholChoiceFile]
 if meetinglinkFile == 1:
-    # Now let's get faculty meeting links
-    facMeetingFile = os.path.join(DIR, "Data/MissingFacultyMeetingLinks.xlsx")
-    if VERBOSE:
-        print(f"Looking for faculty meeting links in file {facMeetingFile}")
-    
-    try:
-        # Read the Excel file into a pandas DataFrame
-        df = pd.read_excel(facMeetingFile)
-
-        # Initialize line count
-        nlines = 0
-
-        # Iterate over the DataFrame rows
-        for index, row in df.iterrows():
-            nlines += 1
-            if nlines == 1:  # Skip header line
-                continue
-
-            # Get the email and link from the appropriate columns
-            email = str(row[2]).strip().lower()
-            link = str(row[3]).strip()
+    inputFiles.append(facMeetingFile)
+if slotGridFile is not None:
+    inputFiles.append(slotGridFile)  # availability is read by the grid's columns
+snapshotFile = ingest.cache_path(facRegFile, "inputs.pkl")
+USECACHE = True  # set to False to always parse the input files again
+
+ingest.VERBOSE = VERBOSE
+ingest.DEBUG = DEBUG
+ingest.DEBUGPAUSE = DEBUGPAUSE
+
+
+# Parse every input file and build the affinity matrices; returns the dictionary of inputs
+def read_inputs():
+    inputs = {"slotGrid": SLOTGRID}
+    with metrics.phase("cancel load") as counts:
+        ingest.load_faculty_cancel(faculty_cancel_file, inputs)
+        ingest.load_scholar_cancel(scholar_cancel_file, inputs)
+        counts["cancelled"] = len(inputs["facCancel"]) + len(inputs["scholCancel"])
+    if meetinglinkFile == 1:
+        with metrics.phase("meeting links load"):
+            ingest.load_meeting_links(facMeetingFile, inputs)
+    with metrics.phase("registration load") as counts:
+        ingest.load_faculty_registration(facRegFile, inputs)
+        ingest.load_scholar_registration(scholRegFile, inputs)
+        counts["faculty"] = len(inputs["Faculty"])
+        counts["scholars"] = len(inputs["Scholars"])
+        # dense ids and interned interests, universities and categories for everyone registered
+        inputs["registry"] = build_registry(inputs)
+    ingest.print_popularity(inputs)
+
+    # now build a matrix to map faculty and scholar overlapping interests, weighted by ranking
+    # FSintMap[f, s] is restricted to faculty at universities the scholar is interested in; FSintMapBK to those that the scholar is not interested in
+    # SFintMap and SFintMapBK are transposed views of the same matrices (scholars by faculty)
+    with metrics.phase("affinity build"):
+        inputs["affinity"] = build_affinity(inputs["registry"], inputs["facCancel"])
+
+    with metrics.phase("choices load"):
+        ingest.load_faculty_choices(facChoiceFile, inputs)
+        ingest.load_scholar_choices(scholChoiceFile, inputs)
+    ingest.report_unchosen_faculty(inputs)
+    return inputs
+
+
+with metrics.phase("snapshot load"):
+    inputs = ingest.load_snapshot(snapshotFile, inputFiles) if USECACHE else None
+if inputs is not None:
+    print(f"Input files unchanged; using the parsed inputs cached in {snapshotFile}")
+    ingest.print_popularity(inputs)
+    ingest.report_unchosen_faculty(inputs)
+else:
+    inputs = read_inputs()
+    if USECACHE:
+        ingest.save_snapshot(snapshotFile, inputFiles, inputs)
+
+Faculty = inputs["Faculty"]
+Scholars = inputs["Scholars"]
+ScholarUni = inputs["ScholarUni"]
+FacAvail = inputs["FacAvail"]
+facCancel = inputs["facCancel"]
+scholCancel = inputs["scholCancel"]
+facultyEMAILtoNAME = inputs["facultyEMAILtoNAME"]
+scholE2N = inputs["scholE2N"]
+FacChoices = inputs["FacChoices"]
+ScholChoices = inputs["ScholChoices"]
+FacChosenBy = inputs["FacChosenBy"]  # faculty -> scholars who chose them
+ScholChosenBy = inputs["ScholChosenBy"]  # scholar -> faculty who chose them
+affinity = inputs["affinity"]
+FSintMap = affinity.FS
+SFintMap = affinity.SF
+FSintMapBK = affinity.FSbk
+SFintMapBK = affinity.SFbk
 
-            # Remove all control characters and non-printable characters
-            email = clean_string(email)
-
-            # Store the email and link in the FacultyMeetingLinks dictionary if it doesn't exist
-            if email not in FacultyMeetingLinks:
-                FacultyMeetingLinks[email] = link
-                nFacultyMeetingLinks += 1
-            else:
-                print(f"error, {email} duplicated in faculty meeting file?")
-                exit(1)
+if False: #change this to True to print out the Faculty-Scholar interest map
+    for fac in affinity.facIDs:
+        for schol in affinity.ranked_scholars(fac):
+            if affinity.score(fac, schol) <= 10:
+                break
+            print(f"{fac}:{schol}={affinity.score(fac, schol)}")
 
-        # Print the contents of the FacultyMeetingLinks dictionary
-        if VERBOSE:
-            print(f"\n{nFacultyMeetingLinks} Faculty Meeting links read:")
-            for email, link in FacultyMeetingLinks.items():
-                print(f"{email}: {link}")
-
-    except Exception as e:
-        print(f"Cannot read {facMeetingFile}\nError: {e}")
-
-
-# File path for the faculty registration data
-facRegFile = os.path.join(DIR, "Data/Faculty_Registration.xlsx")
-
-# Read the Excel file into a pandas DataFrame
-df = pd.read_excel(facRegFile, skiprows=1, header=None) #in qualtrics, first line is not helpful, and want to define my own headers
-
-# Dictionary to map relevant headers to their column indices
-facRegHeaderColumns = {
-    "FirstName": 2,
-    "LastName": 3,
-    "email": 4,
-    "University": 5,
-    "ResearchCat": 8,
-    "ResearchInt1": 10,
-    "ResearchInt2": 12,
-    "ResearchInt3": 14,
-    "website": 17,
-    "MeetingType": 18,
-    "MeetingLink": 19
-}
-
-# Find the maximum column index
-maxColumnEntry = max(facRegHeaderColumns.values())
-nlines = 0
-# Iterate over the DataFrame rows
-for index, row in df.iterrows():
-    nlines += 1
-    
-    if DEBUG:
-        print(f"{nlines}; line={row}")
-
-    if nlines == 1:  # From Qualtrics, header info is on line 2 and data begins on line 4... is yours the same?
-        facRegHeaders = row.tolist()
-
-        nfacRegHeaders = len(facRegHeaders)
-        if VERBOSE:
-            print("Check that the column names match the desired columns:")
-            for col in sorted(facRegHeaderColumns, key=facRegHeaderColumns.get):
-                print(f"column {col}: {facRegHeaderColumns[col]}")
-                print(f"\t{facRegHeaderColumns[col]}: {col} =?= {facRegHeaders[facRegHeaderColumns[col]]}")
-            print("\n")
-        continue #check which line data will start on!
-    if nlines < 3:
-        continue
-
-    # Convert row to a list of values
-    sp = row.tolist()
-
-    # Skip rows with only one value
-    if len(sp) == 1:
-        continue
-
-    if DEBUG:
-        print(f"line {nlines}: {sp}")
-        for col in sorted(facRegHeaderColumns, key=facRegHeaderColumns.get):
-            print(f"{col}: {sp[facRegHeaderColumns[col]]}")
-
-    # Concatenate the first and last names to form the full name
-    first_name = clean_string(str(sp[facRegHeaderColumns["FirstName"]])).strip()
-    last_name = clean_string(str(sp[facRegHeaderColumns["LastName"]])).strip()
-    CapName = first_name + " " + last_name
-    name = first_name.lower().replace(" ","") + last_name.lower().replace(" ","")
-    email = clean_string(str(sp[facRegHeaderColumns["email"]])).strip().lower()
-    uni = clean_string(str(sp[facRegHeaderColumns["University"]])).strip()
+if not BATCH:
+    input("Press enter to continue")
 
-    if VERBOSE:
-        print(f"\nReading faculty {CapName} at {uni} on line {nlines}: {email}")
+# Now build schedules!!
 
-    # Check if the faculty member has canceled
-    if email in facCancel:
+# Initialize variables and dictionaries for schedules
+FAILED = 1
+TOTTRIES = 0
+MAXTRIES = args.max_tries
+TIMEBUDGET = args.time_budget  # seconds; once spent, the best schedule so far is kept. None for no limit
+PATIENCE = args.patience  # tries in a row without a better schedule before stopping; None to stop as soon as nobody has too few
+CHECKPOINTFILE = args.checkpoint or os.path.join(DIROUT, "checkpoint.pkl")
+CHECKPOINTEVERY = args.checkpoint_every  # seconds between checkpoints of the best schedule
+SOLVER = args.solver  # "greedy" for randomized tries until nobody has too few; "milp" for one exact solve (needs scipy)
+REPAIR = args.repair  # set to True to patch the published schedule in DIROUT for new cancellations instead of building a new one
+SLOTSTRATEGY = args.slot_strategy  # random, early, late, constrained or uncontended; see slots.py
+LOCALSEARCH = args.local_search  # finish each greedy try by locally fixing anyone left below their minimum
+NWORKERS = args.workers  # number of worker processes; above 1, each round runs its tries in parallel and keeps the best one
+ROUNDTRIES = 2  # tries per worker in one parallel round; the time budget and Ctrl-C are checked between rounds
+NSHARDS = args.shards  # above 1, each try schedules university clusters separately (on NWORKERS processes); see shard.py
+MINScholInt = args.min_scholar  # minimum interviews for each scholar
+MINFacInt = args.min_faculty  # minimum interviews for each faculty
+MAXInt = len(SLOTGRID) if args.max_interviews is None else args.max_interviews  # maximum number of interview slots
+if not 0 < MAXInt <= len(SLOTGRID):
+    parser.error(f"--max-interviews must be between 1 and {len(SLOTGRID)}, the number of interview times")
+SLOTGRID = SLOTGRID.truncate(MAXInt)
+TIMES = SLOTGRID.labels()
+
+# Rank candidates for the random fill passes once; scores do not change between tries
+with metrics.phase("candidate index"):
+    candidates = affinity.candidate_index(facCancel)
+
+# Everything a scheduling try needs to read; shared with the worker processes when NWORKERS > 1
+model = ScheduleModel(Faculty, Scholars, FacAvail, facCancel, FacChoices, ScholChoices, FacChosenBy, ScholChosenBy,
+                      affinity, candidates, MAXInt, MINFacInt, MINScholInt, verbose=VERBOSE, localSearch=LOCALSEARCH,
+                      slotStrategy=SLOTSTRATEGY, grid=SLOTGRID)
+
+# The best schedule so far, as (state, nrecipChoice, run info, rank); see schedule_rank for how schedules are compared.
+# It is checkpointed to CHECKPOINTFILE every CHECKPOINTEVERY seconds while it improves, and once more at the end,
+# so a long search that is interrupted or crashes can be picked up again with --resume.
+best = None
+# Split the event into university clusters once; every sharded try uses the same clusters
+if NSHARDS > 1 and not REPAIR and SOLVER != "milp":
+    with metrics.phase("shard plan"):
+        shardPlan = ShardPlan(model, ScholarUni, NSHARDS)
+    print(f"Split the event into {len(shardPlan)} university clusters:")
+    shardPlan.report()
+
+# People who can never reach their minimum in a greedy schedule (see prune.py); once only they are short, more tries
+# cannot do better. A repair or an exact solve may pair anyone, so there it is 0.
+FLOOR = 0
+if not REPAIR and SOLVER != "milp":
+    with metrics.phase("try bound"):
+        bound = model.try_bound()
+    FLOOR = bound.floor
+    if FLOOR:
+        print(f"{len(bound.facFloor)} faculty and {len(bound.scholFloor)} scholars can never reach their minimum (too few usable slots or possible partners)")
         if VERBOSE:
-            print(f"\n\n\n\nFaculty {CapName} cancelled. Skipping. *******")
-        continue
-
-
-    # Check for duplicate emails and issue a warning if found
-    if VERBOSE:
-        if email in Faculty:
-            print(f"\n\n\n\nWarning: {email} repeated in registration file line {nlines}; overwriting with new info *****")
-            exit(1)
-
-    # If meetinglink is not included in a separate document, collect it from registration data
-    if email not in FacultyMeetingLinks and facRegHeaderColumns["MeetingLink"] != "":
-        FacultyMeetingType[email] = clean_string(str(sp[facRegHeaderColumns["MeetingType"]])).strip()
-        FacultyMeetingLinks[email] = clean_string(str(sp[facRegHeaderColumns["MeetingLink"]])).strip()
-        nFacultyMeetingLinks += 1
-    elif email not in FacultyMeetingLinks:
-        print(f"\n\n\n\nWarning: Did not find meeting link for {email} in MeetingLink file ******")
-        exit(1)
-
-    if VERBOSE:
-        print(f"\tMeetingLink: {FacultyMeetingLinks[email]}")
-
-    # Capture faculty research categories
-    numCat = 0
-    resCat = clean_string(str(sp[facRegHeaderColumns["ResearchCat"]])).strip().lower()
-    cat = resCat.split(',')
+            for person in sorted(bound.facFloor | bound.scholFloor):
+                print(f"\t{person}")
 
-    for c in cat:
-        cat2fac.setdefault(c, {})[email] = numCat
-        facCatPop[c] = facCatPop.get(c, 0) + 1
-        nfacCatPop += 1
-        numCat += 1
+checkpointSettings = (sorted(Faculty), sorted(Scholars), sorted(facCancel), {fac: FacAvail[fac][:MAXInt] for fac in Faculty},
+                      MAXInt, MINFacInt, MINScholInt, SLOTGRID.layout())
 
-    if VERBOSE:
-        print(f"\tResearchCat: {resCat}")
-
-    # Capture faculty research interests
-    numInt = 0
-    interests = []
-    for i in range(1, 4):
-        interest = clean_string(str(sp[facRegHeaderColumns[f"ResearchInt{i}"]])).strip().lower()
-        if "other" in interest:
-            interest = clean_string(str(sp[facRegHeaderColumns[f"ResearchInt{i}"] + 1])).strip().lower()
-        if interest and interest != "other" and interest != "nopreference":
-            facIntPop[interest] = facIntPop.get(interest, 0) + 1
-            nfacIntPop += 1
-            int2fac.setdefault(interest, {})[email] = numInt
-            interests.append(interest)
-            numInt += 1
-    if VERBOSE:
-        print(f"\tResearchInt: {interests}")
-
-    # Add faculty information to the Faculty dictionary
-    if email not in Faculty:
-        nFaculty += 1
-    Faculty[email] = [name, FacultyMeetingLinks.get(email), uni, numInt] + interests
-    uni2fac.setdefault(uni, {})[email] = 1
-    if VERBOSE:
-        print(f"\tUni: {uni}")
-
-    # Check if the faculty member has a meeting link
-    if Faculty[email][1] is None:
-        raise ValueError(f"Faculty {email} does not have a meeting link")
 
-    facultyNAMEtoEMAIL[name] = email
-    facultyEMAILtoNAME[email] = CapName
+def save_checkpoint():
+    ingest.write_pickle(CHECKPOINTFILE, {"settings": checkpointSettings, "best": best})
 
-    # Set default faculty availability; updated below in choices
-    FacAvail[email] = [1] * 8
-
-    if VERBOSE:
-        print(f"Read faculty {CapName} {email} on line {nlines}:")
-        for i, info in enumerate(Faculty[email]):
-            print(f"\t[{i}]={info}")
-
-
-print(f"Read {nFaculty} unique faculty across {len(uni2fac)} Universities:")
-for uni in sorted(uni2fac):
-    print(f"\t{uni}: {len(uni2fac[uni])}")
-
-# Initialize dictionaries to store various scholar information
-Scholars = {}  # Scholars who registered; the keys of this dictionary are email addresses, and other info is stored in a list
-##  {email} ->
-##  [0]=name
-##  [1]=num interests
-##  [2-k]=interest k;
-ScholarUni = {} # map scholar to their universities of interest
-## {email} -> 
-##[0]=number of uni interests
-##[1-k]=uni1; uni2; ...
-nScholars = 0
-scholN2E = {}  # Map scholar name to email
-scholE2N = {}  # Map email to scholar name
-cat2schol = {}  # Map of research categories to scholars
-scholCatPop = {}  # Scholar research category popularity
-nscholCatPop = 0  # Total number of research categories selected across scholars
-int2schol = {}  # Map of research interests to scholars
-scholIntPop = {}  # Scholar research interest popularity
-nscholIntPop = 0  # Total number of research interests selected across scholars
-uni2schol = {} # map university to the scholars interested
-# File path for the scholar registration data
-scholRegFile = os.path.join(DIR, "Data/Scholar_Registration.xlsx")
-
-# Read the Excel file into a pandas DataFrame
-scholReg_df = pd.read_excel(scholRegFile, skiprows=0, header=None)  # Assuming the first line is not useful and defining own headers
-
-# Dictionary to map relevant headers to their column indices
-scholRegHeaderColumns = {
-    "FirstName": 0,
-    "LastName": 1,
-    "email": 2,
-    "SchoolChoice": 10,
-    "ResearchCat": 11,
-    "ResearchInt1": 13,
-    "ResearchInt2": 15,
-    "ResearchInt3": 17
-}
-
-# Find the maximum column index
-maxColumnEntry = max(scholRegHeaderColumns.values())
-
-nlines = 0
-for index, row in scholReg_df.iterrows():
-    nlines += 1
-    if DEBUG:
-        print(f"{nlines}; line={row}")
-
-    if nlines == 1:  # Parse header line
-        scholRegHeaders = row.tolist()
-        nscholRegHeaders = len(scholRegHeaders)
-        if VERBOSE:
-            print("\n\nNow check that the scholar column names match the desired columns:")
-            for col in sorted(scholRegHeaderColumns, key=scholRegHeaderColumns.get):
-                print(f"\t{col}[{scholRegHeaderColumns[col]}] =?= {scholRegHeaders[scholRegHeaderColumns[col]]}")
-            print("\n")
-        continue
-    
-    # Convert row to a list of values
-    sp = row.tolist()
-
-    # Skip rows with only one value
-    if len(sp) < nscholRegHeaders:
-        raise ValueError(f"Check for newlines on line {nlines}: {sp}")
-
-    if DEBUG:
-        print(f"line {nlines}: {sp}")
-        for col in sorted(scholRegHeaderColumns, key=scholRegHeaderColumns.get):
-            print(f"{col}: {sp[scholRegHeaderColumns[col]]}")
-    
-    # Concatenate the first and last names to form the full name
-    first_name = clean_string(str(sp[scholRegHeaderColumns["FirstName"]])).strip()
-    last_name = clean_string(str(sp[scholRegHeaderColumns["LastName"]])).strip()
-    CapName = first_name + " " + last_name
-    name = first_name.lower().replace(" ","") + last_name.lower().replace(" ","")
-
-    # Get the email and clean it
-    email = clean_string(str(sp[scholRegHeaderColumns["email"]])).strip().lower()
-
-    if VERBOSE:
-        print(f"\nReading scholar {CapName} on line {nlines}: {email}")
 
-    # Check if the scholar has canceled
-    if email in scholCancel:
-        if VERBOSE:
-            print(f"Scholar {CapName} cancelled, skip reading data")
-            quit()
-        continue
-
-
-    # Capture scholar research categories
-    numCat = 0
-    resCat = str(sp[scholRegHeaderColumns["ResearchCat"]]).replace("\n", ",")
-    cat = resCat.split(',')
-
-    for c in cat:
-        c = c.lower()
-        scholCatPop[c] = scholCatPop.get(c, 0) + 1
-        nscholCatPop += 1
-        cat2schol.setdefault(c, {})[email] = numCat
-        numCat += 1
-        if DEBUG:
-            if c not in facCatPop:
-                print(f"\t\t***\t\tschol cat \"{c}\" NOT in facCatPop")
-                if DEBUGPAUSE: #change to True to pause on this error
-                    user_entry = input("Continue? (y/n)")
-                    if user_entry != "y" and user_entry != "":
-                        exit(1)
-
-    numInt = 0
-    interests = []
-    for i in range(1, 4):
-        research_int = clean_string(str(sp[scholRegHeaderColumns[f"ResearchInt{i}"]])).strip().lower()
-        if "other" in research_int:
-            research_int = clean_string(str(sp[scholRegHeaderColumns[f"ResearchInt{i}"] + 1])).strip().lower()
-        if research_int and research_int != "other" and research_int != "nopreference":
-            scholIntPop[research_int] = scholIntPop.get(research_int, 0) + 1
-            nscholIntPop += 1
-            int2schol.setdefault(research_int, {})[email] = numInt
-            numInt += 1
-            interests.append(research_int)
-
-    # Capture scholar university choices
-    unis = str(sp[scholRegHeaderColumns["SchoolChoice"]]).split("\n")
-    numUni = len(unis)
-    ScholarUni[email] = [numUni] + unis  
-    uniCount = 0
-    for u in unis:
-        u = u.strip()
-        uniCount += 1
-        uni2schol.setdefault(u, {})[email] = uniCount
-
-    if VERBOSE:
-        print(f"\tInterested in {ScholarUni[email][0]} schools: {ScholarUni[email][1:]}")
+if args.resume:
+    saved = ingest.read_pickle(CHECKPOINTFILE)
+    if saved is not None and saved.get("settings") == checkpointSettings:
+        best = saved["best"]
+        print(f"Resuming from {CHECKPOINTFILE}: best schedule so far has {best[3][0]} people with too few interviews")
+        if best[3][0] <= FLOOR and PATIENCE is None:
+            FAILED = 0
+    else:
+        print(f"No checkpoint for these inputs and options in {CHECKPOINTFILE}; starting a new search")
 
-    # Add scholar information to the Scholars dictionary
-    if email not in Scholars:
-        nScholars += 1
-    Scholars[email] = [name, numInt] + interests
-    scholN2E[name] = email
-    scholE2N[email] = CapName
+# Ctrl-C stops the search after the current try and keeps the best schedule; a second Ctrl-C aborts
+INTERRUPTED = False
 
-    if VERBOSE:
-        print(f"Read scholar {CapName} {email} on line {nlines}:")
-        for i, info in enumerate(Scholars[email]):
-            print(f"\t[{i}]={info}")
-
-print(f"Read {nScholars} unique scholars interested in {len(uni2schol)} Universities:")
-for uni in sorted(uni2schol):
-    print(f"\t{uni}: {len(uni2schol[uni])}")
-
-
-# Print the popularity of faculty vs scholar research categories
-print("\npopularity of faculty vs scholar research categories:\n")
-
-# Sort the categories by popularity in descending order
-sorted_facCatPop = sorted(facCatPop.items(), key=lambda x: x[1], reverse=True)
-
-for cat, fac_count in sorted_facCatPop:
-    if fac_count < 1:
-        continue
-    if cat not in scholCatPop:
-        scholCatPop[cat] = 0
-    
-    print(f"\"{cat}\"\t{fac_count:2d} ({fac_count/nfacCatPop:.4f})\t{scholCatPop[cat]:2d} ({scholCatPop[cat]/nscholCatPop:.4f})")
-    #print(f"\"{cat:>42}\"\t{fac_count:2d} ({fac_count/nfacCatPop:.4f})\t{scholCatPop[cat]:2d} ({scholCatPop[cat]/nscholCatPop:.4f})")
-
-# Print the popularity of faculty vs scholar research interests
-print("\npopularity of faculty vs scholar research interests:\n")
-
-# Sort the interests by popularity in descending order
-sorted_facIntPop = sorted(facIntPop.items(), key=lambda x: x[1], reverse=True)
-
-for interest, fac_count in sorted_facIntPop:
-    if fac_count < 10:
-        continue
-    if interest not in scholIntPop:
-        scholIntPop[interest] = 0
-    
-    print(f"{interest:>42}\t{fac_count:2d} ({fac_count/nfacIntPop:.4f})\t{scholIntPop[interest]:2d} ({scholIntPop[interest]/nscholIntPop:.4f})")
-
-# now build a dictionary to map faculty and scholar overlapping interests, weighted by ranking 
-FSintMap = defaultdict(dict) #restricted to faculty at universities the scholar is interested in
-SFintMap = defaultdict(dict) #restricted to faculty at universities the scholar is interested in
-FSintMapBK = defaultdict(dict) #restricted to faculty at universities that the scholar is not interested in
-SFintMapBK = defaultdict(dict) #restricted to faculty at universities that the scholar is not interested in
-for fac in Faculty.keys():
-    if fac in facCancel:
-        continue
-    for schol in Scholars.keys():
-        FSintMap[fac][schol] = 0
-        SFintMap[schol][fac] = 0
-        FSintMapBK[fac][schol] = 0
-        SFintMapBK[schol][fac] = 0
-
-for interest in facIntPop:
-    for fac in int2fac[interest]:
-        if interest not in int2schol:
-            continue
-        for schol in int2schol[interest]:
-            #check if faculty is at a university the scholar is interested in
-            uniMatch = False
-            for u in ScholarUni[schol][1:]:
-                if u == Faculty[fac][2]:
-                    uniMatch = True
-                    break
-            if uniMatch:
-                FSintMap[fac][schol] += (4-int2fac[interest][fac])*(4-int2schol[interest][schol]);
-                SFintMap[schol][fac] += (4-int2fac[interest][fac])*(4-int2schol[interest][schol]);
-            else:
-                FSintMapBK[fac][schol] += (4-int2fac[interest][fac])*(4-int2schol[interest][schol]);
-                SFintMapBK[schol][fac] += (4-int2fac[interest][fac])*(4-int2schol[interest][schol]);
 
-if False: #change this to True to print out the Faculty-Scholar interest map
-    for fac in FSintMap.keys():
-        for schol in sorted(FSintMap[fac].keys(), key=lambda x: FSintMap[fac][x], reverse=True):
-            if FSintMap[fac][schol] <= 10:
-                break
-            print(f"{fac}:{schol}={FSintMap[fac][schol]}")
-
-# Initialize dictionaries to store faculty choices and availability
-FacChoices = {}
-nFacChoices = {}
-nFacWithChoices = 0
-scholarCNT = {}  # Number of times a scholar is selected
-nscholarCNT = 0  # Number of unique scholars selected
-totScholarCNT = 0  # Total number of scholar selections
-nNotAvail = 0  # Number of slots faculty are not available
-nTotAvail = 0  # Total number of slots faculty are available for
-
-# File path for the faculty choices data
-facChoiceFile = os.path.join(DIR, "Data/Faculty_Choices.xlsx")
-
-# Read the Excel file into a pandas DataFrame
-df_fac_choices = pd.read_excel(facChoiceFile, skiprows=3, header=None)  # Skip first 2 line2, header in 3rd line, data starts on 4th line
-
-nlines = 0
-for index, row in df_fac_choices.iterrows():
-    nlines += 1
-    sp = row.tolist()
-
-    email = clean_string(str(sp[3])).strip().lower()
-    if DEBUG:
-        print(f"working on {email}")
-
-    if email not in Faculty:
-        if VERBOSE:
-            print(f"did not find Faculty[{email}]...")
-        continue
+def stop_search(signum, frame):
+    global INTERRUPTED
+    INTERRUPTED = True
+    print("\nStopping after this try...")
+    signal.signal(signal.SIGINT, signal.default_int_handler)
 
-    if email not in nFacChoices:
-        nFacWithChoices += 1
-    else:
-        if VERBOSE:
-            print(f"faculty {email} entered choices twice... overwriting")
 
-    nFacChoices[email] = 0
-    ## check which timezone was entered
-    timezone = clean_string(str(sp[11])).strip().lower()
+signal.signal(signal.SIGINT, stop_search)
 
-    SlotAvail = range(12, 19) #default is eastern time, first slot on the datafile... double check columns!
-    if timezone == "eastern time":
-        if VERBOSE:
-            print(f"Timezone for {email}: {timezone}")
-    elif timezone == "central time":
-        if VERBOSE:
-            print(f"Timezone for {email}: {timezone}")
-        SlotAvail = range(20, 27)
-    elif timezone == "mountain time":
-        if VERBOSE:
-            print(f"Timezone for {email}: {timezone}")
-        SlotAvail = range(28, 35)
-    elif timezone == "pacific time":
-        if VERBOSE:
-            print(f"Timezone for {email}: {timezone}")
-        SlotAvail = range(36, 44)
-    else:
-        print(f"did not find timezone for {email}")
-        exit(1)
-    
-    for i in range(6, 11):
-        if len(sp) > i:
-            choice = clean_string(str(sp[i])).strip().lower().replace(" ","")
-            if choice == "":
-                continue
-            if DEBUG:
-                print(f"\tchoice {i-5}: {choice}")
-
-            if choice in scholN2E:
-                FacChoices.setdefault(email, []).append(scholN2E[choice])
-                nFacChoices[email] += 1
-                if choice not in scholarCNT:
-                    nscholarCNT += 1
-                scholarCNT[choice] = scholarCNT.get(choice, 0) + 1
-                totScholarCNT += 1
-            else:
-                if DEBUG:
-                    print(f"did not find :{choice}: in scholars... Skipping! ({email})")
-                    if DEBUGPAUSE:
-                        user_entry = input("Is this ok to skip? (y/n)")
-                        if user_entry != "y" and user_entry != "":
-                            exit(1)
-        
-    if VERBOSE:
-        if nFacChoices[email] > 0:
-            print(f"\t{FacChoices[email]} added for faculty {email}")
-
-    # Now check availability
-    availSlots = 0
-    for i in SlotAvail:
-        colid = i - SlotAvail[0]  # map to 0-7
-        if len(sp) > colid:
-            availability = clean_string(str(sp[i])).strip().lower()
-            if VERBOSE:
-                print(f"\tChecking availability for slot {colid}/{i} ({availability})")
-            if re.search(r'\bno\b', availability, re.IGNORECASE):  # Use word boundary anchors to match exact word "no"
-                FacAvail[email][colid] = 0
-                nNotAvail += 1
-            else:
-                availSlots += 1
-        else:
-            availSlots += 1
-        if DEBUG:
-            print(f"\tAvail({colid}): {FacAvail[email][colid]}")
-
-    if availSlots == 0:
-        facCancel[email] = 1
-        del Faculty[email]
-        nFacWithChoices -= 1
-        if VERBOSE:
-            print(f"faculty {email} not available at all...")
-    else:
-        nTotAvail += availSlots
-
-if VERBOSE:
-    i = 0
-    for s in sorted(scholarCNT, key=scholarCNT.get, reverse=True):
-        i += 1
-        print(f"{i}: {s} -> {scholarCNT[s]}")
-
-NEWnFac = 0
-for fac in Faculty:
-    if fac not in facCancel:
-        NEWnFac += 1
-
-print(f"There are now {NEWnFac} faculty able to participate")
-print(f"{nFacWithChoices} faculty chose {totScholarCNT} scholars ({nscholarCNT} unique) and are not available for {nNotAvail} slots out of {nNotAvail+nTotAvail} ({nNotAvail/(nNotAvail+nTotAvail)})")
-
-# Initialize dictionaries to store scholar choices and related counts
-ScholChoices = {}
-nScholChoices = {}
-nScholWithChoices = 0
-facultyCNT = {}  # Number of times faculty selected
-nfacultyCNT = 0  # Number of unique faculty selected
-totFacultyCNT = 0  # Total number of faculty selections
-
-# File path for the scholar choices data
-scholChoiceFile = os.path.join(DIR, "Data/Scholar_Choices.xlsx")
-
-# Read the Excel file into a pandas DataFrame
-df_schol_choices = pd.read_excel(scholChoiceFile, skiprows=1, header=None)  # Skip first line, header on 1st line, data starts on 2nd line
-
-nlines = 0
-for index, row in df_schol_choices.iterrows():
-    nlines += 1
-    sp = row.tolist()
-
-    email = clean_string(str(sp[3])).strip().lower()
-    if DEBUG:
-        print(f"working on {email}")
-
-    if email not in Scholars:
+print(f"Random seed {SEED}")
+sinceBest = 0  # tries since the best schedule last improved
+checkpointDue = False
+lastCheckpoint = startTime = time.time()
+while FAILED: #this block will rerun everything if it fails, re-initialiing all variables/dictionaries
+    tryStart = time.perf_counter()
+    triesBefore = TOTTRIES
+    if REPAIR:
+        TOTTRIES += 1
+        publishedFile = os.path.join(DIROUT, "CompleteFacultySchedule.xlsx")
+        state, dropped, lost = load_published(publishedFile, model, facultyEMAILtoNAME, scholE2N)
+        print(f"Read published schedule {publishedFile}; dropped {len(dropped)} interviews with cancelled or unavailable participants")
         if VERBOSE:
-            print(f"did not find Scholar[{email}]... on line {nlines}")
-            if DEBUGPAUSE:
-                user_entry = input("Continue? (y/n)")
-                if user_entry != "y" and user_entry != "":
-                    exit(1)
-        continue
-
-    if email not in nScholChoices:
-        nScholWithChoices += 1
+            for facName, slot, scholName in dropped:
+                print(f"\t{TIMES[slot]}: {facName} with {scholName}")
+        added, moved = repair_schedule(state, model, lost, rng)
+        nrecipChoice = 0
+        print(f"Repair added {len(added)} interviews and moved {len(moved)} existing ones")
+        changed = set(lost)  # everyone who lost an interview, gained one, or had one moved needs their new schedule
+        for fac, schol, *_ in added + moved:
+            changed |= {fac, schol}
+        print("Schedules changed for:")
+        for person in sorted(changed, key=lambda x: facultyEMAILtoNAME.get(x, scholE2N.get(x))):
+            print(f"\t{facultyEMAILtoNAME.get(person, scholE2N.get(person))} ({person})")
+        check_schedules(state, model)
+    elif SOLVER == "milp":
+        TOTTRIES += 1
+        # the milp solver returns its best schedule so far once the time budget is spent
+        timeLimit = None if TIMEBUDGET is None else max(TIMEBUDGET - (time.time() - startTime), 1)
+        state, nrecipChoice = solve_milp(model, timeLimit=timeLimit)
+        check_schedules(state, model)
+    elif NSHARDS > 1:
+        TOTTRIES += 1
+        origin = rng.getrandbits(64)  # every cluster's tries and the reconciliation draw from streams spawned from this
+        state, nrecipChoice = sharded_schedule(model, shardPlan, NWORKERS, seed=origin, metrics=metrics)
+        check_schedules(state, model)
+    elif NWORKERS > 1:
+        # run a few tries per worker in parallel, but no more than patience still allows; stops early once a try leaves
+        # nobody with too few
+        roundSize = min(MAXTRIES - TOTTRIES, NWORKERS * ROUNDTRIES)
+        if PATIENCE is not None:
+            roundSize = min(roundSize, PATIENCE - sinceBest)
+        roundSize = max(roundSize, NWORKERS)
+        state, nrecipChoice, deficit, ntried, origin = multi_start(model, NWORKERS, roundSize, seed=rng.getrandbits(64),
+                                                                   triesPerTask=ROUNDTRIES, metrics=metrics,
+                                                                   stopAtZero=PATIENCE is None)
+        TOTTRIES += ntried
+        if state is None:  # every try was stopped before it ran, so the round adds nothing to the best schedule
+            if best is None:
+                print(f"Stopped after {TOTTRIES} tries in {time.time() - startTime:.1f}s, before any try finished; no schedule was made")
+                metrics.close()
+                exit(1)
+            state, nrecipChoice = best[0], best[1]
+        elif VERBOSE:
+            print(f"Ran {ntried} tries on {NWORKERS} workers; best has {deficit} people with too few interviews")
     else:
+        TOTTRIES += 1
         if VERBOSE:
-            print(f"Scholar {email} entered info twice! Overwritting...")
+            print(f"Try number {TOTTRIES}")
             if DEBUGPAUSE:
-                user_entry = input("Continue? (y/n)")
-                if user_entry != "y" and user_entry != "":
+                user_entry = input("Continue? [y/n]")
+                if user_entry != 'y' and user_entry != "":
                     exit(1)
-
-
-    nScholChoices[email] = 0
-    for i in range(5, 9):
-        if len(sp) > i:
-            name = clean_string(str(sp[i])).split(" - ")[0].strip().lower().replace(" ","")
-
-            if name == "" or name not in facultyNAMEtoEMAIL:
-                continue
-            if facultyNAMEtoEMAIL[name] in facCancel:
-                continue
-
-            if DEBUG:
-                print(f"\tchoice {i-5}: {name}")
-
-            if name in facultyNAMEtoEMAIL and facultyNAMEtoEMAIL[name] in Faculty:
-                ScholChoices.setdefault(email, []).append(facultyNAMEtoEMAIL[name])
-                nScholChoices[email] += 1
-                if facultyNAMEtoEMAIL[name] not in facultyCNT:
-                    nfacultyCNT += 1
-                facultyCNT[facultyNAMEtoEMAIL[name]] = facultyCNT.get(facultyNAMEtoEMAIL[name], 0) + 1
-                totFacultyCNT += 1
-            else:
-                if VERBOSE:
-                    print(f"did not find faculty :{name}: in scholars interest list... ({email})")
-                if DEBUGPAUSE:
-                    response = input("Is this ok to skip? (y/n)")
-                    if response == "y" or response == "":
-                        continue
-                    else:
-                        quit()
-
-print(f"{nScholWithChoices} scholars chose {totFacultyCNT} faculty ({nfacultyCNT} unique)")
-
-if VERBOSE:
-    i = 0
-    for s in sorted(facultyCNT, key=facultyCNT.get, reverse=True):
-        i += 1
-        print(f"{i}: {s} -> {facultyCNT[s]}")
-
-# Now check which faculty were not chosen by any scholar
-nFacNotChosen = 0
-for fac in Faculty:
-    if fac in facCancel:
-        continue
-    if VERBOSE:
-        print(f"checking faculty {fac}: {facultyEMAILtoNAME[fac]}...")
-    if fac not in facultyCNT:
-        nFacNotChosen += 1
-        print(f"faculty {facultyEMAILtoNAME[fac]} was not chosen by any scholar")
-print(f"{nFacNotChosen} faculty were not chosen by any scholar")
-input("Press enter to continue")
-
-# Now build schedules!!
-
-# Initialize variables and dictionaries for schedules
-FAILED = 1
-TOTTRIES = 0
-MAXTRIES = 100
-MINScholInt = 3  # minimum interviews for each scholar
-MINFacInt = 3  # minimum interviews for each faculty
-MAXInt = 8  # maximum number of interview slots
-
-FACsched = {}
-FACschedWhy = {} # store why a slot was filled: FC=faculty choice; SC=scholar choice; RA=random assignment
-nFACsched = {}
-FACslots = {}
-nFACslots = {}
-SCHOLsched = {}
-SCHOLschedWhy = {} # store why a slot was filled: FC=faculty choice; SC=scholar choice; RA=random assignment
-nSCHOLsched = {}
-SCHOLslots = {}
-nSCHOLslots = {}
-
-def check_schedules():
-    minINTS = 8
-    nFacFull = 0
-    nFacLow = 0
-    nFacAvail = 0
-    nScholFull = 0
-    nScholLow = 0
-    nScholAvail = 0
-    nScheduled = 0
-    for fac in nFACsched:
-        if fac in facCancel:
-            continue
-        if nFACsched[fac] < minINTS:
-            minINTS = nFACsched[fac]
-        if nFACsched[fac] < MINFacInt:
-            nFacLow += 1
-        if nFACsched[fac] == MAXInt:
-            nFacFull += 1
-        else:
-            nFacAvail += 1
-    
-    print(f"{nFacFull} faculty with full schedules; {nFacLow} faculty with too few; as low as {minINTS}; {nFacAvail} still have availability")
-    minINTS = 8
-    for schol in nSCHOLsched:
-        nScheduled += nSCHOLsched[schol]
-        if nSCHOLsched[schol] < minINTS:
-            minINTS = nSCHOLsched[schol]
-        if nSCHOLsched[schol] < MINScholInt:
-            nScholLow += 1
-        if nSCHOLsched[schol] == MAXInt:
-            nScholFull += 1
-        else:
-            nScholAvail += 1
-
-    print(f"{nScholFull} scholars with full schedules; {nScholLow} scholars with too few; as low as {minINTS}; {nScholAvail} still have availability")
-    print(f"total of {nScheduled} interviews scheduled")
-
-MINtooFewInts = 1000 #store how many have too few interviews
-while FAILED: #this block will rerun everything if it fails, re-initialiing all variables/dictionaries
-    TOTTRIES += 1
-    if VERBOSE:
-        print(f"Try number {TOTTRIES}")
-        if DEBUGPAUSE:
-            user_entry = input("Continue? [y/n]")
-            if user_entry != 'y' and user_entry != "":
-                exit(1)
-
-    # Reset schedules
-    FACsched = {}
-    FACschedWhy = {}
-    nFACsched = {}
-    FACslots = {}
-    nFACslots = {}
-    SCHOLsched = {}
-    SCHOLschedWhy = {}
-    nSCHOLsched = {}
-    SCHOLslots = {}
-    nSCHOLslots = {}
-    F2S = {}
-    S2F = {}
-
-    # Initialize faculty schedules
-    for fac in Faculty:
-        if fac in facCancel:
-            continue
-        nFACslots[fac] = MAXInt  # default to max available
-        nFACsched[fac] = 0
-        FACsched[fac] = []
-        FACschedWhy[fac] = []
-
-        if DEBUG:
-            print(f"initializing faculty {fac}")
-        for i in range(MAXInt):
-            if FacAvail[fac][i] == 0:
-                FACsched[fac].append("NA")
-                FACschedWhy[fac].append("NA")
-                nFACslots[fac] -= 1
-            else:
-                FACsched[fac].append("")
-                FACschedWhy[fac].append("")
-                FACslots.setdefault(fac, {})[i] = 1
-    
-    # Initialize scholar schedules
-    for schol in Scholars:
-        nSCHOLsched[schol] = 0
-        nSCHOLslots[schol] = MAXInt
-        SCHOLsched[schol] = ["" for _ in range(MAXInt)]
-        SCHOLschedWhy[schol] = ["" for _ in range(MAXInt)]
-        for i in range(MAXInt):
-            SCHOLslots.setdefault(schol, {})[i] = 1
-
-
-    # First start with faculty interests
-    facmiss = {}
-    nfacmiss = 0
-    totfacmiss = 0
-    
-    for i in range(5):
-        facOrd = randomize_order(Faculty.keys())
-        for fac in facOrd:
-            if fac not in FacChoices:
-                continue
-            if i < len(FacChoices[fac]):
-                schol = FacChoices[fac][i]
-                if schol not in Scholars:
-                    continue
-                if nSCHOLsched[schol] < MAXInt:
-                    foundMatch = 0
-                    numbers = list(range(MAXInt))
-                    random.shuffle(numbers)
-                    for try_slot in numbers:
-                        if try_slot in SCHOLslots[schol] and try_slot in FACslots[fac]:
-                            FACsched[fac][try_slot] = schol
-                            FACschedWhy[fac][try_slot] = "FC"
-                            SCHOLsched[schol][try_slot] = fac
-                            SCHOLschedWhy[schol][try_slot] = "FC"
-                            del FACslots[fac][try_slot]
-                            nFACslots[fac] -= 1
-                            nFACsched[fac] += 1
-                            del SCHOLslots[schol][try_slot]
-                            nSCHOLslots[schol] -= 1
-                            nSCHOLsched[schol] += 1
-                            F2S.setdefault(fac, {})[schol] = True
-                            S2F.setdefault(schol, {})[fac] = True
-                            foundMatch = 1
-                            break
-                    if foundMatch == 0:
-                        if VERBOSE:
-                            print(f"{schol} can't match with {fac}, nSCHOLsched={nSCHOLsched[schol]}, nFACsched={nFACsched[fac]}")
-                        if fac not in facmiss:
-                            nfacmiss += 1
-                        facmiss[fac] = facmiss.get(fac, 0) + 1
-                        totfacmiss += 1
-
-    if VERBOSE:
-        print(f"{nfacmiss} faculty didn't get a slot with one of their top choices, {totfacmiss} overall:")
-        for fac in facmiss:
-            print(f"\t{fac}")
-
-    print("Incorporated faculty choices")
-    check_schedules()
-
-    # Now fill in schedule from scholar interests in the same way, but start with scholars with fewest interviews
-    scholmiss = {}
-    nrecipChoice = 0
-    for i in range(5):
-        #sort scholars with fewest interviews first
-        scholOrd = sorted(Scholars.keys(), key=lambda x: nSCHOLsched[x])
-        #scholOrd = randomize_order(Scholars.keys())
-        for schol in scholOrd:
-            if schol not in ScholChoices:
-                continue
-            if i < len(ScholChoices[schol]):
-                fac = ScholChoices[schol][i]
-                if fac not in Faculty or fac in facCancel:
-                    continue
-                if nFACslots[fac] == 0:
-                    continue
-                if fac in SCHOLsched[schol]: #already have an interview!
-                    nrecipChoice += 1
-                    continue
-                if nFACslots[fac] > 0:
-                    foundMatch = 0
-                    numbers = list(range(MAXInt))
-                    random.shuffle(numbers)
-                    for try_slot in numbers:
-                        if try_slot in SCHOLslots[schol] and try_slot in FACslots[fac]:
-                            FACsched[fac][try_slot] = schol
-                            FACschedWhy[fac][try_slot] = "SC"
-                            SCHOLsched[schol][try_slot] = fac
-                            SCHOLschedWhy[schol][try_slot] = "SC"
-                            del FACslots[fac][try_slot]
-                            nFACslots[fac] -= 1
-                            nFACsched[fac] += 1
-                            del SCHOLslots[schol][try_slot]
-                            nSCHOLslots[schol] -= 1
-                            nSCHOLsched[schol] += 1
-                            F2S.setdefault(fac, {})[schol] = True
-                            S2F.setdefault(schol, {})[fac] = True
-                            foundMatch = 1
-                            break
-
-                    if foundMatch == 0:
-                        if VERBOSE:
-                            print(f"{schol} can't match with {fac}, nFACsched={nFACsched[fac]}")
-                            print(f"schol {schol}:{SCHOLsched[schol]}")
-                            print(f"fac {fac}:{FACsched[fac]}")
-
-                        if schol not in scholmiss:
-                            scholmiss[schol] = 0
-                        scholmiss[schol] += 1
-
-    if VERBOSE:
-        print(f"{len(scholmiss)} scholars didn't match with one of their top choices, {sum(scholmiss.values())} overall")
-    
-    print(f"Incorporated scholar choices. {nrecipChoice} recipricol choice interviews")
-    check_schedules()
-
-    # Randomly fill in remaining slots according to interests, starting with scholars, based on university of interest, and those with fewest interviews
-    for TRIES in range(MAXInt):
-        #sort scholars with fewest interviews first
-        for schol in sorted(Scholars.keys(), key=lambda x: nSCHOLsched[x]):
-            if nSCHOLsched[schol] > TRIES: #skip those who already have more than TRIES interviews this round
-                continue
-
-            for fac in sorted(SFintMap[schol].keys(), key=lambda x: SFintMap[schol][x], reverse=True):     
-                if fac in facCancel:
-                    continue
-                if fac in SCHOLsched[schol] or nFACslots[fac] == 0:
-                    continue
-                found_match = False
-                numbers = list(range(MAXInt))
-                random.shuffle(numbers)
-                for try_slot in numbers:
-                    if try_slot in SCHOLslots[schol] and try_slot in FACslots[fac]:
-                        FACsched[fac][try_slot] = schol
-                        FACschedWhy[fac][try_slot] = "RA"
-                        SCHOLsched[schol][try_slot] = fac
-                        SCHOLschedWhy[schol][try_slot] = "RA"
-                        del FACslots[fac][try_slot]
-                        nFACslots[fac] -= 1
-                        nFACsched[fac] += 1
-                        del SCHOLslots[schol][try_slot]
-                        nSCHOLslots[schol] -= 1
-                        nSCHOLsched[schol] += 1
-                        F2S.setdefault(fac, {})[schol] = True
-                        S2F.setdefault(schol, {})[fac] = True
-                        found_match = True
-                        break
-                if found_match:
-                    break
-
-    print(f"Added random matches based on interests: Scholars")
-    check_schedules()
-
-    for fac in sorted(nFACsched.keys(), key=lambda x: nFACsched[x]):
-        if nFACsched[fac] > MINFacInt:
-            continue
-        if fac in facCancel:
-            continue
-        for schol in sorted(FSintMap[fac].keys(), key=lambda x: FSintMap[fac][x], reverse=True):
-            if schol in FACsched[fac] or nSCHOLslots[schol] == 0:
-                continue
-            if VERBOSE:
-                print(f"{fac}={nFACslots[fac]}; {schol}={nSCHOLslots[schol]}")
-            numbers = list(range(MAXInt))
-            random.shuffle(numbers)
-            for try_slot in numbers:
-                if try_slot in SCHOLslots[schol] and try_slot in FACslots[fac]:
-                    FACsched[fac][try_slot] = schol
-                    FACschedWhy[fac][try_slot] = "RA"
-                    SCHOLsched[schol][try_slot] = fac
-                    SCHOLschedWhy[schol][try_slot] = "RA"
-                    del FACslots[fac][try_slot]
-                    nFACslots[fac] -= 1
-                    nFACsched[fac] += 1
-                    del SCHOLslots[schol][try_slot]
-                    nSCHOLslots[schol] -= 1
-                    nSCHOLsched[schol] += 1
-                    F2S.setdefault(fac, {})[schol] = True
-                    S2F.setdefault(schol, {})[fac] = True
-                    break
-            if nFACsched[fac] > MINFacInt:
-                break
-
-    print(f"Added random matches based on interests: faculty")
-    check_schedules()
-
-    ## now lets add more random matches, ignoring university of interest for scholars. This will use the backup interest map
-    for TRIES in range(MAXInt):
-        for schol in sorted(Scholars.keys(), key=lambda x: nSCHOLsched[x]):
-            if nSCHOLsched[schol] > TRIES:
-                continue
-
-            for fac in sorted(SFintMapBK[schol].keys(), key=lambda x: SFintMapBK[schol][x], reverse=True):            
-                if fac in facCancel:
-                    continue
-                if fac in SCHOLsched[schol] or nFACslots[fac] == 0:
-                    continue
-                found_match = False
-                numbers = list(range(MAXInt))
-                random.shuffle(numbers)
-                for try_slot in numbers:
-                    if try_slot in SCHOLslots[schol] and try_slot in FACslots[fac]:
-                        FACsched[fac][try_slot] = schol
-                        FACschedWhy[fac][try_slot] = "RA"
-                        SCHOLsched[schol][try_slot] = fac
-                        SCHOLschedWhy[schol][try_slot] = "RA"
-                        del FACslots[fac][try_slot]
-                        nFACslots[fac] -= 1
-                        nFACsched[fac] += 1
-                        del SCHOLslots[schol][try_slot]
-                        nSCHOLslots[schol] -= 1
-                        nSCHOLsched[schol] += 1
-                        F2S.setdefault(fac, {})[schol] = True
-                        S2F.setdefault(schol, {})[fac] = True
-                        found_match = True
-                        break
-                if found_match:
-                    break
-    print(f"Added random matches based on interests including universities Scholars did not select")
-    check_schedules()
+        origin = None
+        # without the local search, a try that can no longer match the best schedule is abandoned between passes
+        state, nrecipChoice = build_schedule(model, rng, metrics=metrics, abortAbove=None if best is None else best[3][0])
 
     # Check how many interviews everyone got
-    facinthist = [0] * (MAXInt + 1)
-    scholinthist = [0] * (MAXInt + 1)
-    facfillhist = [0] * (MAXInt + 1)
-    factoofew = {}
-    scholtoofew = {}
-
-    for fac in Faculty:
-        if fac in facCancel:
-            continue
-        facinthist[nFACsched[fac]] += 1
-        empty = MAXInt - nFACslots[fac]
-        facfillhist[empty] += 1
-        if nFACsched[fac] < MINFacInt:
-            factoofew[fac] = True
-
-    for schol in Scholars:
-        scholinthist[nSCHOLsched[schol]] += 1
-        if nSCHOLsched[schol] < MINScholInt:
-            scholtoofew[schol] = True
+    facinthist, scholinthist, facfillhist, factoofew, scholtoofew = tally(state, model)
+    # one record per round: tries run (restarts are all tries after the first) and the people left below minimum
+    roundTries = TOTTRIES - triesBefore
+    metrics.record("scheduling round", time.perf_counter() - tryStart, tries=roundTries,
+                   restarts=roundTries if triesBefore else roundTries - 1, facmiss=len(factoofew), scholmiss=len(scholtoofew))
 
     if VERBOSE:
         print("\nN\t#FacInt\t#Schols")
@@ -1158,86 +360,97 @@ while FAILED: #this block will rerun everything if it fails, re-initialiing all
         for schol in sorted(scholtoofew):
             print(f"\t{schol}")
 
-    if (len(factoofew) > 0 or len(scholtoofew) > 0) and TOTTRIES < MAXTRIES:
+    deficit = len(factoofew) + len(scholtoofew)
+    rank = schedule_rank(state, model, deficit)
+    if best is None or rank < best[3]:
+        runInfo = [["Seed", str(SEED)], ["Solver", "repair" if REPAIR else SOLVER], ["Try", TOTTRIES]]
+        if not REPAIR and SOLVER != "milp":
+            runInfo += [["Slot strategy", SLOTSTRATEGY], ["Local search", LOCALSEARCH]]
+        if NSHARDS > 1 and not REPAIR and SOLVER != "milp":
+            runInfo += [["Shards", len(shardPlan)], ["Workers", NWORKERS], ["Shard seed", str(origin)]]
+        elif NWORKERS > 1 and not REPAIR and SOLVER != "milp":
+            # the kept try is try number origin[1] of the worker stream random.Random(origin[0])
+            runInfo += [["Workers", NWORKERS], ["Stream seed", str(origin[0])], ["Stream try", origin[1]]]
+        best = (state, nrecipChoice, runInfo, rank)
+        sinceBest = 0
+        checkpointDue = True
         if VERBOSE:
+            print(f"New best schedule: {deficit} with too few interviews, {-rank[1]} interviews, {-rank[2]} with a chosen partner")
+    else:
+        sinceBest += roundTries
+    bestDeficit = best[3][0]
+
+    if PATIENCE is not None and sinceBest >= PATIENCE:
+        print(f"No better schedule in the last {sinceBest} tries; keeping the best one")
+        FAILED = 0
+    elif (deficit > FLOOR or PATIENCE is not None) and TOTTRIES < MAXTRIES:
+        if VERBOSE and deficit > FLOOR:
             print(f"FAILED! factoofew={len(factoofew)}; scholtoofew={len(scholtoofew)}")
-        FAILED = 1  # Try again
-    #else:
-        #FAILED = 0  # Done
-
-        if VERBOSE:
-            print(f"\n\n{len(factoofew)} faculty and {len(scholtoofew)} scholars with too few interviews")
-            print("Faculty with too few interviews:")
-            for fac in sorted(factoofew):
-                print(f"\t{fac}")
-            print("Scholars with too few interviews:")
-            for schol in sorted(scholtoofew):
-                print(f"\t{schol}")
-            print("N\t#Faculty\t#Scholars")
-            for i in range(MAXInt + 1):
-                print(f"{i}\t{facfillhist[i]}\t{scholinthist[i]}")
-
-
-        # Check how many interviews everyone got
-        facinthist = [0] * (MAXInt + 1)
-        scholinthist = [0] * (MAXInt + 1)
-        facfillhist = [0] * (MAXInt + 1)
-        factoofew = {}
-        scholtoofew = {}
-
-        for fac in Faculty:
-            facinthist[nFACsched[fac]] += 1
-            empty = MAXInt - nFACslots[fac]
-            facfillhist[empty] += 1
-            if nFACsched[fac] < MINFacInt:
-                factoofew[fac] = True
-
-        for schol in Scholars:
-            scholinthist[nSCHOLsched[schol]] += 1
-            if nSCHOLsched[schol] < MINScholInt:
-                scholtoofew[schol] = True
-        
-        if VERBOSE:
-            print(f"\n\n{len(factoofew)} faculty and {len(scholtoofew)} scholars with too few interviews")
-            print("Faculty with too few interviews:")
-            for fac in sorted(factoofew):
-                print(f"\t{fac}")
-            print("Scholars with too few interviews:")
-            for schol in sorted(scholtoofew):
-                print(f"\t{schol}")
             print("\nHere is a table showing the number of faculty and scholars who have N interviews:")
             print("\nN\t#Faculty\t#Scholars")
             for i in range(MAXInt + 1):
                 print(f"{i}\t{facfillhist[i]:8d}\t{scholinthist[i]:9d}")
-        
-    if len(factoofew) + len(scholtoofew) < MINtooFewInts:
-        MINtooFewInts = len(factoofew) + len(scholtoofew)
-        if TOTTRIES >= MAXTRIES:
-            print(f"Try number {TOTTRIES}, faculty with too few interviews={len(factoofew)}; scholars with too few={len(scholtoofew)}; total={MINtooFewInts}")
-            print("\nHere is a table showing the number of faculty and scholars who have N interviews:")
-            print("\nN\t#Fac\t#Scholars")
-            #format so output columns line up by forcing entries to have defined width
-            for i in range(MAXInt + 1):
-                print(f"{i}\t{facfillhist[i]:8d}\t{scholinthist[i]:9d}")
+        FAILED = 1  # Try again
+    elif bestDeficit <= FLOOR:
+        FAILED = 0  # Done
+    if REPAIR or SOLVER == "milp":
+        FAILED = 0  # a repair or an exact solve is deterministic, so trying again would give the same schedule
+
+    outOfTime = TIMEBUDGET is not None and time.time() - startTime >= TIMEBUDGET
+    if FAILED and TOTTRIES >= MAXTRIES and not BATCH and not outOfTime and not INTERRUPTED:
+        facinthist, scholinthist, facfillhist, factoofew, scholtoofew = tally(best[0], model)
+        print(f"Try number {TOTTRIES}, best schedule has faculty with too few interviews={len(factoofew)}; scholars with too few={len(scholtoofew)}; total={bestDeficit}")
+        print("\nHere is a table showing the number of faculty and scholars who have N interviews:")
+        print("\nN\t#Fac\t#Scholars")
+        #format so output columns line up by forcing entries to have defined width
+        for i in range(MAXInt + 1):
+            print(f"{i}\t{facfillhist[i]:8d}\t{scholinthist[i]:9d}")
 
-            answer = input("Try again? (y/n)")
-            if answer == "n":
-                FAILED = 0
-                break
+        answer = input("Try again? (y/n)")
+        if answer == "n":
+            FAILED = 0
+        else:
             MAXTRIES += 20
+    if FAILED and (outOfTime or INTERRUPTED or (BATCH and TOTTRIES >= MAXTRIES)):
+        print(f"Stopped after {TOTTRIES} tries in {time.time() - startTime:.1f}s; keeping the best schedule, with {bestDeficit} people with too few interviews")
+        FAILED = 0
+    if FAILED and checkpointDue and time.time() - lastCheckpoint >= CHECKPOINTEVERY:
+        save_checkpoint()
+        checkpointDue = False
+        lastCheckpoint = time.time()
     #input("Press enter to continue...")
 
+signal.signal(signal.SIGINT, signal.default_int_handler)
+save_checkpoint()
+
+# Keep the best schedule found
+state, nrecipChoice, runInfo, rank = best
+FACsched = state.FACsched
+FACschedWhy = state.FACschedWhy
+nFACsched = state.nFACsched
+SCHOLsched = state.SCHOLsched
+SCHOLschedWhy = state.SCHOLschedWhy
+nSCHOLsched = state.nSCHOLsched
+
 
 
 print("Made a schedule...")
 
+# How good it is beyond the minimums: choices kept, affinity, fairness and idle gaps; see score.py
+with metrics.phase("score"):
+    scorer = ScheduleScorer(model)
+    scores = scorer.score(*scorer.encode(state))
+scorer.report(scores)
+
 # Let's print out the schedules!
 
 # Create a Pandas DataFrame for the schedules and save to .xlsx files
 totScholInts = 0
 totFacInts = 0
 GAPCHR = ","
+MEETINGLINKSURL = "https://docs.google.com/spreadsheets/d/1BByK0i4PcavbzGxVeRPs66lmdhZwxXjQNVwW0iQpCV4/edit?usp=sharing"
 
+exportStart = time.perf_counter()
 try:
     # Faculty schedule: print with scholar names on first sheet, and reasons why on second sheet: FC=faculty choice; SC=scholar choice; RA=random assignment
     facSchedFile = os.path.join(DIROUT, "CompleteFacultySchedule.xlsx")
@@ -1269,6 +482,10 @@ try:
         df_fac_schedule_why = pd.DataFrame(fac_schedule_why, columns=["FacultyName"] + TIMES)
         df_fac_schedule_why.to_excel(writer, index=False, sheet_name="AssignmentReasons")
 
+        # Record how the schedule was made, so it can be regenerated (seeds as text: Excel numbers only keep 15 digits)
+        pd.DataFrame(runInfo, columns=["Setting", "Value"]).to_excel(writer, index=False, sheet_name="RunInfo")
+        pd.DataFrame(scorer.rows(scores), columns=["Metric", "Value"]).to_excel(writer, index=False, sheet_name="Quality")
+
         # Access the xlsxwriter workbook and worksheet objects
         workbook = writer.book
         worksheet = writer.sheets["FacultySchedule"]
@@ -1290,15 +507,17 @@ try:
                 ws_reasons.set_column(col_idx, col_idx, width)
 
         # Add the link to the meeting links spreadsheet
-        worksheet.write_url(len(df_fac_schedule) + 2, 0, "https://docs.google.com/spreadsheets/d/1BByK0i4PcavbzGxVeRPs66lmdhZwxXjQNVwW0iQpCV4/edit?usp=sharing", string='Please find all meeting links here')
+        worksheet.write_url(len(df_fac_schedule) + 2, 0, MEETINGLINKSURL, string='Please find all meeting links here')
 
     print(f"There are a total of {totFacInts} faculty interviews")
 except Exception as e:
     print(f"Failed to create faculty schedule. Error: {e}")
+metrics.record("export: complete faculty schedule", time.perf_counter() - exportStart, people=len(Faculty) - len(facCancel))
 
 
 
 # Scholar schedule, also with reasons why on second sheet
+exportStart = time.perf_counter()
 try:
     scholSchedFile = os.path.join(DIROUT, "CompleteScholarSchedule.xlsx")
     with pd.ExcelWriter(scholSchedFile, engine='xlsxwriter') as writer:
@@ -1327,6 +546,9 @@ try:
         df_schol_schedule_why = pd.DataFrame(schol_schedule_why, columns=["ScholarName"] + TIMES)
         df_schol_schedule_why.to_excel(writer, index=False, sheet_name="AssignmentReasons")
 
+        pd.DataFrame(runInfo, columns=["Setting", "Value"]).to_excel(writer, index=False, sheet_name="RunInfo")
+        pd.DataFrame(scorer.rows(scores), columns=["Metric", "Value"]).to_excel(writer, index=False, sheet_name="Quality")
+
         # Access the xlsxwriter workbook and worksheet objects
         workbook = writer.book
         worksheet = writer.sheets["ScholarSchedule"]
@@ -1354,134 +576,84 @@ try:
         worksheet.set_row(0, None, header_format)
 
         # Add the link to the meeting links spreadsheet
-        worksheet.write_url(len(df_schol_schedule) + 2, 0, "https://docs.google.com/spreadsheets/d/1BByK0i4PcavbzGxVeRPs66lmdhZwxXjQNVwW0iQpCV4/edit?usp=sharing", string='Please find all meeting links here')
+        worksheet.write_url(len(df_schol_schedule) + 2, 0, MEETINGLINKSURL, string='Please find all meeting links here')
 
     print(f"There are a total of {totScholInts} scholar interviews")
 except Exception as e:
     print(f"Failed to create scholar schedule. Error: {e}")
+metrics.record("export: complete scholar schedule", time.perf_counter() - exportStart, people=len(Scholars))
 
-# Print out individual scholar schedules
-try:
-    scholar_schedules_dir = os.path.join(DIROUT, "ScholarSchedules")
-    if not os.path.exists(scholar_schedules_dir):
-        os.makedirs(scholar_schedules_dir)
+# Print out individual scholar and faculty schedules; see export.EXPORTMODES for the options
+EXPORTMODE = args.export_mode  # "files" for one workbook per person; "workbook" for one sheet per person in a single workbook; "zip"
+EXPORTWORKERS = args.export_workers  # number of worker processes writing the individual files
 
+exportStart = time.perf_counter()
+try:
+    scholar_schedules = []
     for schol in Scholars.keys():
-        scholSchedFile = os.path.join(scholar_schedules_dir, f"{scholE2N[schol]}.xlsx")
-        with pd.ExcelWriter(scholSchedFile, engine='xlsxwriter') as writer:
-            scholar_schedule = [[scholE2N[schol]] + [facultyEMAILtoNAME[SCHOLsched[schol][i]] if SCHOLsched[schol][i] in facultyEMAILtoNAME else "NA" for i in range(MAXInt)]]
-            df_scholar_schedule = pd.DataFrame(scholar_schedule, columns=["ScholarName"] + TIMES)
-            df_scholar_schedule.to_excel(writer, index=False, sheet_name="ScholarSchedule")
-
-            # Access the xlsxwriter workbook and worksheet objects
-            workbook = writer.book
-            worksheet = writer.sheets["ScholarSchedule"]
-
-            # Set column widths to match header lengths (with small padding)
-            for col_idx, col_name in enumerate(df_scholar_schedule.columns):
-                width = max(len(str(col_name)), 8) + 2
-                worksheet.set_column(col_idx, col_idx, width)
-
-            # Left-align header row for readability
-            header_format = workbook.add_format({"align": "left"})
-            worksheet.set_row(0, None, header_format)
-
-            # Add the link to the meeting links spreadsheet
-            worksheet.write_url(len(df_scholar_schedule) + 2, 0, "https://docs.google.com/spreadsheets/d/1BByK0i4PcavbzGxVeRPs66lmdhZwxXjQNVwW0iQpCV4/edit?usp=sharing", string='Please find all meeting links here')
-
-            # Add list of other faculty of interest who were not scheduled
-            unscheduled_faculty = []
-            if VERBOSE:
-                print(f"Checking for unscheduled faculty for scholar {scholE2N[schol]} {schol}...")
-            if schol in ScholChoices:
-                for fac in ScholChoices[schol]:
-                    if fac not in SCHOLsched[schol]:
-                        unscheduled_faculty.append(fac)
-                        if VERBOSE:
-                            print(f"\tFound scholar choice faculty of interest: {fac}")
-                # now add faculty who selected the scholar but were not scheduled
-            for fac in FacChoices:
-                if schol not in FacChoices[fac]:
-                    continue
-                if fac not in SCHOLsched[schol] and fac not in unscheduled_faculty:
+        # Add list of other faculty of interest who were not scheduled
+        unscheduled_faculty = []
+        if VERBOSE:
+            print(f"Checking for unscheduled faculty for scholar {scholE2N[schol]} {schol}...")
+        if schol in ScholChoices:
+            for fac in ScholChoices[schol]:
+                if fac not in SCHOLsched[schol]:
                     unscheduled_faculty.append(fac)
                     if VERBOSE:
-                        print(f"\tFound faculty who selected scholar but were not scheduled: {fac}")
-            if unscheduled_faculty:
-                worksheet.write(len(df_scholar_schedule) + 4, 0, "Faculty of Interest Not Scheduled:")
-                #print alphabetically sorted list of faculty names and emails
-                unscheduled_faculty.sort(key=lambda x: facultyEMAILtoNAME[x])
-                for idx, fac in enumerate(unscheduled_faculty):
-                    worksheet.write(len(df_scholar_schedule) + 5 + idx, 0, facultyEMAILtoNAME[fac])
-                    worksheet.write(len(df_scholar_schedule) + 5 + idx, 1, fac)
-            else:
+                        print(f"\tFound scholar choice faculty of interest: {fac}")
+            # now add faculty who selected the scholar but were not scheduled
+        for fac in ScholChosenBy.get(schol, []):
+            if fac not in SCHOLsched[schol] and fac not in unscheduled_faculty:
+                unscheduled_faculty.append(fac)
                 if VERBOSE:
-                    print(f"\tNo unscheduled faculty of interest found for scholar {scholE2N[schol]} {schol}")
+                    print(f"\tFound faculty who selected scholar but were not scheduled: {fac}")
+        if not unscheduled_faculty and VERBOSE:
+            print(f"\tNo unscheduled faculty of interest found for scholar {scholE2N[schol]} {schol}")
+        #alphabetically sorted list of faculty names and emails
+        unscheduled_faculty.sort(key=lambda x: facultyEMAILtoNAME[x])
+        slots = [facultyEMAILtoNAME[SCHOLsched[schol][i]] if SCHOLsched[schol][i] in facultyEMAILtoNAME else "NA" for i in range(MAXInt)]
+        scholar_schedules.append((scholE2N[schol], slots, [(facultyEMAILtoNAME[fac], fac) for fac in unscheduled_faculty]))
+
+    export_schedules(scholar_schedules, os.path.join(DIROUT, "ScholarSchedules"), "ScholarName",
+                     "Faculty of Interest Not Scheduled:", TIMES, MEETINGLINKSURL, EXPORTMODE, EXPORTWORKERS, "ScholarSchedule")
 except Exception as e:
-    print(f"Failed to create individual scholar schedule for {schol}. Error: {e}")
+    print(f"Failed to create individual scholar schedules. Error: {e}")
+metrics.record("export: scholar schedules", time.perf_counter() - exportStart, people=len(Scholars))
 
-# Print out individual faculty schedules
+exportStart = time.perf_counter()
 try:
-    faculty_schedules_dir = os.path.join(DIROUT, "FacultySchedules")
-    if not os.path.exists(faculty_schedules_dir):
-        os.makedirs(faculty_schedules_dir)
-
+    faculty_schedules = []
     for fac in Faculty.keys():
         if fac in facCancel:
             continue
-        facSchedFile = os.path.join(faculty_schedules_dir, f"{facultyEMAILtoNAME[fac]}.xlsx")
-        with pd.ExcelWriter(facSchedFile, engine='xlsxwriter') as writer:
-            faculty_schedule = [[facultyEMAILtoNAME[fac]] + [scholE2N[FACsched[fac][i]] if FACsched[fac][i] in scholE2N else "NA" for i in range(MAXInt)]]
-            df_faculty_schedule = pd.DataFrame(faculty_schedule, columns=["FacultyName"] + TIMES)
-            df_faculty_schedule.to_excel(writer, index=False, sheet_name="FacultySchedule")
-
-            # Access the xlsxwriter workbook and worksheet objects
-            workbook = writer.book
-            worksheet = writer.sheets["FacultySchedule"]
-
-            # Set column widths to match header lengths (with small padding)
-            for col_idx, col_name in enumerate(df_faculty_schedule.columns):
-                width = max(len(str(col_name)), 8) + 2
-                worksheet.set_column(col_idx, col_idx, width)
-
-            # Left-align header row for readability
-            header_format = workbook.add_format({"align": "left"})
-            worksheet.set_row(0, None, header_format)
-
-            # Add the link to the meeting links spreadsheet
-            worksheet.write_url(len(df_faculty_schedule) + 2, 0, "https://docs.google.com/spreadsheets/d/1BByK0i4PcavbzGxVeRPs66lmdhZwxXjQNVwW0iQpCV4/edit?usp=sharing", string='Please find all meeting links here')
-
-            # now add list of scholars who selected the faculty or selected by faculty but were not scheduled
-            unscheduled_scholars = []
-            if VERBOSE:
-                print(f"Checking for unscheduled scholars for faculty {facultyEMAILtoNAME[fac]} {fac}...")
-            if fac in FacChoices:
-                for schol in FacChoices[fac]:
-                    if schol not in FACsched[fac]:
-                        unscheduled_scholars.append(schol)
-                        if VERBOSE:
-                            print(f"\tFound faculty choice scholar of interest: {schol}")
-            # now add scholars who selected the faculty but were not scheduled
-            for schol in ScholChoices:
-                if fac not in ScholChoices[schol]:
-                    continue
-                if schol not in FACsched[fac] and schol not in unscheduled_scholars:
+        # now add list of scholars who selected the faculty or selected by faculty but were not scheduled
+        unscheduled_scholars = []
+        if VERBOSE:
+            print(f"Checking for unscheduled scholars for faculty {facultyEMAILtoNAME[fac]} {fac}...")
+        if fac in FacChoices:
+            for schol in FacChoices[fac]:
+                if schol not in FACsched[fac]:
                     unscheduled_scholars.append(schol)
                     if VERBOSE:
-                        print(f"\tFound scholar who selected faculty but were not scheduled: {schol}")
-            if unscheduled_scholars:
-                worksheet.write(len(df_faculty_schedule) + 4, 0, "Scholars of Interest Not Scheduled:")
-                #print alphabetically sorted list of scholar names and emails
-                unscheduled_scholars.sort(key=lambda x: scholE2N[x])
-                for idx, schol in enumerate(unscheduled_scholars):
-                    worksheet.write(len(df_faculty_schedule) + 5 + idx, 0, scholE2N[schol])
-                    worksheet.write(len(df_faculty_schedule) + 5 + idx, 1, schol)
-            else:
+                        print(f"\tFound faculty choice scholar of interest: {schol}")
+        # now add scholars who selected the faculty but were not scheduled
+        for schol in FacChosenBy.get(fac, []):
+            if schol not in FACsched[fac] and schol not in unscheduled_scholars:
+                unscheduled_scholars.append(schol)
                 if VERBOSE:
-                    print(f"\tNo unscheduled scholars of interest found for faculty {facultyEMAILtoNAME[fac]} {fac}")
-
+                    print(f"\tFound scholar who selected faculty but were not scheduled: {schol}")
+        if not unscheduled_scholars and VERBOSE:
+            print(f"\tNo unscheduled scholars of interest found for faculty {facultyEMAILtoNAME[fac]} {fac}")
+        #alphabetically sorted list of scholar names and emails
+        unscheduled_scholars.sort(key=lambda x: scholE2N[x])
+        slots = [scholE2N[FACsched[fac][i]] if FACsched[fac][i] in scholE2N else "NA" for i in range(MAXInt)]
+        faculty_schedules.append((facultyEMAILtoNAME[fac], slots, [(scholE2N[schol], schol) for schol in unscheduled_scholars]))
+
+    export_schedules(faculty_schedules, os.path.join(DIROUT, "FacultySchedules"), "FacultyName",
+                     "Scholars of Interest Not Scheduled:", TIMES, MEETINGLINKSURL, EXPORTMODE, EXPORTWORKERS, "FacultySchedule")
 except Exception as e:
     print(f"Failed to create individual faculty schedules. Error: {e}")
+metrics.record("export: faculty schedules", time.perf_counter() - exportStart, people=len(Faculty) - len(facCancel))
 
 # # Print final meeting link list
 # try:
@@ -1495,6 +667,10 @@ except Exception as e:
 
 print("Schedules and meeting links have been saved.")
 
+if args.summary:
+    metrics.summary()
+metrics.close()
+
 ## Changes needed:
 # break the big block of code down into more functions followed by a main function
 # when adding interviews based on interests, only add for individuals with the fewest interviews (e.g. all the 2s, then all the 3s, etc)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Bulk writer for the individual schedules (one per scholar and one per faculty member).
+Sheets are written cell by cell with xlsxwriter (no DataFrames), with one set of formats per workbook,
+and the per-person files are spread over a pool of worker processes. Instead of one file per person the schedules
+can also go into a single workbook with one sheet per person, or into one zip file.
+"""
+
+import io
+import multiprocessing
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import xlsxwriter
+
+EXPORTMODES = ("files", "workbook", "zip")
+CHUNKSIZE = 50  # people per task handed to a worker
+# Each sheet is a dozen cells, so workbooks are assembled in memory; constant_memory would instead go through a
+# temporary file per sheet, which is several times slower for these small sheets. Use {"constant_memory": True}
+# to keep memory flat if the sheets ever grow large.
+WORKBOOKOPTIONS = {"in_memory": True}
+
+
+def make_formats(workbook):
+    # bold, boxed and left-aligned, like the pandas header row with the left alignment the schedules used
+    return {"header": workbook.add_format({"bold": True, "border": 1, "align": "left"})}
+
+
+# Write one person's schedule: header row, their row of interviews, the meeting links URL and, if any,
+# the people of interest who were not scheduled. Rows are written top to bottom, so constant_memory mode works too.
+# person is (name, slots, missing) where slots has one entry per time and missing is a list of (name, email).
+def write_sheet(worksheet, formats, person, nameHeader, missingTitle, times, link):
+    name, slots, missing = person
+    header = [nameHeader] + list(times)
+    for col, colName in enumerate(header):
+        worksheet.set_column(col, col, max(len(str(colName)), 8) + 2)
+    worksheet.write_row(0, 0, header, formats["header"])
+    worksheet.write_row(1, 0, [name] + list(slots))
+    worksheet.write_url(3, 0, link, string='Please find all meeting links here')
+    if missing:
+        worksheet.write(5, 0, missingTitle)
+        for idx, (otherName, email) in enumerate(missing):
+            worksheet.write_row(6 + idx, 0, [otherName, email])
+
+
+def write_workbook(target, people, nameHeader, missingTitle, times, link, sheetNames=None):
+    workbook = xlsxwriter.Workbook(target, WORKBOOKOPTIONS)
+    formats = make_formats(workbook)
+    for k, person in enumerate(people):
+        worksheet = workbook.add_worksheet(sheetNames[k] if sheetNames else nameHeader)
+        write_sheet(worksheet, formats, person, nameHeader, missingTitle, times, link)
+    workbook.close()
+
+
+# Excel sheet names: at most 31 characters, none of []:*?/\ and unique regardless of case
+def sheet_names(names):
+    used = set()
+    out = []
+    for name in names:
+        base = re.sub(r"[\[\]:*?/\\]", "", name)[:31] or "Sheet"
+        sheet = base
+        n = 1
+        while sheet.lower() in used:
+            n += 1
+            suffix = f" ({n})"
+            sheet = base[:31 - len(suffix)] + suffix
+        used.add(sheet.lower())
+        out.append(sheet)
+    return out
+
+
+def _write_files(people, outDir, nameHeader, missingTitle, times, link, sheetTitle):
+    for person in people:
+        write_workbook(os.path.join(outDir, f"{person[0]}.xlsx"), [person], nameHeader, missingTitle, times, link,
+                       [sheetTitle])
+    return len(people)
+
+
+def _zip_entries(people, nameHeader, missingTitle, times, link, sheetTitle):
+    entries = []
+    for person in people:
+        buffer = io.BytesIO()
+        write_workbook(buffer, [person], nameHeader, missingTitle, times, link, [sheetTitle])
+        entries.append((f"{person[0]}.xlsx", buffer.getvalue()))
+    return entries
+
+
+def run_chunks(func, people, nWorkers, *args):
+    chunks = [people[i:i + CHUNKSIZE] for i in range(0, len(people), CHUNKSIZE)]
+    if nWorkers <= 1 or len(chunks) <= 1:
+        return [func(chunk, *args) for chunk in chunks]
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with ProcessPoolExecutor(max_workers=nWorkers, mp_context=ctx) as pool:
+        return list(pool.map(func, chunks, *[[a] * len(chunks) for a in args]))
+
+
+# Write everyone's individual schedule to outDir, as
+#   "files": outDir/<name>.xlsx for each person (the default)
+#   "workbook": a single outDir.xlsx with one sheet per person
+#   "zip": a single outDir.zip holding the per-person workbooks
+# The per-person workbooks name their one sheet sheetTitle (nameHeader if None); the single workbook names each sheet
+# after its person.
+# Returns the path written (the directory for "files").
+def export_schedules(people, outDir, nameHeader, missingTitle, times, link, mode="files", nWorkers=1, sheetTitle=None):
+    sheetTitle = sheetTitle or nameHeader
+    if mode == "files":
+        os.makedirs(outDir, exist_ok=True)
+        run_chunks(_write_files, people, nWorkers, outDir, nameHeader, missingTitle, times, link, sheetTitle)
+        return outDir
+    if mode == "workbook":
+        target = outDir.rstrip(os.sep) + ".xlsx"
+        write_workbook(target, people, nameHeader, missingTitle, times, link, sheet_names([p[0] for p in people]))
+        return target
+    if mode == "zip":
+        target = outDir.rstrip(os.sep) + ".zip"
+        with zipfile.ZipFile(target, "w", zipfile.ZIP_STORED) as archive:  # xlsx files are already compressed
+            for entries in run_chunks(_zip_entries, people, nWorkers, nameHeader, missingTitle, times, link, sheetTitle):
+                for arcname, data in entries:
+                    archive.writestr(arcname, data)
+        return target
+    raise ValueError(f"unknown export mode {mode}; expected one of {EXPORTMODES}")
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Local search on a finished greedy schedule, for the few people it leaves below their minimum.
+Rather than throwing the schedule away, each short person is paired with someone they could meet by, in order:
+  - placing the interview in a slot that is open for both of them,
+  - moving other interviews to open such a slot: a chain of moves, where an interview that is in the way may itself
+    push one more interview aside, or swap slots with it within the same person's day,
+  - ejecting an interview of the partner with someone who has interviews to spare, and giving that slot to the short
+    person; the ejected person is then offered a new interview if one can be placed directly.
+Every candidate is scored by the change in pair value (chosen pairs first, then interest affinity), so the partner
+and the ejected interview are the ones that cost the least. A person's partners are ranked with one vector operation
+over their row of the affinity matrices, by registry id.
+"""
+
+import numpy as np
+
+from slots import set_bits
+
+CHOSENWEIGHT = 1000  # a pair where one side chose the other outweighs any interest overlap
+MOVEDEPTH = 2  # interviews that may be pushed aside, one after the other, to open a slot
+EJECTPARTNERS = 50  # best partners considered for an ejection; beyond these the gain is rarely worth the search
+MAXPASSES = 10  # passes over the short people; a pass that fixes nobody ends the search
+
+
+# Value of an interview between fac and schol: CHOSENWEIGHT if either chose the other, plus their interest affinity
+def pair_value(model, fac, schol):
+    affinity = model.affinity
+    i = affinity.facIndex[fac]
+    j = affinity.scholIndex[schol]
+    chosen = schol in model.FacChoices.get(fac, ()) or fac in model.ScholChoices.get(schol, ())
+    return CHOSENWEIGHT * chosen + int(affinity.inUni[i, j]) + int(affinity.backup[i, j])
+
+
+# FC if the faculty chose the scholar, SC if the scholar chose the faculty, otherwise RA
+def pair_reason(model, fac, schol):
+    if schol in model.FacChoices.get(fac, ()):
+        return "FC"
+    if fac in model.ScholChoices.get(schol, ()):
+        return "SC"
+    return "RA"
+
+
+# Partners for the people of one schedule, ranked by pair value over affinity rows (ids are registry ids)
+class PartnerTable:
+    __slots__ = ("model", "facIDs", "scholIDs", "activeFac", "activeSchol")
+
+    def __init__(self, state, model):
+        self.model = model
+        self.facIDs = model.affinity.facIDs
+        self.scholIDs = model.affinity.scholIDs
+        self.activeFac = np.array([fac in state.facFree for fac in self.facIDs], dtype=bool)
+        self.activeSchol = np.array([schol in state.scholFree for schol in self.scholIDs], dtype=bool)
+
+    # Everyone a person could still meet, as (pair value, faculty, scholar) from the highest pair value down;
+    # ties keep registration order
+    def pairs(self, state, person, isFac):
+        model = self.model
+        affinity = model.affinity
+        if isFac:
+            i = affinity.facIndex[person]
+            values = affinity.inUni[i].astype(np.int32) + affinity.backup[i]
+            index = affinity.scholIndex
+            chosen = list(model.FacChoices.get(person, [])) + list(model.FacChosenBy.get(person, []))
+            current = state.FACsched[person]
+            active = self.activeSchol
+        else:
+            j = affinity.scholIndex[person]
+            values = affinity.inUni[:, j].astype(np.int32) + affinity.backup[:, j]
+            index = affinity.facIndex
+            chosen = list(model.ScholChoices.get(person, [])) + list(model.ScholChosenBy.get(person, []))
+            current = state.SCHOLsched[person]
+            active = self.activeFac
+        values[[index[other] for other in chosen if other in index]] += CHOSENWEIGHT
+        values[[index[other] for other in current if other in index]] = 0  # already meeting
+        values[~active] = 0
+        order = np.flatnonzero(values > 0)
+        order = order[np.argsort(-values[order], kind="stable")]
+        if isFac:
+            return [(int(values[j]), person, self.scholIDs[j]) for j in order]
+        return [(int(values[i]), self.facIDs[i], person) for i in order]
+
+
+# Is slot t open for both fac and schol?
+def is_open(state, fac, schol, t):
+    return (state.facFree[fac] & state.scholFree[schol]) >> t & 1
+
+
+# Take back the moves from moved[start] on. Needed when moves that freed a slot also filled a capped session (an
+# interview moved into one of its slots), which closes the slot again for that person. A chain moves each interview
+# once, but may swap two of them, so all of them are taken out before any goes back.
+def undo_moves(state, moved, start):
+    undone = moved[start:]
+    del moved[start:]
+    whys = []
+    for fac, schol, oldSlot, newSlot in undone:
+        whys.append(state.FACschedWhy[fac][newSlot])
+        state.unassign(fac, schol, newSlot)
+    for (fac, schol, oldSlot, newSlot), why in zip(undone, whys):
+        state.assign(fac, schol, oldSlot, why)
+
+
+# Move the interview fac-schol out of slot t, never into a slot in reserved. If every other slot is blocked for one of
+# them, the interview in the way may be moved too (up to depth interviews deep), including into t, which swaps the two
+# interviews within that person's day. Returns True if done; otherwise the schedule is left as it was.
+def relocate(state, fac, schol, t, depth, reserved, moved):
+    why = state.FACschedWhy[fac][t]
+    blocked = reserved | (1 << t)
+    common = state.facFree[fac] & state.scholFree[schol] & ~blocked
+    if common:
+        u = next(set_bits(common))
+        state.unassign(fac, schol, t)
+        state.assign(fac, schol, u, why)
+        moved.append((fac, schol, t, u))
+        return True
+    if depth == 0:
+        return False
+    state.unassign(fac, schol, t)
+    # schol is busy at u with another faculty member (or u is closed for schol by a session capacity)
+    for u in set_bits(state.facFree[fac] & ~state.scholFree[schol] & ~blocked):
+        other = state.SCHOLsched[schol][u]
+        if other == "":
+            continue
+        mark = len(moved)
+        if relocate(state, other, schol, u, depth - 1, reserved | (1 << u), moved):
+            if is_open(state, fac, schol, u):
+                state.assign(fac, schol, u, why)
+                moved.append((fac, schol, t, u))
+                return True
+            undo_moves(state, moved, mark)
+    # fac is busy at u with another scholar
+    for u in set_bits(state.scholFree[schol] & ~state.facFree[fac] & ~blocked):
+        other = state.FACsched[fac][u]
+        if other == "NA" or other == "":
+            continue
+        mark = len(moved)
+        if relocate(state, fac, other, u, depth - 1, reserved | (1 << u), moved):
+            if is_open(state, fac, schol, u):
+                state.assign(fac, schol, u, why)
+                moved.append((fac, schol, t, u))
+                return True
+            undo_moves(state, moved, mark)
+    state.assign(fac, schol, t, why)
+    return False
+
+
+# Open a slot for fac and schol by moving interviews of one of them out of the way; returns the slot or -1
+def open_slot(state, fac, schol, moved):
+    for t in set_bits(state.facFree[fac] & ~state.scholFree[schol]):
+        other = state.SCHOLsched[schol][t]
+        mark = len(moved)
+        if other != "" and relocate(state, other, schol, t, MOVEDEPTH - 1, 1 << t, moved):
+            if is_open(state, fac, schol, t):
+                return t
+            undo_moves(state, moved, mark)
+    for t in set_bits(state.scholFree[schol] & ~state.facFree[fac]):
+        other = state.FACsched[fac][t]
+        mark = len(moved)
+        if other != "NA" and other != "" and relocate(state, fac, other, t, MOVEDEPTH - 1, 1 << t, moved):
+            if is_open(state, fac, schol, t):
+                return t
+            undo_moves(state, moved, mark)
+    return -1
+
+
+# Can this person lose an interview and still have their minimum?
+def has_spare(state, model, person, isFac):
+    if isFac:
+        return state.nFACsched[person] > model.MINFacInt
+    return state.nSCHOLsched[person] > model.MINScholInt
+
+
+# The cheapest interview of the partner to give up for pair (fac, schol): one with a person who has interviews to
+# spare, in a slot the short person has open. Returns (loss in pair value, slot, ejected faculty, ejected scholar) or None.
+def cheapest_ejection(state, model, fac, schol, shortIsFac):
+    best = None
+    if shortIsFac:
+        # the scholar gives up an interview with another faculty member in a slot fac has open
+        for t in set_bits(state.facFree[fac] & ~state.scholFree[schol]):
+            other = state.SCHOLsched[schol][t]
+            if other != "" and has_spare(state, model, other, True):
+                option = (pair_value(model, other, schol), t, other, schol)
+                if best is None or option < best:
+                    best = option
+    else:
+        # the faculty member gives up an interview with another scholar in a slot schol has open
+        for t in set_bits(state.scholFree[schol] & ~state.facFree[fac]):
+            other = state.FACsched[fac][t]
+            if other != "NA" and other != "" and has_spare(state, model, other, False):
+                option = (pair_value(model, fac, other), t, fac, other)
+                if best is None or option < best:
+                    best = option
+    return best
+
+
+# Give person a new interview; returns the kind of change made ("placed", "moved" or "ejected") or None
+def fix_person(state, model, partners, person, isFac, rng, counts):
+    pairs = partners.pairs(state, person, isFac)
+    # an open slot both have, for the best partner that has one
+    for value, fac, schol in pairs:
+        if state.facFree[fac] & state.scholFree[schol]:
+            state.place(fac, schol, pair_reason(model, fac, schol), rng)
+            return "placed"
+    # a slot opened by moving interviews out of the way; the partner needs an open slot of their own
+    for value, fac, schol in pairs:
+        if not (state.scholFree[schol] if isFac else state.facFree[fac]):
+            continue
+        moved = []
+        t = open_slot(state, fac, schol, moved)
+        if t >= 0:
+            state.assign(fac, schol, t, pair_reason(model, fac, schol))
+            counts["moves"] += len(moved)
+            return "moved"
+    # a slot taken from someone with interviews to spare: the largest gain in pair value wins. An ejection never gains
+    # more than the value of the new pair, so the search ends at the first partner that cannot beat the best so far
+    best = None
+    for value, fac, schol in pairs[:EJECTPARTNERS]:
+        if best is not None and value <= best[0]:
+            break
+        ejection = cheapest_ejection(state, model, fac, schol, isFac)
+        if ejection is not None:
+            delta = value - ejection[0]
+            if best is None or delta > best[0]:
+                best = (delta, fac, schol) + ejection[1:]
+    if best is None:
+        return None
+    delta, fac, schol, t, ejectFac, ejectSchol = best
+    state.unassign(ejectFac, ejectSchol, t)
+    state.assign(fac, schol, t, pair_reason(model, fac, schol))
+    # continue the chain: the ejected person gets a new interview if there is an open slot for one
+    ejected = ejectFac if isFac else ejectSchol
+    for value, pairFac, pairSchol in partners.pairs(state, ejected, isFac):
+        if state.facFree[pairFac] & state.scholFree[pairSchol]:
+            state.place(pairFac, pairSchol, pair_reason(model, pairFac, pairSchol), rng)
+            counts["replaced"] += 1
+            break
+    return "ejected"
+
+
+# Bring people below their minimum up to it by local changes to the schedule (see NOTES).
+# Returns counters of what was done: placed, moved and ejected fixes, interview moves, ejected people re-placed,
+# and the people still short at the end.
+def improve_schedule(state, model, rng):
+    counts = {"placed": 0, "moved": 0, "ejected": 0, "moves": 0, "replaced": 0, "short": 0}
+    partners = None
+    stats = state.stats
+    for _ in range(MAXPASSES):
+        if not stats.deficit():
+            break
+        # the short people from the live statistics, in registration order
+        short = [(fac, True) for fac in sorted(stats.facShort, key=model.affinity.facIndex.__getitem__)]
+        short += [(schol, False) for schol in sorted(stats.scholShort, key=model.affinity.scholIndex.__getitem__)]
+        if partners is None:
+            partners = PartnerTable(state, model)
+        fixed = 0
+        for person, isFac in short:
+            minimum = model.MINFacInt if isFac else model.MINScholInt
+            count = state.nFACsched if isFac else state.nSCHOLsched
+            while count[person] < minimum:
+                change = fix_person(state, model, partners, person, isFac, rng, counts)
+                if change is None:
+                    break
+                counts[change] += 1
+                fixed += 1
+        if not fixed:
+            break
+    counts["short"] = stats.deficit()
+    return counts
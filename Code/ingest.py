@@ -0,0 +1,1014 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Readers for the Qualtrics exports (cancellations, registrations and choices).
+Each loader reads what it needs from, and adds what it builds to, one shared dictionary of inputs.
+Each input can be an .xlsx workbook or a tab/comma separated export (see read_table), whatever the encoding.
+Parsed tables and the finished input model are cached on disk (see read_table and load_snapshot) so unchanged files
+are not parsed again.
+"""
+
+import codecs
+import csv
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from slotgrid import load_slot_grid
+
+# Verbosity and Debug options; createSchedule.py sets these to its own values
+VERBOSE = False
+DEBUG = False
+DEBUGPAUSE = False
+
+# Bump this whenever a loader changes what it builds, so older cached input models are not used
+CACHEVERSION = 8
+CACHEDIR = ".cache"  # cache directory, created next to the input files
+INPUTFORMATS = (".xlsx", ".tsv", ".csv", ".txt")  # extensions tried, in order, when looking for an input file
+HEADERROWS = 3  # lines at the top of a sheet searched for the label line of a raw export
+NOINTEREST = ("other", "nopreference", "no preference")  # answers that are not a research interest
+SNIFFBYTES = 1 << 16  # how much of a delimited file is looked at to guess its delimiter
+
+
+#this is a simple function to remove non-printable control characters.
+def clean_string(text):
+    return ''.join(c for c in text if c.isprintable())
+
+
+# Signature of a file for the cache: (size, mtime, sha256 of the contents); None if the file does not exist.
+# If size and mtime match a known signature the file is not hashed again.
+def file_signature(path, known=None):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if known is not None and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+        return known
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            sha.update(chunk)
+    return (st.st_size, st.st_mtime_ns, sha.hexdigest())
+
+
+# Two signatures describe the same contents if the hashes agree (a touched but unchanged file still counts)
+def same_contents(sig, known):
+    if sig is None or known is None:
+        return sig is known
+    return sig[2] == known[2]
+
+
+def cache_path(path, name):
+    cacheDir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHEDIR)
+    os.makedirs(cacheDir, exist_ok=True)
+    return os.path.join(cacheDir, name)
+
+
+def read_pickle(path):
+    try:
+        with open(path, "rb") as fh:
+            return pickle.load(fh)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+
+
+def write_pickle(path, obj):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as fh:
+        pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+# Find the input file for base (a path without extension): the first of INPUTFORMATS that exists, else the .xlsx name.
+# Names are matched regardless of case, so Faculty_CANCEL.tsv is found for Data/Faculty_Cancel.
+def input_file(base):
+    folder, name = os.path.split(base)
+    try:
+        entries = {entry.lower(): entry for entry in sorted(os.listdir(folder or "."), reverse=True)}
+    except OSError:
+        entries = {}
+    for ext in INPUTFORMATS:
+        entry = entries.get((name + ext).lower())
+        if entry is not None:
+            return os.path.join(folder, entry)
+    return base + INPUTFORMATS[0]
+
+
+# Work out how to read a file from its contents rather than its name.
+# Returns (None, None) for an Excel workbook, or (encoding, delimiter) for a delimited text file.
+def sniff_format(path):
+    with open(path, "rb") as fh:
+        head = fh.read(SNIFFBYTES)
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"\xd0\xcf\x11\xe0"):  # xlsx (zip) or legacy xls
+        return None, None
+
+    if head.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    elif head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        encoding = "utf-16"
+    elif head[1:200:2].count(0) > 50:  # UTF-16 without a byte order mark: every other byte of ASCII text is zero
+        encoding = "utf-16-le"
+    elif head[0:200:2].count(0) > 50:
+        encoding = "utf-16-be"
+    elif is_utf8(path):
+        encoding = "utf-8"
+    else:
+        encoding = "cp1252"  # Excel and Qualtrics "csv for Excel" exports on Windows
+
+    text = head.decode(encoding, errors="ignore")
+    firstLine = text.splitlines()[0] if text else ""
+    delimiter = "\t" if firstLine.count("\t") >= firstLine.count(",") else ","
+    return encoding, delimiter
+
+
+# True if the whole file decodes as UTF-8; checked in chunks so large exports are never held in memory twice
+def is_utf8(path):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+# Read a delimited text file the way pd.read_excel reads a sheet: skip skiprows records, take the column names from
+# record header (None for integer column labels), and leave empty cells as NaN. Records are streamed through csv.reader,
+# so quoted fields may span several lines (e.g. research statements or lists of universities).
+def read_delimited(path, encoding, delimiter, skiprows=0, header=None):
+    NAN = float("nan")
+    rows = []
+    with open(path, newline="", encoding=encoding) as fh:
+        for n, record in enumerate(csv.reader(fh, delimiter=delimiter)):
+            if n < skiprows:
+                continue
+            rows.append([value if value != "" else NAN for value in record])
+
+    columns = None
+    if header is not None:
+        columns = [str(c) for c in rows[header]]
+        rows = rows[header + 1:]
+    width = max([len(r) for r in rows] + [len(columns or [])])
+    for r in rows:
+        r.extend([NAN] * (width - len(r)))
+    if columns is not None:
+        columns += [f"Unnamed: {i}" for i in range(len(columns), width)]
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+# Read a spreadsheet into a DataFrame, reusing the cached parse if the file has not changed since it was last read.
+# The format is sniffed from the contents: Excel workbooks go through pd.read_excel, anything else is read as
+# UTF-8/UTF-16/Windows-1252 text separated by tabs or commas.
+def read_table(path, skiprows=0, header=None):
+    cacheFile = cache_path(path, os.path.basename(path) + ".pkl")
+    options = {"skiprows": skiprows, "header": header}
+    cached = read_pickle(cacheFile)
+    known = cached["signature"] if cached is not None and cached["options"] == options else None
+    sig = file_signature(path, known)
+    if sig is None:
+        raise FileNotFoundError(path)
+    if known is not None and same_contents(sig, known):
+        if sig is not known:
+            write_pickle(cacheFile, {"signature": sig, "options": options, "table": cached["table"]})
+        return cached["table"]
+
+    encoding, delimiter = sniff_format(path)
+    if encoding is None:
+        df = pd.read_excel(path, skiprows=skiprows, header=header)
+    else:
+        df = read_delimited(path, encoding, delimiter, skiprows=skiprows, header=header)
+    write_pickle(cacheFile, {"signature": sig, "options": options, "table": df})
+    return df
+
+
+# The finished input model is cached under the signatures of every input file; it is only used if none of them changed
+def load_snapshot(snapshotFile, inputFiles):
+    cached = read_pickle(snapshotFile)
+    if cached is None or cached.get("version") != CACHEVERSION or cached["files"].keys() != set(inputFiles):
+        return None
+    for path in inputFiles:
+        if not same_contents(file_signature(path, cached["files"][path]), cached["files"][path]):
+            return None
+    return cached["inputs"]
+
+
+def save_snapshot(snapshotFile, inputFiles, inputs):
+    files = {path: file_signature(path) for path in inputFiles}
+    write_pickle(snapshotFile, {"version": CACHEVERSION, "files": files, "inputs": inputs})
+
+
+# clean_string for str.translate: maps every non-printable character to None; filled in as characters are seen
+class _Unprintable(dict):
+    def __missing__(self, code):
+        value = code if chr(code).isprintable() else None
+        self[code] = value
+        return value
+
+
+UNPRINTABLE = _Unprintable()
+
+
+# clean_string(str(x)).strip() over a whole column at once; empty cells and a column missing from the sheet read as
+# empty strings
+def text_column(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].fillna("").astype(str).str.translate(UNPRINTABLE).str.strip()
+
+
+# a column of multi-line answers (several items per cell, one per line) as a list per row, every item cleaned and
+# stripped like text_column and empty items dropped
+def list_column(df, col, sep="\n"):
+    if col not in df.columns:
+        return [[] for _ in range(len(df))]
+    cells = df[col].fillna("").astype(str).tolist()
+    return [[item for item in (part.translate(UNPRINTABLE).strip() for part in cell.split(sep)) if item] for cell in cells]
+
+
+# lowercased research interest; "other" answers take the write-in from the next column
+def interest_column(df, col):
+    interest = text_column(df, col).str.lower()
+    other = text_column(df, None if col is None else col + 1).str.lower()
+    return interest.where(~interest.str.contains("other", regex=False), other)
+
+
+# lowercased name with spaces removed, as used to match choices to people
+def name_key(col):
+    return col.str.lower().str.replace(" ", "", regex=False)
+
+
+# Locate fields in a raw Qualtrics export by the start of their header text (lowercased) on its label line, which is
+# one of the first HEADERROWS lines. Returns (columns, label row), where columns maps each field to its column, or to
+# the list of every matching column for the fields in multi; (None, None) if a field is not found, i.e. the sheet is
+# a converted workbook laid out like the column maps below.
+def find_columns(df, headerText, multi=()):
+    for row in range(min(HEADERROWS, len(df))):
+        labels = [label.strip().lower() if isinstance(label, str) else "" for label in df.iloc[row].tolist()]
+        columns = {}
+        for field, text in headerText.items():
+            matches = [df.columns[c] for c, label in enumerate(labels) if label.startswith(text)]
+            if not matches:
+                break
+            columns[field] = matches if field in multi else matches[0]
+        else:
+            return columns, row
+    return None, None
+
+
+# The answers of a raw export: the lines after its label line, less the line of import ids Qualtrics may add
+def export_rows(df, labelRow):
+    data = df.iloc[labelRow + 1:]
+    if len(data) and data.iloc[0].astype(str).str.startswith('{"ImportId"').any():
+        data = data.iloc[1:]
+    return data
+
+
+# Cancellations exported with only a name column, by name key; they are matched to emails when the registrations
+# are read, and reported if nobody registered under that name
+def cancelled_names(df):
+    names = text_column(df, df.columns[0])
+    return dict(zip(name_key(names), names))
+
+
+# Cancelled names that matched no registration: say so rather than keeping someone who cancelled
+def report_unmatched_cancellations(cancelNames, matched, who):
+    for key in sorted(set(cancelNames) - matched):
+        print(f"Warning: cancelled {who} {cancelNames[key]} did not match anyone who registered *****")
+
+
+# Cancellations: one header line, then first name, last name and email; the raw export has only a name column
+def load_faculty_cancel(path, inputs):
+    facCancel = {}  # Keep track of faculty that cancel to remove from schedule
+    facCancelNames = {}  # Cancellations known only by name; matched to emails in load_faculty_registration
+    inputs["facCancel"] = facCancel
+    inputs["facCancelNames"] = facCancelNames
+    try:
+        # Read the Excel file into a pandas DataFrame; skip header line
+        df = read_table(path, skiprows=0, header=None).iloc[1:]
+
+        # Store the emails in the facCancel dictionary
+        if 2 in df.columns:
+            facCancel.update(dict.fromkeys(text_column(df, 2).str.lower(), 1))
+        else:
+            facCancelNames.update(cancelled_names(df))
+        nfacCancel = len(facCancel) + len(facCancelNames)  # Total number of faculty that have canceled
+
+        print(f"there are {nfacCancel} faculty cancellations")
+        # Print the contents of the facCancel dictionary
+        if VERBOSE and nfacCancel > 0:
+            print("\nFaculty Cancellations:")
+            for name in list(facCancel) + list(facCancelNames.values()):
+                print(f"{name}")
+
+    except Exception as e:
+        print(f"Cannot read {path}\nError: {e}")
+
+
+def load_scholar_cancel(path, inputs):
+    scholCancel = {}  # Keep track of scholars that cancel to remove from schedule
+    scholCancelNames = {}  # Cancellations known only by name; matched to emails in load_scholar_registration
+    inputs["scholCancel"] = scholCancel
+    inputs["scholCancelNames"] = scholCancelNames
+    try:
+        # Read the Excel file into a pandas DataFrame; skip header line
+        df = read_table(path, skiprows=0, header=None).iloc[1:]
+
+        # store emails
+        if 2 in df.columns:
+            scholCancel.update(dict.fromkeys(text_column(df, 2), 1))
+        else:
+            scholCancelNames.update(cancelled_names(df))
+        nscholCancel = len(scholCancel) + len(scholCancelNames)  # Total number of scholars that have canceled
+
+        print(f"there are {nscholCancel} scholar cancellations")
+        # Print the contents of the scholCancel dictionary
+        if VERBOSE and nscholCancel > 0:
+            print("\nScholar cancellations:")
+            for name in list(scholCancel) + list(scholCancelNames.values()):
+                print(f"{name}")
+
+    except Exception as e:
+        print(f"Cannot read {path}\nError: {e}")
+
+
+# Faculty meeting links kept in a separate file (email in the 3rd column, link in the 4th)
+def load_meeting_links(path, inputs):
+    FacultyMeetingLinks = inputs.setdefault("FacultyMeetingLinks", {})
+    if VERBOSE:
+        print(f"Looking for faculty meeting links in file {path}")
+
+    try:
+        # Read the Excel file into a pandas DataFrame; skip header line
+        df = read_table(path, skiprows=0, header=0).iloc[1:]
+        emails = text_column(df, df.columns[2]).str.lower()
+        links = df[df.columns[3]].astype(str).str.strip()
+
+        duplicated = emails[emails.duplicated() | emails.isin(FacultyMeetingLinks)]
+        if len(duplicated):
+            print(f"error, {duplicated.iloc[0]} duplicated in faculty meeting file?")
+            exit(1)
+
+        # Store the email and link in the FacultyMeetingLinks dictionary
+        FacultyMeetingLinks.update(zip(emails, links))
+        nFacultyMeetingLinks = len(emails)  # Total number of meeting links
+
+        # Print the contents of the FacultyMeetingLinks dictionary
+        if VERBOSE:
+            print(f"\n{nFacultyMeetingLinks} Faculty Meeting links read:")
+            for email, link in FacultyMeetingLinks.items():
+                print(f"{email}: {link}")
+
+    except Exception as e:
+        print(f"Cannot read {path}\nError: {e}")
+
+
+# Dictionary to map relevant faculty registration headers to their column indices
+facRegHeaderColumns = {
+    "FirstName": 2,
+    "LastName": 3,
+    "email": 4,
+    "University": 5,
+    "ResearchCat": 8,
+    "ResearchInt1": 10,
+    "ResearchInt2": 12,
+    "ResearchInt3": 14,
+    "website": 17,
+    "MeetingType": 18,
+    "MeetingLink": 19
+}
+
+# The same fields in the raw Qualtrics export, by the start of their header text; it has no university or meeting type
+facRegHeaderText = {
+    "FirstName": "first name",
+    "LastName": "last name",
+    "email": "your email",
+    "ResearchCat": "please select the research category",
+    "ResearchInt1": "please select the primary research area",
+    "ResearchInt2": "please select the secondary research area",
+    "ResearchInt3": "please select the third research area",
+    "website": "if you have one, please give us your lab website",
+    "MeetingLink": "the matchmaking event interviews occur over zoom"
+}
+
+
+def load_faculty_registration(path, inputs):
+    facCancel = inputs["facCancel"]
+    facCancelNames = inputs.get("facCancelNames", {})
+    cancelMatched = set()  # name keys of facCancelNames found among the registrations
+    grid = inputs.setdefault("slotGrid", load_slot_grid())  # the slot grid (slotgrid.py); the default one if none was set
+    Faculty = {}  # Faculty who registered; the keys of this dictionary are email addresses, and other info is stored in a list
+    ##  {email} ->
+    ##  [0]=name;
+    ##  [1]=meeting link;
+    ##  [2]=University;
+    ##  [3]=total number of research interests;
+    ##  [4-k]=each of their research interests;
+    nFaculty = 0
+    facultyNAMEtoEMAIL = {}  # Map faculty names to their email
+    facultyEMAILtoNAME = {}  # Map faculty emails to their name
+    FacAvail = {}  # Record whether faculty are available; default is yes
+    cat2fac = {}  # Map of research categories to faculty
+    facCatPop = {}  # Popularity of categories
+    nfacCatPop = 0  # Total number of research categories selected across faculty
+    int2fac = {}  # Map of research interests to faculty
+    facIntPop = {}  # Popularity of interests
+    nfacIntPop = 0  # Total number of research interests selected across faculty
+    uni2fac = {} # map university to their faculty
+    FacultyMeetingType = inputs.setdefault("FacultyMeetingType", {})
+    FacultyMeetingLinks = inputs.setdefault("FacultyMeetingLinks", {})
+
+    # Read the Excel file into a pandas DataFrame
+    df = read_table(path, skiprows=0, header=None)
+
+    # A raw export is read by its header text; otherwise, as from Qualtrics, header info is on line 2 and data begins
+    # on line 4... is yours the same?
+    columns, headerRow = find_columns(df, facRegHeaderText)
+    if columns is None:
+        columns, headerRow = facRegHeaderColumns, 1
+        data = df.iloc[3:]
+    else:
+        data = export_rows(df, headerRow)
+    facRegHeaders = df.iloc[headerRow].tolist()
+    if VERBOSE:
+        print("Check that the column names match the desired columns:")
+        for col in sorted(columns, key=columns.get):
+            print(f"column {col}: {columns[col]}")
+            print(f"\t{columns[col]}: {col} =?= {facRegHeaders[columns[col]]}")
+        print("\n")
+
+    # Clean whole columns at once; the loop below only works on plain strings. Fields the sheet does not have read as
+    # empty strings
+    firstNames = text_column(data, columns.get("FirstName"))
+    lastNames = text_column(data, columns.get("LastName"))
+    CapNames = (firstNames + " " + lastNames).tolist()
+    names = (name_key(firstNames) + name_key(lastNames)).tolist()
+    emails = text_column(data, columns.get("email")).str.lower().tolist()
+    unis = text_column(data, columns.get("University")).tolist()
+    meetingTypes = text_column(data, columns.get("MeetingType")).tolist()
+    meetingLinks = text_column(data, columns.get("MeetingLink")).tolist()
+    resCats = text_column(data, columns.get("ResearchCat")).str.lower().tolist()
+    interestCols = list(zip(*[interest_column(data, columns.get(f"ResearchInt{i}")) for i in range(1, 4)]))
+
+    for k, email in enumerate(emails):
+        nlines = k + 3
+        CapName = CapNames[k]
+        name = names[k]
+        uni = unis[k]
+
+        if DEBUG:
+            print(f"line {nlines}: {data.iloc[k].tolist()}")
+
+        if VERBOSE:
+            print(f"\nReading faculty {CapName} at {uni} on line {nlines}: {email}")
+
+        # Check if the faculty member has canceled
+        if name in facCancelNames:
+            cancelMatched.add(name)
+            facCancel[email] = 1
+        if email in facCancel:
+            if VERBOSE:
+                print(f"\n\n\n\nFaculty {CapName} cancelled. Skipping. *******")
+            continue
+
+
+        # Check for duplicate emails and issue a warning if found
+        if VERBOSE:
+            if email in Faculty:
+                print(f"\n\n\n\nWarning: {email} repeated in registration file line {nlines}; overwriting with new info *****")
+                exit(1)
+
+        # If meetinglink is not included in a separate document, collect it from registration data
+        if email not in FacultyMeetingLinks and columns.get("MeetingLink") is not None:
+            FacultyMeetingType[email] = meetingTypes[k]
+            FacultyMeetingLinks[email] = meetingLinks[k]
+        elif email not in FacultyMeetingLinks:
+            print(f"\n\n\n\nWarning: Did not find meeting link for {email} in MeetingLink file ******")
+            exit(1)
+
+        if VERBOSE:
+            print(f"\tMeetingLink: {FacultyMeetingLinks[email]}")
+
+        # Capture faculty research categories
+        resCat = resCats[k]
+        for numCat, c in enumerate(resCat.split(',')):
+            cat2fac.setdefault(c, {})[email] = numCat
+            facCatPop[c] = facCatPop.get(c, 0) + 1
+            nfacCatPop += 1
+
+        if VERBOSE:
+            print(f"\tResearchCat: {resCat}")
+
+        # Capture faculty research interests
+        interests = [interest for interest in interestCols[k] if interest and interest not in NOINTEREST]
+        numInt = len(interests)
+        for n, interest in enumerate(interests):
+            facIntPop[interest] = facIntPop.get(interest, 0) + 1
+            int2fac.setdefault(interest, {})[email] = n
+        nfacIntPop += numInt
+        if VERBOSE:
+            print(f"\tResearchInt: {interests}")
+
+        # Add faculty information to the Faculty dictionary
+        if email not in Faculty:
+            nFaculty += 1
+        Faculty[email] = [name, FacultyMeetingLinks.get(email), uni, numInt] + interests
+        uni2fac.setdefault(uni, {})[email] = 1
+        if VERBOSE:
+            print(f"\tUni: {uni}")
+
+        # Check if the faculty member has a meeting link
+        if Faculty[email][1] is None:
+            raise ValueError(f"Faculty {email} does not have a meeting link")
+
+        facultyNAMEtoEMAIL[name] = email
+        facultyEMAILtoNAME[email] = CapName
+
+        # Set default faculty availability, one entry per slot of the grid; updated below in choices
+        FacAvail[email] = [1] * len(grid)
+
+        if VERBOSE:
+            print(f"Read faculty {CapName} {email} on line {nlines}:")
+            for i, info in enumerate(Faculty[email]):
+                print(f"\t[{i}]={info}")
+
+
+    report_unmatched_cancellations(facCancelNames, cancelMatched, "faculty")
+    print(f"Read {nFaculty} unique faculty across {len(uni2fac)} Universities:")
+    for uni in sorted(uni2fac):
+        print(f"\t{uni}: {len(uni2fac[uni])}")
+
+    inputs.update(Faculty=Faculty, facultyNAMEtoEMAIL=facultyNAMEtoEMAIL, facultyEMAILtoNAME=facultyEMAILtoNAME,
+                  FacAvail=FacAvail, cat2fac=cat2fac, facCatPop=facCatPop, nfacCatPop=nfacCatPop, int2fac=int2fac,
+                  facIntPop=facIntPop, nfacIntPop=nfacIntPop, uni2fac=uni2fac)
+
+
+# Dictionary to map relevant scholar registration headers to their column indices
+scholRegHeaderColumns = {
+    "FirstName": 0,
+    "LastName": 1,
+    "email": 2,
+    "SchoolChoice": 10,
+    "ResearchCat": 11,
+    "ResearchInt1": 13,
+    "ResearchInt2": 15,
+    "ResearchInt3": 17
+}
+
+# The same fields in the raw export, which has one full name column and no university choices
+scholRegHeaderText = {
+    "FullName": "full name",
+    "email": "email address",
+    "ResearchCat": "research categories of interest",
+    "ResearchInt1": "primary research area of interest",
+    "ResearchInt2": "2nd research area",
+    "ResearchInt3": "3rd research area"
+}
+
+
+def load_scholar_registration(path, inputs):
+    scholCancel = inputs["scholCancel"]
+    scholCancelNames = inputs.get("scholCancelNames", {})
+    cancelMatched = set()  # name keys of scholCancelNames found among the registrations
+    facCatPop = inputs["facCatPop"]
+    Scholars = {}  # Scholars who registered; the keys of this dictionary are email addresses, and other info is stored in a list
+    ##  {email} ->
+    ##  [0]=name
+    ##  [1]=num interests
+    ##  [2-k]=interest k;
+    ScholarUni = {} # map scholar to their universities of interest
+    ## {email} ->
+    ##[0]=number of uni interests
+    ##[1-k]=uni1; uni2; ...
+    nScholars = 0
+    scholN2E = {}  # Map scholar name to email
+    scholE2N = {}  # Map email to scholar name
+    cat2schol = {}  # Map of research categories to scholars
+    scholCatPop = {}  # Scholar research category popularity
+    nscholCatPop = 0  # Total number of research categories selected across scholars
+    int2schol = {}  # Map of research interests to scholars
+    scholIntPop = {}  # Scholar research interest popularity
+    nscholIntPop = 0  # Total number of research interests selected across scholars
+    uni2schol = {} # map university to the scholars interested
+
+    # Read the Excel file into a pandas DataFrame
+    scholReg_df = read_table(path, skiprows=0, header=None)  # Assuming the first line is not useful and defining own headers
+
+    # Parse header line: the raw export is read by its header text, a converted workbook by position
+    columns, headerRow = find_columns(scholReg_df, scholRegHeaderText)
+    if columns is None:
+        columns, headerRow = scholRegHeaderColumns, 0
+        data = scholReg_df.iloc[1:]
+    else:
+        data = export_rows(scholReg_df, headerRow)
+    scholRegHeaders = scholReg_df.iloc[headerRow].tolist()
+    if VERBOSE:
+        print("\n\nNow check that the scholar column names match the desired columns:")
+        for col in sorted(columns, key=columns.get):
+            print(f"\t{col}[{columns[col]}] =?= {scholRegHeaders[columns[col]]}")
+        print("\n")
+
+    # Clean whole columns at once; the loop below only works on plain strings
+    if "FullName" in columns:
+        fullNames = text_column(data, columns["FullName"])
+        CapNames = fullNames.tolist()
+        names = name_key(fullNames).tolist()
+    else:
+        firstNames = text_column(data, columns["FirstName"])
+        lastNames = text_column(data, columns["LastName"])
+        CapNames = (firstNames + " " + lastNames).tolist()
+        names = (name_key(firstNames) + name_key(lastNames)).tolist()
+    emails = text_column(data, columns["email"]).str.lower().tolist()
+    # one category per line, cleaned like the faculty ones; a blank cell reads as "" rather than NaN
+    resCats = [",".join(cats).lower() for cats in list_column(data, columns["ResearchCat"])]
+    uniChoices = list_column(data, columns.get("SchoolChoice"))  # cleaned and stripped like the faculty universities
+    interestCols = list(zip(*[interest_column(data, columns[f"ResearchInt{i}"]) for i in range(1, 4)]))
+
+    for k, email in enumerate(emails):
+        nlines = k + 2
+        CapName = CapNames[k]
+        name = names[k]
+
+        if DEBUG:
+            print(f"line {nlines}: {data.iloc[k].tolist()}")
+
+        if VERBOSE:
+            print(f"\nReading scholar {CapName} on line {nlines}: {email}")
+
+        # Check if the scholar has canceled
+        if name in scholCancelNames:
+            cancelMatched.add(name)
+            scholCancel[email] = 1
+        if email in scholCancel:
+            if VERBOSE:
+                print(f"Scholar {CapName} cancelled, skip reading data")
+                quit()
+            continue
+
+
+        # Capture scholar research categories
+        for numCat, c in enumerate(resCats[k].split(',')):
+            scholCatPop[c] = scholCatPop.get(c, 0) + 1
+            nscholCatPop += 1
+            cat2schol.setdefault(c, {})[email] = numCat
+            if DEBUG:
+                if c not in facCatPop:
+                    print(f"\t\t***\t\tschol cat \"{c}\" NOT in facCatPop")
+                    if DEBUGPAUSE: #change to True to pause on this error
+                        user_entry = input("Continue? (y/n)")
+                        if user_entry != "y" and user_entry != "":
+                            exit(1)
+
+        interests = [interest for interest in interestCols[k] if interest and interest not in NOINTEREST]
+        numInt = len(interests)
+        for n, research_int in enumerate(interests):
+            scholIntPop[research_int] = scholIntPop.get(research_int, 0) + 1
+            int2schol.setdefault(research_int, {})[email] = n
+        nscholIntPop += numInt
+
+        # Capture scholar university choices
+        unis = uniChoices[k]
+        ScholarUni[email] = [len(unis)] + unis
+        for uniCount, u in enumerate(unis, 1):
+            uni2schol.setdefault(u, {})[email] = uniCount
+
+        if VERBOSE:
+            print(f"\tInterested in {ScholarUni[email][0]} schools: {ScholarUni[email][1:]}")
+
+        # Add scholar information to the Scholars dictionary
+        if email not in Scholars:
+            nScholars += 1
+        Scholars[email] = [name, numInt] + interests
+        scholN2E[name] = email
+        scholE2N[email] = CapName
+
+        if VERBOSE:
+            print(f"Read scholar {CapName} {email} on line {nlines}:")
+            for i, info in enumerate(Scholars[email]):
+                print(f"\t[{i}]={info}")
+
+    report_unmatched_cancellations(scholCancelNames, cancelMatched, "scholar")
+    print(f"Read {nScholars} unique scholars interested in {len(uni2schol)} Universities:")
+    for uni in sorted(uni2schol):
+        print(f"\t{uni}: {len(uni2schol[uni])}")
+
+    inputs.update(Scholars=Scholars, ScholarUni=ScholarUni, scholN2E=scholN2E, scholE2N=scholE2N, cat2schol=cat2schol,
+                  scholCatPop=scholCatPop, nscholCatPop=nscholCatPop, int2schol=int2schol, scholIntPop=scholIntPop,
+                  nscholIntPop=nscholIntPop, uni2schol=uni2schol)
+
+
+# Print the popularity of faculty vs scholar research categories and interests
+def print_popularity(inputs):
+    facCatPop = inputs["facCatPop"]
+    scholCatPop = inputs["scholCatPop"]
+    facIntPop = inputs["facIntPop"]
+    scholIntPop = inputs["scholIntPop"]
+    nfacCatPop = inputs["nfacCatPop"]
+    nscholCatPop = inputs["nscholCatPop"]
+    nfacIntPop = inputs["nfacIntPop"]
+    nscholIntPop = inputs["nscholIntPop"]
+
+    print("\npopularity of faculty vs scholar research categories:\n")
+
+    # Sort the categories by popularity in descending order
+    sorted_facCatPop = sorted(facCatPop.items(), key=lambda x: x[1], reverse=True)
+
+    for cat, fac_count in sorted_facCatPop:
+        if fac_count < 1:
+            continue
+        if cat not in scholCatPop:
+            scholCatPop[cat] = 0
+
+        print(f"\"{cat}\"\t{fac_count:2d} ({fac_count/nfacCatPop:.4f})\t{scholCatPop[cat]:2d} ({scholCatPop[cat]/max(nscholCatPop, 1):.4f})")
+
+    # Print the popularity of faculty vs scholar research interests
+    print("\npopularity of faculty vs scholar research interests:\n")
+
+    # Sort the interests by popularity in descending order
+    sorted_facIntPop = sorted(facIntPop.items(), key=lambda x: x[1], reverse=True)
+
+    for interest, fac_count in sorted_facIntPop:
+        if fac_count < 10:
+            continue
+        if interest not in scholIntPop:
+            scholIntPop[interest] = 0
+
+        print(f"{interest:>42}\t{fac_count:2d} ({fac_count/nfacIntPop:.4f})\t{scholIntPop[interest]:2d} ({scholIntPop[interest]/max(nscholIntPop, 1):.4f})")
+
+
+# Reverse a choices dictionary: for each person chosen, everyone who chose them (each once, in the order of choices)
+def invert_choices(choices):
+    chosenBy = {}
+    for chooser, chosen in choices.items():
+        for person in chosen:
+            who = chosenBy.setdefault(person, [])
+            if not who or who[-1] != chooser:
+                who.append(chooser)
+    return chosenBy
+
+
+# Columns of the faculty choices in a converted workbook: email, the scholars chosen and the timezone, whose
+# availability answers are in the columns the slot grid gives for it
+facChoiceColumns = {
+    "email": 3,
+    "Choices": [6, 7, 8, 9, 10],
+    "Timezone": 11
+}
+
+# The same in the raw export, by the start of their header text; it asks for each slot's availability in one timezone
+facChoiceHeaderText = {
+    "email": "email:",
+    "Choices": "please pick the name of your",
+    "Availability": "we will assume you are available"
+}
+
+
+# Faculty choices of scholars, and the time slots they are not available for
+def load_faculty_choices(path, inputs):
+    Faculty = inputs["Faculty"]
+    facCancel = inputs["facCancel"]
+    FacAvail = inputs["FacAvail"]
+    scholN2E = inputs["scholN2E"]
+    TIMEZONESLOTS = inputs["slotGrid"].availability  # timezone -> column of the availability answer for each slot
+    FacChoices = {}
+    nFacChoices = {}
+    nFacWithChoices = 0
+    scholarCNT = {}  # Number of times a scholar is selected
+    totScholarCNT = 0  # Total number of scholar selections
+    nNotAvail = 0  # Number of slots faculty are not available
+    nTotAvail = 0  # Total number of slots faculty are available for
+
+    # Read the Excel file into a pandas DataFrame
+    df = read_table(path, skiprows=0, header=None)
+    columns, headerRow = find_columns(df, facChoiceHeaderText, multi=("Choices", "Availability"))
+    if columns is None:
+        columns = facChoiceColumns
+        df_fac_choices = df.iloc[3:]  # Skip first 2 line2, header in 3rd line, data starts on 4th line
+    else:
+        df_fac_choices = export_rows(df, headerRow)
+    slotColumns = columns.get("Availability")  # in a raw export, the answer for each slot; else by timezone
+
+    # Clean whole columns at once; the loop below only works on plain strings
+    emails = text_column(df_fac_choices, columns["email"]).str.lower().tolist()
+    timezones = text_column(df_fac_choices, columns.get("Timezone")).str.lower().tolist()
+    choiceCols = list(zip(*[name_key(text_column(df_fac_choices, i)) for i in columns["Choices"]]))
+    if slotColumns is None:
+        availCols = sorted({i for slots in TIMEZONESLOTS.values() for i in slots if i in df_fac_choices.columns})
+    else:
+        availCols = slotColumns
+    availability = {i: text_column(df_fac_choices, i).str.lower() for i in availCols}
+    notAvail = {i: col.str.contains(r'\bno\b', case=False, regex=True).tolist() for i, col in availability.items()}  # Use word boundary anchors to match exact word "no"
+    availability = {i: col.tolist() for i, col in availability.items()}
+
+    for k, email in enumerate(emails):
+        if DEBUG:
+            print(f"working on {email}")
+
+        if email not in Faculty:
+            if VERBOSE:
+                print(f"did not find Faculty[{email}]...")
+            continue
+
+        if email not in nFacChoices:
+            nFacWithChoices += 1
+        else:
+            if VERBOSE:
+                print(f"faculty {email} entered choices twice... overwriting")
+
+        nFacChoices[email] = 0
+        ## check which timezone was entered
+        if slotColumns is not None:
+            SlotAvail = slotColumns
+        else:
+            timezone = timezones[k]
+            if timezone not in TIMEZONESLOTS:
+                print(f"did not find timezone for {email}")
+                exit(1)
+            if VERBOSE:
+                print(f"Timezone for {email}: {timezone}")
+            SlotAvail = TIMEZONESLOTS[timezone]
+
+        for i, choice in enumerate(choiceCols[k], 1):
+            if choice == "":
+                continue
+            if DEBUG:
+                print(f"\tchoice {i}: {choice}")
+
+            if choice in scholN2E:
+                FacChoices.setdefault(email, []).append(scholN2E[choice])
+                nFacChoices[email] += 1
+                scholarCNT[choice] = scholarCNT.get(choice, 0) + 1
+                totScholarCNT += 1
+            else:
+                if DEBUG:
+                    print(f"did not find :{choice}: in scholars... Skipping! ({email})")
+                    if DEBUGPAUSE:
+                        user_entry = input("Is this ok to skip? (y/n)")
+                        if user_entry != "y" and user_entry != "":
+                            exit(1)
+
+        if VERBOSE:
+            if nFacChoices[email] > 0:
+                print(f"\t{FacChoices[email]} added for faculty {email}")
+
+        # Now check availability; a slot with no column in the sheet counts as available
+        availSlots = 0
+        for colid, i in enumerate(SlotAvail[:len(FacAvail[email])]):  # column i holds the answer for slot colid
+            if i in notAvail:
+                if VERBOSE:
+                    print(f"\tChecking availability for slot {colid}/{i} ({availability[i][k]})")
+                if notAvail[i][k]:
+                    FacAvail[email][colid] = 0
+                    nNotAvail += 1
+                else:
+                    availSlots += 1
+            else:
+                availSlots += 1
+            if DEBUG:
+                print(f"\tAvail({colid}): {FacAvail[email][colid]}")
+
+        if availSlots == 0:
+            facCancel[email] = 1
+            del Faculty[email]
+            nFacWithChoices -= 1
+            if VERBOSE:
+                print(f"faculty {email} not available at all...")
+        else:
+            nTotAvail += availSlots
+
+    if VERBOSE:
+        i = 0
+        for s in sorted(scholarCNT, key=scholarCNT.get, reverse=True):
+            i += 1
+            print(f"{i}: {s} -> {scholarCNT[s]}")
+
+    NEWnFac = 0
+    for fac in Faculty:
+        if fac not in facCancel:
+            NEWnFac += 1
+
+    print(f"There are now {NEWnFac} faculty able to participate")
+    print(f"{nFacWithChoices} faculty chose {totScholarCNT} scholars ({len(scholarCNT)} unique) and are not available for {nNotAvail} slots out of {nNotAvail+nTotAvail} ({nNotAvail/max(nNotAvail+nTotAvail, 1)})")
+
+    ScholChosenBy = invert_choices(FacChoices)  # scholar -> faculty who chose them
+    inputs.update(FacChoices=FacChoices, nFacChoices=nFacChoices, scholarCNT=scholarCNT, ScholChosenBy=ScholChosenBy)
+
+
+# Columns of the scholar choices in a converted workbook, and the start of their header text in the raw export
+scholChoiceColumns = {
+    "email": 3,
+    "Choices": [5, 6, 7, 8]
+}
+
+scholChoiceHeaderText = {
+    "email": "email:",
+    "Choices": "please pick the name of your"
+}
+
+
+# Scholar choices of faculty ("First Last - University")
+def load_scholar_choices(path, inputs):
+    Faculty = inputs["Faculty"]
+    Scholars = inputs["Scholars"]
+    facCancel = inputs["facCancel"]
+    facultyNAMEtoEMAIL = inputs["facultyNAMEtoEMAIL"]
+    ScholChoices = {}
+    nScholChoices = {}
+    nScholWithChoices = 0
+    facultyCNT = {}  # Number of times faculty selected
+    totFacultyCNT = 0  # Total number of faculty selections
+
+    # Read the Excel file into a pandas DataFrame
+    df = read_table(path, skiprows=0, header=None)
+    columns, headerRow = find_columns(df, scholChoiceHeaderText, multi=("Choices",))
+    if columns is None:
+        columns = scholChoiceColumns
+        df_schol_choices = df.iloc[1:]  # Skip first line, header on 1st line, data starts on 2nd line
+    else:
+        df_schol_choices = export_rows(df, headerRow)
+
+    # Clean whole columns at once; the loop below only works on plain strings
+    emails = text_column(df_schol_choices, columns["email"]).str.lower().tolist()
+    choiceCols = list(zip(*[name_key(text_column(df_schol_choices, i).str.split(" - ", n=1).str[0].str.strip())
+                            for i in columns["Choices"]]))
+
+    for k, email in enumerate(emails):
+        nlines = k + 1
+        if DEBUG:
+            print(f"working on {email}")
+
+        if email not in Scholars:
+            if VERBOSE:
+                print(f"did not find Scholar[{email}]... on line {nlines}")
+                if DEBUGPAUSE:
+                    user_entry = input("Continue? (y/n)")
+                    if user_entry != "y" and user_entry != "":
+                        exit(1)
+            continue
+
+        if email not in nScholChoices:
+            nScholWithChoices += 1
+        else:
+            if VERBOSE:
+                print(f"Scholar {email} entered info twice! Overwritting...")
+                if DEBUGPAUSE:
+                    user_entry = input("Continue? (y/n)")
+                    if user_entry != "y" and user_entry != "":
+                        exit(1)
+
+
+        nScholChoices[email] = 0
+        for i, name in enumerate(choiceCols[k]):
+            if name == "" or name not in facultyNAMEtoEMAIL:
+                continue
+            fac = facultyNAMEtoEMAIL[name]
+            if fac in facCancel:
+                continue
+
+            if DEBUG:
+                print(f"\tchoice {i}: {name}")
+
+            if fac in Faculty:
+                ScholChoices.setdefault(email, []).append(fac)
+                nScholChoices[email] += 1
+                facultyCNT[fac] = facultyCNT.get(fac, 0) + 1
+                totFacultyCNT += 1
+            else:
+                if VERBOSE:
+                    print(f"did not find faculty :{name}: in scholars interest list... ({email})")
+                if DEBUGPAUSE:
+                    response = input("Is this ok to skip? (y/n)")
+                    if response == "y" or response == "":
+                        continue
+                    else:
+                        quit()
+
+    print(f"{nScholWithChoices} scholars chose {totFacultyCNT} faculty ({len(facultyCNT)} unique)")
+
+    if VERBOSE:
+        i = 0
+        for s in sorted(facultyCNT, key=facultyCNT.get, reverse=True):
+            i += 1
+            print(f"{i}: {s} -> {facultyCNT[s]}")
+
+    FacChosenBy = invert_choices(ScholChoices)  # faculty -> scholars who chose them
+    inputs.update(ScholChoices=ScholChoices, nScholChoices=nScholChoices, facultyCNT=facultyCNT, FacChosenBy=FacChosenBy)
+
+
+# Now check which faculty were not chosen by any scholar
+def report_unchosen_faculty(inputs):
+    nFacNotChosen = 0
+    for fac in inputs["Faculty"]:
+        if fac in inputs["facCancel"]:
+            continue
+        if VERBOSE:
+            print(f"checking faculty {fac}: {inputs['facultyEMAILtoNAME'][fac]}...")
+        if fac not in inputs["facultyCNT"]:
+            nFacNotChosen += 1
+            print(f"faculty {inputs['facultyEMAILtoNAME'][fac]} was not chosen by any scholar")
+    print(f"{nFacNotChosen} faculty were not chosen by any scholar")
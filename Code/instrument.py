@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Per-phase timing and counters. Every stage of a run (loading each input, building the affinity, each pass of a
+scheduling try, each export) is recorded with its wall time and counters such as placement attempts and slot-probe
+failures. Records can be streamed as JSON lines while the run goes, and are summed into a table at the end. Work
+done in worker processes comes back as totals and is streamed as one record per phase, whose "runs" field says how
+many runs it sums (a record without it is a single run).
+"""
+
+import json
+import time
+from contextlib import contextmanager
+
+
+class Metrics:
+    def __init__(self, jsonFile=None):
+        self.seconds = {}  # phase -> total wall time
+        self.runs = {}  # phase -> number of times it ran
+        self.counters = {}  # phase -> {counter: total}
+        self.out = open(jsonFile, "a") if jsonFile else None
+
+    # record one run of a phase; counters are summed across runs
+    def record(self, phase, seconds, **counters):
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        self.runs[phase] = self.runs.get(phase, 0) + 1
+        totals = self.counters.setdefault(phase, {})
+        for name, value in counters.items():
+            totals[name] = totals.get(name, 0) + value
+        if self.out is not None:
+            self.out.write(json.dumps({"time": time.time(), "phase": phase, "seconds": seconds, **counters}) + "\n")
+
+    # time a block of code as one run of phase; the yielded dictionary collects counters for it
+    @contextmanager
+    def phase(self, phase):
+        counters = {}
+        start = time.perf_counter()
+        try:
+            yield counters
+        finally:
+            self.record(phase, time.perf_counter() - start, **counters)
+
+    # fold in totals from another Metrics (e.g. one returned by a worker process, see totals()). Each phase is also
+    # streamed as one record of its summed time and counters, with "runs" giving how many runs it covers.
+    def merge(self, totals):
+        seconds, runs, counters = totals
+        for phase in seconds:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds[phase]
+            self.runs[phase] = self.runs.get(phase, 0) + runs[phase]
+            mine = self.counters.setdefault(phase, {})
+            for name, value in counters.get(phase, {}).items():
+                mine[name] = mine.get(name, 0) + value
+            if self.out is not None:
+                self.out.write(json.dumps({"time": time.time(), "phase": phase, "seconds": seconds[phase],
+                                           "runs": runs[phase], **counters.get(phase, {})}) + "\n")
+
+    def totals(self):
+        return self.seconds, self.runs, self.counters
+
+    def close(self):
+        if self.out is not None:
+            self.out.close()
+            self.out = None
+
+    def summary(self):
+        print("\nPhase timings:")
+        print(f"{'phase':<36}{'runs':>7}{'total s':>10}{'mean ms':>10}  counters")
+        for phase in self.seconds:
+            counters = ", ".join(f"{name}={value}" for name, value in self.counters.get(phase, {}).items())
+            print(f"{phase:<36}{self.runs[phase]:>7}{self.seconds[phase]:>10.3f}{1000 * self.seconds[phase] / self.runs[phase]:>10.2f}  {counters}")
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Bounds for abandoning greedy tries early. Some people can never reach their minimum in any schedule: they have fewer
+usable slots (availability, and session capacities) or fewer possible partners (a chosen or positive-affinity pair)
+than the minimum. They make up the floor, and a schedule where only they are short is as good as any try can do.
+Without the local search a try only ever adds interviews, into slots open for both people, so open slots only
+close as it goes. Between passes, someone short can then gain at most as many interviews as they have open slots, and
+at most one with each partner the remaining passes could still pair them with who shares an open slot with them.
+Everyone short for whom that is not enough is certain to end the try short, so once there are more of them than in
+the best schedule so far, the try cannot beat it and the rest of its passes are skipped. This is checked after every
+pass but the last; after the choice passes it rarely finds anyone certain yet, but the check is cheap.
+The local search moves and trades interviews, freeing slots and partners again, so with it on (the default) only the
+floor is certain and tries are never abandoned: pruning needs --no-local-search.
+"""
+
+import numpy as np
+
+# The passes of a greedy try, in order (scheduler.build_schedule); after pass i only the later ones can add interviews
+PASSES = ("FC pass", "SC pass", "RA pass: scholars", "RA pass: faculty", "backup pass")
+CHUNK = 1024  # people checked at once, which bounds the memory of the partner matrices
+
+
+# Slots out of the bitmask free that one person could fill: each capped session counts for at most its capacity
+def usable_slots(free, grid):
+    if grid is None or not grid.capped():
+        return free.bit_count()
+    return sum((free & mask).bit_count() if capacity is None else min((free & mask).bit_count(), capacity)
+               for mask, capacity in zip(grid.sessionMasks, grid.capacity))
+
+
+class TryBound:
+    def __init__(self, model):
+        self.MINFacInt = model.MINFacInt
+        self.MINScholInt = model.MINScholInt
+        affinity = model.affinity
+        faculty = [fac for fac in model.Faculty if fac not in model.facCancel]
+        scholars = list(model.Scholars)
+        rows = [affinity.facIndex[fac] for fac in faculty]
+        cols = [affinity.scholIndex[schol] for schol in scholars]
+
+        # possible partners: pairs with a positive affinity, plus chosen pairs (in either direction) without one
+        positive = (affinity.inUni[np.ix_(rows, cols)] > 0) | (affinity.backup[np.ix_(rows, cols)] > 0)
+        facPartners = dict(zip(faculty, positive.sum(axis=1).tolist()))
+        scholPartners = dict(zip(scholars, positive.sum(axis=0).tolist()))
+        facPos = {fac: i for i, fac in enumerate(faculty)}
+        scholPos = {schol: j for j, schol in enumerate(scholars)}
+        chosenPairs = set()
+        for choices, flip in ((model.FacChoices, False), (model.FacChosenBy, False), (model.ScholChoices, True),
+                              (model.ScholChosenBy, True)):
+            for person, chosen in choices.items():
+                for other in chosen:
+                    fac, schol = (other, person) if flip else (person, other)
+                    if fac in facPos and schol in scholPos and not positive[facPos[fac], scholPos[schol]]:
+                        chosenPairs.add((fac, schol))
+        for fac, schol in chosenPairs:
+            facPartners[fac] += 1
+            scholPartners[schol] += 1
+        self.facPartners = facPartners  # faculty -> number of scholars they could ever be paired with
+        self.scholPartners = scholPartners  # scholar -> number of faculty they could ever be paired with
+
+        # the floor: people whose usable slots or possible partners fall short of their minimum
+        allSlots = (1 << model.MAXInt) - 1
+        self.facFloor = set()
+        for fac in faculty:
+            avail = sum(1 << t for t in range(model.MAXInt) if model.FacAvail[fac][t])
+            if min(usable_slots(avail, model.grid), facPartners[fac]) < self.MINFacInt:
+                self.facFloor.add(fac)
+        scholSlots = usable_slots(allSlots, model.grid)
+        self.scholFloor = {schol for schol in scholars if min(scholSlots, scholPartners[schol]) < self.MINScholInt}
+        self.floor = len(self.facFloor) + len(self.scholFloor)
+
+    # Of the people below their minimum, how many cannot reach it in the passes after PASSES[done] (any pass before the
+    # backup pass) without the local search: those with fewer usable open slots, or fewer partners left who share an
+    # open slot with them, than they still need. Open slots are compared for everyone at once, as a product of the
+    # people x slot matrices.
+    def certain_short(self, state, model, done):
+        stats = state.stats
+        affinity = model.affinity
+        facOpen = open_matrix([state.facFree.get(fac, 0) for fac in affinity.facIDs], model.MAXInt)
+        scholOpen = open_matrix([state.scholFree.get(schol, 0) for schol in affinity.scholIDs], model.MAXInt)
+        doomed = 0
+        for short, isFac in ((stats.facShort, True), (stats.scholShort, False)):
+            people = list(short)
+            for start in range(0, len(people), CHUNK):
+                chunk = people[start:start + CHUNK]
+                if isFac:
+                    ids = [affinity.facIndex[fac] for fac in chunk]
+                    inUni, backup = affinity.inUni[ids], affinity.backup[ids]
+                    common = facOpen[ids] @ scholOpen.T
+                    index, sched, n, free, need = affinity.scholIndex, state.FACsched, state.nFACsched, state.facFree, self.MINFacInt
+                    chosenBy = model.FacChosenBy  # the scholars who chose them
+                else:
+                    ids = [affinity.scholIndex[schol] for schol in chunk]
+                    inUni, backup = affinity.inUni[:, ids].T, affinity.backup[:, ids].T
+                    common = scholOpen[ids] @ facOpen.T
+                    index, sched, n, free, need = affinity.facIndex, state.SCHOLsched, state.nSCHOLsched, state.scholFree, self.MINScholInt
+                    chosenBy = model.ScholChoices  # the faculty they chose
+                # partners the later passes could still pair them with: scholar choices in the scholar choice pass,
+                # in-university matches in the random passes, everyone with a positive affinity in the backup pass
+                partners = backup > 0
+                if done < 3:
+                    partners |= inUni > 0
+                if done < 1:
+                    for k, person in enumerate(chunk):
+                        for other in chosenBy.get(person, ()):
+                            if other in index:
+                                partners[k, index[other]] = True
+                partners &= common > 0
+                for k, person in enumerate(chunk):
+                    for other in sched[person]:
+                        if other in index:
+                            partners[k, index[other]] = False  # already meeting
+                reachable = partners.sum(axis=1)
+                for k, person in enumerate(chunk):
+                    if n[person] + min(int(reachable[k]), usable_slots(free[person], state.grid)) < need:
+                        doomed += 1
+        return doomed
+
+
+# Everyone's open slots as a people x slot matrix (1 = open), from their bitmasks
+def open_matrix(masks, nSlots):
+    nBytes = (nSlots + 7) // 8
+    raw = np.frombuffer(b"".join(mask.to_bytes(nBytes, "little") for mask in masks), dtype=np.uint8)
+    return np.unpackbits(raw.reshape(len(masks), nBytes), axis=1, count=nSlots, bitorder="little").astype(np.float32)
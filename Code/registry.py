@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Compact registry of the people in an event. Every registered faculty member and scholar gets a dense integer id
+(their row or column in the affinity matrices), and their details are kept in a __slots__ record rather than a
+positional list. Universities, research interests and categories are interned to small integers, so the affinity
+build and the local search index arrays by id instead of hashing emails and interest strings.
+The email-keyed dictionaries from ingest.py are still what the schedules and output files are keyed by.
+"""
+
+import numpy as np
+
+
+# Map each distinct value (a university, interest or category) to a small integer, in order of first appearance
+class Interner:
+    __slots__ = ("ids", "values")
+
+    def __init__(self):
+        self.ids = {}  # value -> id
+        self.values = []  # id -> value
+
+    def intern(self, value):
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def __len__(self):
+        return len(self.values)
+
+
+class FacultyRecord:
+    __slots__ = ("id", "email", "name", "link", "uni", "interests", "categories", "avail")
+
+    def __init__(self, id, email, name, link, uni, interests, categories, avail):
+        self.id = id
+        self.email = email
+        self.name = name  # display name
+        self.link = link  # meeting link
+        self.uni = uni  # interned university
+        self.interests = interests  # interned research interests, most important first
+        self.categories = categories  # interned research categories, in the order given
+        self.avail = avail  # 1/0 per slot; the same list as FacAvail[email]
+
+
+class ScholarRecord:
+    __slots__ = ("id", "email", "name", "unis", "interests", "categories")
+
+    def __init__(self, id, email, name, unis, interests, categories):
+        self.id = id
+        self.email = email
+        self.name = name  # display name
+        self.unis = unis  # interned universities of interest
+        self.interests = interests  # interned research interests, most important first
+        self.categories = categories  # interned research categories, in the order given
+
+
+class Registry:
+    def __init__(self):
+        self.faculty = []  # id -> FacultyRecord
+        self.scholars = []  # id -> ScholarRecord
+        self.facultyIds = {}  # email -> id
+        self.scholarIds = {}  # email -> id
+        self.universities = Interner()
+        self.interests = Interner()
+        self.categories = Interner()
+
+    def add_faculty(self, email, name, link, uni, interests, categories, avail):
+        record = FacultyRecord(len(self.faculty), email, name, link, self.universities.intern(uni),
+                               tuple(self.interests.intern(i) for i in interests),
+                               tuple(self.categories.intern(c) for c in categories), avail)
+        self.faculty.append(record)
+        self.facultyIds[email] = record.id
+        return record
+
+    def add_scholar(self, email, name, unis, interests, categories):
+        record = ScholarRecord(len(self.scholars), email, name, tuple(self.universities.intern(u) for u in unis),
+                               tuple(self.interests.intern(i) for i in interests),
+                               tuple(self.categories.intern(c) for c in categories))
+        self.scholars.append(record)
+        self.scholarIds[email] = record.id
+        return record
+
+    # University membership index: mask[s, u] is True if scholar id s listed university id u
+    def university_mask(self):
+        mask = np.zeros((len(self.scholars), len(self.universities)), dtype=bool)
+        for schol in self.scholars:
+            mask[schol.id, list(schol.unis)] = True
+        return mask
+
+    # is faculty id f at a university scholar id s listed? faculty x scholar for every pair at once, from the index
+    def at_listed_university(self, mask=None):
+        mask = self.university_mask() if mask is None else mask
+        return mask[:, [fac.uni for fac in self.faculty]].T
+
+
+# each person's categories in the order they gave them, from a category -> {email: position} map
+def categories_by_person(cat2person):
+    ranked = {}
+    for cat, people in cat2person.items():
+        for email, position in people.items():
+            ranked.setdefault(email, []).append((position, cat))
+    return {email: [cat for _, cat in sorted(cats)] for email, cats in ranked.items()}
+
+
+# Build the registry from the dictionaries filled by ingest.load_faculty_registration and load_scholar_registration.
+# Ids follow registration order, which is also the row/column order of the affinity matrices.
+def build_registry(inputs):
+    registry = Registry()
+    facCats = categories_by_person(inputs["cat2fac"])
+    for email, (name, link, uni, numInt, *interests) in inputs["Faculty"].items():
+        registry.add_faculty(email, inputs["facultyEMAILtoNAME"][email], link, uni, interests, facCats.get(email, []),
+                             inputs["FacAvail"][email])
+    scholCats = categories_by_person(inputs["cat2schol"])
+    for email, (name, numInt, *interests) in inputs["Scholars"].items():
+        registry.add_scholar(email, inputs["scholE2N"][email], inputs["ScholarUni"][email][1:], interests,
+                             scholCats.get(email, []))
+    return registry
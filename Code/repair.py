@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Incremental repair of an already published schedule after late cancellations.
+The published CompleteFacultySchedule.xlsx is read back, interviews with anyone who has since cancelled are dropped,
+and only the people who lost interviews (or are now below their minimum) get new interviews, so everyone else keeps
+the schedule they were already sent.
+"""
+
+import pandas as pd
+
+from slots import SlotState, set_bits
+
+
+# Rebuild the slot state from a published faculty schedule (names in the FacultySchedule sheet, FC/SC/RA in AssignmentReasons).
+# An interview is dropped if either person is no longer in the model (cancelled) or the faculty member is no longer available then.
+# Returns the state, the dropped interviews as (faculty name, slot, scholar name), and how many interviews each remaining person lost.
+def load_published(path, model, facultyEMAILtoNAME, scholE2N):
+    sheets = pd.read_excel(path, sheet_name=None, keep_default_na=False)
+    names = sheets["FacultySchedule"]
+    whys = sheets.get("AssignmentReasons")
+
+    facN2E = {name: email for email, name in facultyEMAILtoNAME.items() if email in model.Faculty and email not in model.facCancel}
+    scholN2E = {name: email for email, name in scholE2N.items() if email in model.Scholars}
+
+    state = SlotState(model.Faculty, model.Scholars, model.FacAvail, model.facCancel, model.MAXInt, grid=model.grid,
+                      MINFacInt=model.MINFacInt, MINScholInt=model.MINScholInt)
+    dropped = []
+    lost = {}
+    for r in range(len(names)):
+        facName = str(names.iat[r, 0]).strip()
+        fac = facN2E.get(facName)
+        for t in range(model.MAXInt):
+            scholName = str(names.iat[r, t + 1]).strip()
+            if scholName == "" or scholName == "NA":
+                continue
+            schol = scholN2E.get(scholName)
+            if fac is None or schol is None or not (state.facFree[fac] >> t) & 1 or not (state.scholFree[schol] >> t) & 1:
+                dropped.append((facName, t, scholName))
+                for person in (fac, schol):
+                    if person is not None:
+                        lost[person] = lost.get(person, 0) + 1
+                continue
+            why = str(whys.iat[r, t + 1]).strip() if whys is not None else "RA"
+            state.assign(fac, schol, t, why)
+    return state, dropped, lost
+
+
+# Schedule fac with schol in a slot open for both. If there is none, move one existing interview of either of them
+# to another slot to make room. Returns 0 if nothing could be done, 1 if placed directly, 2 if an interview was moved.
+def place_or_move(state, fac, schol, why, rng, moved=None):
+    if fac in state.SCHOLsched[schol]:
+        return 0
+    if state.place(fac, schol, why, rng) >= 0:
+        return 1
+
+    # fac is free at t but schol meets other there: move (other, schol) to a slot both of them have open
+    for t in set_bits(state.facFree[fac]):
+        other = state.SCHOLsched[schol][t]
+        if other == "":
+            continue  # closed for schol by a session capacity, not an interview
+        common = state.facFree[other] & state.scholFree[schol]
+        if common:
+            move_interview(state, other, schol, t, next(set_bits(common)), moved)
+            state.assign(fac, schol, t, why)
+            return 2
+
+    # schol is free at t but fac meets other there
+    for t in set_bits(state.scholFree[schol]):
+        other = state.FACsched[fac][t]
+        if other == "NA" or other == "":
+            continue
+        common = state.facFree[fac] & state.scholFree[other]
+        if common:
+            move_interview(state, fac, other, t, next(set_bits(common)), moved)
+            state.assign(fac, schol, t, why)
+            return 2
+    return 0
+
+
+def move_interview(state, fac, schol, oldSlot, newSlot, moved=None):
+    why = state.FACschedWhy[fac][oldSlot]
+    state.unassign(fac, schol, oldSlot)
+    state.assign(fac, schol, newSlot, why)
+    if moved is not None:
+        moved.append((fac, schol, oldSlot, newSlot))
+
+
+# Refill the slots freed by dropped interviews. Each person who lost interviews is brought back to the count they had
+# (and everyone to their minimum), offering their choices first, then whoever chose them, then their best interest matches.
+# Returns the interviews added as (faculty, scholar, slot) and the interviews moved as (faculty, scholar, old slot, new slot).
+def repair_schedule(state, model, lost, rng):
+    FacChoices = model.FacChoices
+    ScholChoices = model.ScholChoices
+    FacChosenBy = model.FacChosenBy
+    ScholChosenBy = model.ScholChosenBy
+    candidates = model.candidates
+    added = []
+    moved = []
+
+    def target(person, count, minimum):
+        return max(count + lost.get(person, 0), minimum) if person in lost else minimum
+
+    # both sides' goals from the counts before the repair adds anything; an interview added for a scholar must not
+    # raise the goal of the faculty member it went to
+    scholGoal = {schol: target(schol, state.nSCHOLsched[schol], model.MINScholInt) for schol in model.Scholars}
+    facGoal = {fac: target(fac, state.nFACsched[fac], model.MINFacInt) for fac in state.nFACsched}
+
+    # scholars first, fewest interviews first
+    for schol in sorted(model.Scholars, key=lambda x: state.nSCHOLsched[x]):
+        goal = scholGoal[schol]
+        if state.nSCHOLsched[schol] >= goal:
+            continue
+        options = [(fac, "SC") for fac in ScholChoices.get(schol, [])]
+        options += [(fac, "FC") for fac in ScholChosenBy.get(schol, [])]
+        options += [(fac, "RA") for fac in candidates.SF[schol] + candidates.SFbk[schol]]
+        for fac, why in options:
+            if state.nSCHOLsched[schol] >= goal:
+                break
+            if fac not in state.facFree or state.nFACsched[fac] >= model.MAXInt:
+                continue
+            if place_or_move(state, fac, schol, why, rng, moved):
+                added.append((fac, schol, state.SCHOLsched[schol].index(fac)))
+
+    # then faculty
+    for fac in sorted(state.nFACsched, key=lambda x: state.nFACsched[x]):
+        goal = facGoal[fac]
+        if state.nFACsched[fac] >= goal:
+            continue
+        options = [(schol, "FC") for schol in FacChoices.get(fac, [])]
+        options += [(schol, "SC") for schol in FacChosenBy.get(fac, [])]
+        options += [(schol, "RA") for schol in candidates.FS[fac] + candidates.FSbk[fac]]
+        for schol, why in options:
+            if state.nFACsched[fac] >= goal:
+                break
+            if schol not in state.scholFree or state.nSCHOLsched[schol] >= model.MAXInt:
+                continue
+            if place_or_move(state, fac, schol, why, rng, moved):
+                added.append((fac, schol, state.FACsched[fac].index(schol)))
+
+    return added, moved
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+One randomized greedy scheduling try (faculty choices, scholar choices, then random assignment by interests),
+and a multi-start driver that runs independent tries in a pool of worker processes.
+All randomness comes from an explicit random.Random passed in, so a try is reproduced exactly by its seed.
+"""
+
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+import numpy as np
+
+from improve import improve_schedule
+from instrument import Metrics
+from prune import PASSES, TryBound
+from slots import SlotState
+
+
+# Read-only inputs shared by every try; this is what gets sent to each worker process
+class ScheduleModel:
+    def __init__(self, Faculty, Scholars, FacAvail, facCancel, FacChoices, ScholChoices, FacChosenBy, ScholChosenBy,
+                 affinity, candidates, MAXInt, MINFacInt, MINScholInt, verbose=False, localSearch=True,
+                 slotStrategy="random", grid=None):
+        self.Faculty = Faculty
+        self.Scholars = Scholars
+        self.FacAvail = FacAvail
+        self.facCancel = facCancel
+        self.FacChoices = FacChoices
+        self.ScholChoices = ScholChoices
+        self.FacChosenBy = FacChosenBy  # faculty -> scholars who chose them
+        self.ScholChosenBy = ScholChosenBy  # scholar -> faculty who chose them
+        self.affinity = affinity
+        self.candidates = candidates
+        self.MAXInt = MAXInt
+        self.MINFacInt = MINFacInt
+        self.MINScholInt = MINScholInt
+        self.verbose = verbose
+        self.slotStrategy = slotStrategy  # how a placement picks among the open slots; see slots.SLOTSTRATEGIES
+        self.localSearch = localSearch  # finish each try with the local search of improve.py for anyone left short
+        self.grid = grid  # sessions and their capacities (slotgrid.SlotGrid); None for one session without a cap
+        self.bound = None  # see try_bound
+
+    # Bounds for abandoning tries early (prune.TryBound); built on first use, so build it before forking workers
+    def try_bound(self):
+        if self.bound is None:
+            self.bound = TryBound(self)
+        return self.bound
+
+
+def randomize_order(items, rng):
+    randomized_items = list(items)
+    rng.shuffle(randomized_items)
+    return randomized_items
+
+
+# Report the state of the schedule, from the live statistics of the slot state (no pass over everyone)
+def check_schedules(state, model):
+    stats = state.stats
+    nFacFull = stats.facHist[model.MAXInt]
+    nFacAvail = sum(stats.facHist) - nFacFull
+    print(f"{nFacFull} faculty with full schedules; {len(stats.facShort)} faculty with too few; as low as {stats.lowest(stats.facHist)}; {nFacAvail} still have availability")
+    nScholFull = stats.scholHist[model.MAXInt]
+    nScholAvail = sum(stats.scholHist) - nScholFull
+    print(f"{nScholFull} scholars with full schedules; {len(stats.scholShort)} scholars with too few; as low as {stats.lowest(stats.scholHist)}; {nScholAvail} still have availability")
+    print(f"total of {stats.interviews} interviews scheduled")
+
+
+# Random fill by interests: in rounds, scholars with the fewest interviews first each get one more interview with the
+# best-ranked faculty member in ranked (scholar -> faculty, e.g. candidates.SF) who has a slot in common with them.
+# In round TRIES only scholars with at most TRIES interviews take part. Returns the placement attempts and failures.
+def fill_scholars(state, scholars, ranked, MAXInt, rng):
+    nSCHOLsched = state.nSCHOLsched
+    SCHOLsched = state.SCHOLsched
+    attempts = failures = 0
+    for TRIES in range(MAXInt):
+        #sort scholars with fewest interviews first
+        for schol in sorted(scholars, key=lambda x: nSCHOLsched[x]):
+            if nSCHOLsched[schol] > TRIES: #skip those who already have more than TRIES interviews this round
+                continue
+            if not state.scholFree[schol]:  # no open slot left (full, or every session at its capacity)
+                continue
+
+            for fac in ranked[schol]:
+                if fac in SCHOLsched[schol] or not state.facFree[fac]:
+                    continue
+                attempts += 1
+                if state.place(fac, schol, "RA", rng) >= 0:
+                    break
+                failures += 1
+    return attempts, failures
+
+
+# Between passes of a try: should it be abandoned after PASSES[done]? Only without the local search, and only once more
+# people are certain to end it short than the abortAbove of the best schedule so far (see prune.py).
+def abandon(state, model, done, abortAbove, tryStart, report, metrics):
+    if abortAbove is None or model.localSearch or state.stats.deficit() <= abortAbove:
+        return False
+    doomed = model.try_bound().certain_short(state, model, done)
+    if doomed <= abortAbove:
+        return False
+    if metrics is not None:
+        metrics.record(f"pruned after {PASSES[done]}", time.perf_counter() - tryStart, doomed=doomed)
+    if report:
+        print(f"Abandoned the try after the {PASSES[done]}: at least {doomed} people can no longer reach their minimum, the best schedule has {abortAbove}")
+    return True
+
+
+# Build one complete schedule. Set report=False to silence the per-phase summaries (e.g. in worker processes).
+# If metrics (an instrument.Metrics) is given, each pass is recorded with its wall time, placement attempts and
+# failed placements (no common open slot), dead ends (failed although both had open slots, see slots.py),
+# plus facmiss/scholmiss and reciprocal counts for the choice passes.
+# If abortAbove is given (the deficit of the best schedule so far), a try that can no longer get down to it is
+# abandoned between passes and returned as it stands (see abandon); it then ranks below the best schedule.
+def build_schedule(model, rng, report=True, metrics=None, abortAbove=None):
+    VERBOSE = model.verbose
+    Faculty = model.Faculty
+    Scholars = model.Scholars
+    FacChoices = model.FacChoices
+    ScholChoices = model.ScholChoices
+    candidates = model.candidates
+    MAXInt = model.MAXInt
+    MINFacInt = model.MINFacInt
+
+    # Reset schedules; open slots are tracked as bitmasks in the slot state
+    state = SlotState(Faculty, Scholars, model.FacAvail, model.facCancel, MAXInt, model.slotStrategy, model.grid,
+                      model.MINFacInt, model.MINScholInt)
+    FACsched = state.FACsched
+    nFACsched = state.nFACsched
+    SCHOLsched = state.SCHOLsched
+    nSCHOLsched = state.nSCHOLsched
+
+    # First start with faculty interests
+    phaseStart = tryStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts = 0
+    facmiss = {}
+    nfacmiss = 0
+    totfacmiss = 0
+
+    for i in range(5):
+        facOrd = randomize_order(Faculty.keys(), rng)
+        for fac in facOrd:
+            if fac not in FacChoices:
+                continue
+            if i < len(FacChoices[fac]):
+                schol = FacChoices[fac][i]
+                if schol not in Scholars:
+                    continue
+                if nSCHOLsched[schol] < MAXInt:
+                    attempts += 1
+                    if state.place(fac, schol, "FC", rng) < 0:
+                        if VERBOSE:
+                            print(f"{schol} can't match with {fac}, nSCHOLsched={nSCHOLsched[schol]}, nFACsched={nFACsched[fac]}")
+                        if fac not in facmiss:
+                            nfacmiss += 1
+                        facmiss[fac] = facmiss.get(fac, 0) + 1
+                        totfacmiss += 1
+
+    if metrics is not None:
+        metrics.record("FC pass", time.perf_counter() - phaseStart, attempts=attempts, failures=totfacmiss,
+                       deadends=state.deadEnds - deadEnds, facmiss=nfacmiss)
+
+    if VERBOSE:
+        print(f"{nfacmiss} faculty didn't get a slot with one of their top choices, {totfacmiss} overall:")
+        for fac in facmiss:
+            print(f"\t{fac}")
+
+    if report:
+        print("Incorporated faculty choices")
+        check_schedules(state, model)
+
+    if abandon(state, model, 0, abortAbove, tryStart, report, metrics):
+        return state, 0
+
+    # Now fill in schedule from scholar interests in the same way, but start with scholars with fewest interviews
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts = 0
+    scholmiss = {}
+    nrecipChoice = 0
+    for i in range(5):
+        #sort scholars with fewest interviews first
+        scholOrd = sorted(Scholars.keys(), key=lambda x: nSCHOLsched[x])
+        for schol in scholOrd:
+            if schol not in ScholChoices:
+                continue
+            if i < len(ScholChoices[schol]):
+                fac = ScholChoices[schol][i]
+                if fac not in Faculty or fac in model.facCancel:
+                    continue
+                if not state.facFree[fac]:
+                    continue
+                if fac in SCHOLsched[schol]: #already have an interview!
+                    nrecipChoice += 1
+                    continue
+                attempts += 1
+                if state.place(fac, schol, "SC", rng) < 0:
+                    if VERBOSE:
+                        print(f"{schol} can't match with {fac}, nFACsched={nFACsched[fac]}")
+                        print(f"schol {schol}:{SCHOLsched[schol]}")
+                        print(f"fac {fac}:{FACsched[fac]}")
+
+                    if schol not in scholmiss:
+                        scholmiss[schol] = 0
+                    scholmiss[schol] += 1
+
+    if metrics is not None:
+        metrics.record("SC pass", time.perf_counter() - phaseStart, attempts=attempts, failures=sum(scholmiss.values()),
+                       deadends=state.deadEnds - deadEnds, scholmiss=len(scholmiss), reciprocal=nrecipChoice)
+
+    if VERBOSE:
+        print(f"{len(scholmiss)} scholars didn't match with one of their top choices, {sum(scholmiss.values())} overall")
+
+    if report:
+        print(f"Incorporated scholar choices. {nrecipChoice} recipricol choice interviews")
+        check_schedules(state, model)
+
+    if abandon(state, model, 1, abortAbove, tryStart, report, metrics):
+        return state, nrecipChoice
+
+    # Randomly fill in remaining slots according to interests, starting with scholars, based on university of interest, and those with fewest interviews
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts, failures = fill_scholars(state, Scholars, candidates.SF, MAXInt, rng)
+
+    if metrics is not None:
+        metrics.record("RA pass: scholars", time.perf_counter() - phaseStart, attempts=attempts, failures=failures,
+                       deadends=state.deadEnds - deadEnds)
+
+    if report:
+        print(f"Added random matches based on interests: Scholars")
+        check_schedules(state, model)
+
+    if abandon(state, model, 2, abortAbove, tryStart, report, metrics):
+        return state, nrecipChoice
+
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts = failures = 0
+    for fac in sorted(nFACsched.keys(), key=lambda x: nFACsched[x]):
+        if nFACsched[fac] > MINFacInt:
+            continue
+        if fac in model.facCancel:
+            continue
+        for schol in candidates.FS[fac]:
+            if schol in FACsched[fac] or not state.scholFree[schol]:
+                continue
+            if VERBOSE:
+                print(f"{fac}={state.fac_slots_left(fac)}; {schol}={state.schol_slots_left(schol)}")
+            attempts += 1
+            if state.place(fac, schol, "RA", rng) < 0:
+                failures += 1
+            if nFACsched[fac] > MINFacInt:
+                break
+
+    if metrics is not None:
+        metrics.record("RA pass: faculty", time.perf_counter() - phaseStart, attempts=attempts, failures=failures,
+                       deadends=state.deadEnds - deadEnds)
+
+    if report:
+        print(f"Added random matches based on interests: faculty")
+        check_schedules(state, model)
+
+    if abandon(state, model, 3, abortAbove, tryStart, report, metrics):
+        return state, nrecipChoice
+
+    ## now lets add more random matches, ignoring university of interest for scholars. This will use the backup interest map
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts, failures = fill_scholars(state, Scholars, candidates.SFbk, MAXInt, rng)
+
+    if metrics is not None:
+        metrics.record("backup pass", time.perf_counter() - phaseStart, attempts=attempts, failures=failures,
+                       deadends=state.deadEnds - deadEnds)
+
+    if report:
+        print(f"Added random matches based on interests including universities Scholars did not select")
+        check_schedules(state, model)
+
+    # fix the few people still below their minimum by moving and trading interviews, rather than starting over
+    if model.localSearch:
+        phaseStart = time.perf_counter()
+        counts = improve_schedule(state, model, rng)
+        if metrics is not None:
+            metrics.record("local search", time.perf_counter() - phaseStart, **counts)
+        if report:
+            print(f"Local search: {counts['placed']} placed, {counts['moved']} placed after {counts['moves']} moves, {counts['ejected']} by trading an interview")
+            check_schedules(state, model)
+
+    return state, nrecipChoice
+
+
+# Check how many interviews everyone got, and who has too few; copied from the live statistics of the slot state
+def tally(state, model):
+    stats = state.stats
+    factoofew = dict.fromkeys(stats.facShort, True)
+    scholtoofew = dict.fromkeys(stats.scholShort, True)
+    return list(stats.facHist), list(stats.scholHist), list(stats.facFill), factoofew, scholtoofew
+
+
+# How good a schedule is, as a tuple where smaller is better: first the number of people below their minimum (deficit),
+# then the most interviews, then the most interviews where one side had chosen the other
+def schedule_rank(state, model, deficit):
+    chosen = 0
+    for schol, slots in state.SCHOLsched.items():
+        mine = model.ScholChoices.get(schol, ())
+        theirs = model.ScholChosenBy.get(schol, ())
+        for fac in slots:
+            if fac and (fac in mine or fac in theirs):
+                chosen += 1
+    return deficit, -state.stats.interviews, -chosen
+
+
+# Each worker process keeps its own copy of the model and a shared flag to stop once someone succeeds
+_workerModel = None
+_workerStop = None
+
+
+def _init_worker(model, stop):
+    global _workerModel, _workerStop
+    _workerModel = model
+    _workerStop = stop
+
+
+# Run up to nTries tries from one seed; return the best one as (rank, try number, state, nrecipChoice, seed),
+# the number of tries run and the per-phase metric totals of those tries.
+# Replaying that many tries from random.Random(seed) the same way (abandoning the same ones) rebuilds the same schedule.
+def _run_tries(seed, nTries, stopAtZero):
+    rng = random.Random(seed)
+    metrics = Metrics()
+    floor = _workerModel.try_bound().floor
+    best = None
+    ntried = 0
+    for _ in range(nTries):
+        if _workerStop.is_set():
+            break
+        ntried += 1
+        state, nrecipChoice = build_schedule(_workerModel, rng, report=False, metrics=metrics,
+                                             abortAbove=None if best is None else best[0][0])
+        rank = schedule_rank(state, _workerModel, state.stats.deficit())
+        if best is None or rank < best[0]:
+            best = (rank, ntried, state, nrecipChoice, seed)
+        if stopAtZero and rank[0] <= floor:
+            _workerStop.set()
+            break
+    return best, ntried, metrics.totals()
+
+
+# Fan maxTries independent tries out over nWorkers processes and keep the best schedule (see schedule_rank).
+# Tries are handed out in chunks of triesPerTask, each chunk with its own random stream spawned from seed
+# (numpy SeedSequence), so the streams are independent of each other.
+# Returns (state, nrecipChoice, deficit, tries run, (stream seed, try number) of the kept schedule),
+# stopping everyone as soon as a try leaves nobody below minimum (but the floor of prune.py, who never can reach it)
+# unless stopAtZero is False.
+# Per-phase metrics of all tries are merged into metrics.
+def multi_start(model, nWorkers, maxTries, seed=None, triesPerTask=5, metrics=None, stopAtZero=True):
+    model.try_bound()  # built once here, so the forked workers do not each build it
+    nTasks = (maxTries + triesPerTask - 1) // triesPerTask
+    streams = [int(s.generate_state(1, np.uint64)[0]) for s in np.random.SeedSequence(seed).spawn(nTasks)]
+    best = None
+    totTries = 0
+    # createSchedule.py runs at import time, so workers are forked rather than spawned where the platform allows it
+    ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    with ctx.Manager() as manager:
+        stop = manager.Event()
+        with ProcessPoolExecutor(max_workers=nWorkers, mp_context=ctx, initializer=_init_worker, initargs=(model, stop)) as pool:
+            futures = []
+            for t in range(nTasks):
+                nTries = min(triesPerTask, maxTries - t * triesPerTask)
+                futures.append(pool.submit(_run_tries, streams[t], nTries, stopAtZero))
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                result, ntried, totals = future.result()
+                totTries += ntried
+                if metrics is not None:
+                    metrics.merge(totals)
+                if result is not None and (best is None or result[0] < best[0]):
+                    best = result
+                if stopAtZero and best is not None and best[0][0] <= model.try_bound().floor:
+                    stop.set()
+                    for f in futures:
+                        f.cancel()
+    if best is None:
+        return None, 0, None, totTries, None
+    rank, tryNumber, state, nrecipChoice, streamSeed = best
+    return state, nrecipChoice, rank[0], totTries, (streamSeed, tryNumber)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Quality metrics of finished schedules, beyond whether everyone got their minimum. A schedule is encoded as two
+faculty x slot arrays (ScheduleScorer.encode): the scholar (affinity column id) in each slot, OPEN or UNAVAILABLE,
+and why the interview was placed. score() takes one encoded schedule or a stack of them and computes every metric for
+all of them at once with numpy, so the tries of a long or parallel search are compared in one call.
+Metrics, one value per schedule:
+    deficit, interviews     people below their minimum, and interviews scheduled
+    facChoices, scholChoices    interviews with the faculty member's (scholar's) choice of each rank, one column per rank
+    chosen                  interviews where either side chose the other (as in scheduler.schedule_rank)
+    reciprocal, reciprocalShare interviews where both chose each other, and their share of all such pairs
+    raAffinityMean, raAffinityMin   interest affinity of the RA (random assignment) interviews
+    inUniShare, backupShare share of interviews at a university the scholar listed, and at one they did not, by affinity
+    facGini, scholGini      Gini coefficient of the interview counts (0 = everyone has the same number)
+    facGaps, scholGaps      open slots between a person's first and last interview of a session, summed over everyone
+"""
+
+import numpy as np
+
+OPEN = -1  # encoded slot with no interview
+UNAVAILABLE = -2  # encoded faculty slot marked NA
+WHYCODES = {"FC": 1, "SC": 2, "RA": 3}  # encoded reasons; anything else is 0
+CHUNK = 32  # schedules scored at once, which bounds the memory of the per-scholar arrays
+# schedules are ranked by these metrics in turn: (metric, 1 if smaller is better, -1 if larger is better)
+OBJECTIVES = (("deficit", 1), ("interviews", -1), ("chosen", -1))
+
+
+# Every chosen pair as sorted pair keys (faculty row * columns + scholar column), with the rank the faculty member
+# and the scholar gave it (-1 if they did not choose it)
+def choice_keys(FacChoices, ScholChoices, affinity):
+    ranks = {}
+    for choices, side in ((FacChoices, 0), (ScholChoices, 1)):
+        for person, chosen in choices.items():
+            for rank, other in enumerate(chosen):
+                fac, schol = (person, other) if side == 0 else (other, person)
+                if fac in affinity.facIndex and schol in affinity.scholIndex:
+                    pair = ranks.setdefault(affinity.facIndex[fac] * len(affinity.scholIDs) + affinity.scholIndex[schol], [-1, -1])
+                    if pair[side] < 0:
+                        pair[side] = rank
+    keys = np.array(sorted(ranks), dtype=np.int64)
+    return keys, np.array([ranks[k] for k in keys.tolist()], dtype=np.int64).reshape(len(keys), 2)
+
+
+# the faculty and scholar rank of each pair key, from choice_keys; -1 where that side did not choose it
+def lookup(keys, ranks, pairs):
+    if len(keys) == 0:
+        return np.full((len(pairs), 2), -1)
+    pos = np.minimum(np.searchsorted(keys, pairs), len(keys) - 1)
+    return np.where((keys[pos] == pairs)[:, None], ranks[pos], -1)
+
+
+# Gini coefficient of each row of counts
+def gini(counts):
+    n = counts.shape[1]
+    if n == 0:
+        return np.zeros(counts.shape[0])
+    x = np.sort(counts, axis=1).astype(np.float64)
+    total = x.sum(axis=1)
+    weighted = (x * np.arange(1, n + 1)).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, 2 * weighted / (n * total) - (n + 1) / n, 0.0)
+
+
+# Open slots between each person's first and last interview of every session, summed over people.
+# booked and free are schedules x people x slots; sessions are (first slot, end) ranges.
+def idle_gaps(booked, free, sessions):
+    gaps = np.zeros(booked.shape[0], dtype=np.int64)
+    for a, b in sessions:
+        seg = booked[..., a:b]
+        width = b - a
+        first = seg.argmax(axis=-1)
+        last = width - 1 - seg[..., ::-1].argmax(axis=-1)
+        freeBefore = np.cumsum(free[..., a:b], axis=-1)  # open slots up to and including each slot
+        between = (np.take_along_axis(freeBefore, last[..., None], -1) - np.take_along_axis(freeBefore, first[..., None], -1))[..., 0]
+        gaps += np.where(seg.any(axis=-1), between, 0).sum(axis=-1)
+    return gaps
+
+
+class ScheduleScorer:
+    def __init__(self, model):
+        affinity = model.affinity
+        self.affinity = affinity
+        self.MINFacInt = model.MINFacInt
+        self.MINScholInt = model.MINScholInt
+        self.MAXInt = model.MAXInt
+        self.faculty = [fac for fac in model.Faculty if fac not in model.facCancel]  # row order of encoded schedules
+        self.facRows = np.array([affinity.facIndex[fac] for fac in self.faculty], dtype=np.int64)
+        self.scholCols = np.array([affinity.scholIndex[schol] for schol in model.Scholars], dtype=np.int64)
+        self.codes = dict(affinity.scholIndex)  # slot content -> encoded value
+        self.codes[""] = OPEN
+        self.codes["NA"] = UNAVAILABLE
+        self.choiceKeys, self.choiceRanks = choice_keys(model.FacChoices, model.ScholChoices, affinity)
+        self.nRanks = int(self.choiceRanks.max(initial=-1)) + 1
+        # pairs where both chose each other, between people still in the event
+        mutual = self.choiceKeys[(self.choiceRanks >= 0).all(axis=1)]
+        activeFac = np.zeros(len(affinity.facIDs), dtype=bool)
+        activeFac[self.facRows] = True
+        activeSchol = np.zeros(len(affinity.scholIDs), dtype=bool)
+        activeSchol[self.scholCols] = True
+        nCols = len(affinity.scholIDs)
+        self.nMutual = int((activeFac[mutual // nCols] & activeSchol[mutual % nCols]).sum())
+        # sessions as (first slot, end) ranges; slots are numbered in session order
+        if model.grid is None:
+            self.sessions = [(0, model.MAXInt)]
+        else:
+            self.sessions = []
+            for s in range(len(model.grid.capacity)):
+                slots = [t for t in range(model.MAXInt) if model.grid.session[t] == s]
+                if slots:
+                    self.sessions.append((slots[0], slots[-1] + 1))
+
+    # one schedule (a slots.SlotState) as (scholar in each slot, why code of each slot), both faculty x slot arrays
+    def encode(self, state):
+        codes = self.codes
+        slots = np.array([[codes[schol] for schol in state.FACsched[fac]] for fac in self.faculty], dtype=np.int32)
+        why = np.array([[WHYCODES.get(w, 0) for w in state.FACschedWhy[fac]] for fac in self.faculty], dtype=np.int8)
+        return slots.reshape(len(self.faculty), self.MAXInt), why.reshape(len(self.faculty), self.MAXInt)
+
+    # Every metric (see NOTES) of one encoded schedule, or of a stack of them (schedules x faculty x slots).
+    # Returns a dictionary of metric -> array with one entry per schedule (a single value for a single schedule).
+    def score(self, slots, why):
+        slots = np.asarray(slots)
+        why = np.asarray(why)
+        single = slots.ndim == 2
+        if single:
+            slots, why = slots[None], why[None]
+        parts = [self.score_chunk(slots[k:k + CHUNK], why[k:k + CHUNK]) for k in range(0, len(slots), CHUNK)]
+        scores = {name: np.concatenate([part[name] for part in parts]) for name in parts[0]}
+        if single:
+            scores = {name: values[0] for name, values in scores.items()}
+        return scores
+
+    def score_chunk(self, slots, why):
+        affinity = self.affinity
+        nSched = slots.shape[0]
+        nCols = len(affinity.scholIDs)
+        booked = slots >= 0
+        n, f, t = np.nonzero(booked)
+        cols = slots[booked].astype(np.int64)  # same order as nonzero
+        pairs = self.facRows[f] * nCols + cols
+
+        # interview counts and the people below their minimum
+        facCount = booked.sum(axis=2)
+        scholCount = np.bincount(n * nCols + cols, minlength=nSched * nCols).reshape(nSched, nCols)[:, self.scholCols]
+        scores = {
+            "deficit": (facCount < self.MINFacInt).sum(axis=1) + (scholCount < self.MINScholInt).sum(axis=1),
+            "interviews": facCount.sum(axis=1),
+        }
+
+        # choices kept, by rank
+        ranks = lookup(self.choiceKeys, self.choiceRanks, pairs)
+        facRank, scholRank = ranks[:, 0], ranks[:, 1]
+        for name, rank in (("facChoices", facRank), ("scholChoices", scholRank)):
+            hit = rank >= 0
+            scores[name] = np.bincount(n[hit] * self.nRanks + rank[hit],
+                                       minlength=nSched * self.nRanks).reshape(nSched, self.nRanks)
+        scores["chosen"] = np.bincount(n[(facRank >= 0) | (scholRank >= 0)], minlength=nSched)
+        scores["reciprocal"] = np.bincount(n[(facRank >= 0) & (scholRank >= 0)], minlength=nSched)
+        scores["reciprocalShare"] = scores["reciprocal"] / self.nMutual if self.nMutual else np.zeros(nSched)
+
+        # affinity of the random assignments, and in-university vs backup placements
+        inUni = np.take(affinity.inUni, pairs)
+        backup = np.take(affinity.backup, pairs)
+        ra = why[booked] == WHYCODES["RA"]
+        nRA = np.bincount(n[ra], minlength=nSched)
+        value = inUni[ra].astype(np.int64) + backup[ra]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores["raAffinityMean"] = np.where(nRA > 0, np.bincount(n[ra], weights=value, minlength=nSched) / nRA, np.nan)
+            # unbuffered minimum per schedule; reduceat over runs of value loses the last RA interview of a schedule
+            # when the schedules after it have none
+            lowest = np.full(nSched, np.inf)
+            np.minimum.at(lowest, n[ra], value)
+            scores["raAffinityMin"] = np.where(nRA > 0, lowest, np.nan)
+            total = scores["interviews"]
+            scores["inUniShare"] = np.where(total > 0, np.bincount(n[inUni > 0], minlength=nSched) / total, 0.0)
+            scores["backupShare"] = np.where(total > 0, np.bincount(n[backup > 0], minlength=nSched) / total, 0.0)
+
+        # fairness and idle gaps; scholars' slots are laid out from the faculty arrays
+        scores["facGini"] = gini(facCount)
+        scores["scholGini"] = gini(scholCount)
+        scores["facGaps"] = idle_gaps(booked, slots == OPEN, self.sessions)
+        scholBooked = np.zeros((nSched, nCols, self.MAXInt), dtype=bool)
+        scholBooked[n, cols, t] = True
+        scholBooked = scholBooked[:, self.scholCols]
+        scores["scholGaps"] = idle_gaps(scholBooked, ~scholBooked, self.sessions)
+        return scores
+
+    # Indices of the scored schedules from best to worst, by the metrics of objectives in turn (see OBJECTIVES)
+    @staticmethod
+    def rank(scores, objectives=OBJECTIVES):
+        keys = [sign * np.asarray(scores[name], dtype=np.float64) for name, sign in reversed(objectives)]
+        return np.lexsort(keys)
+
+    # The metrics of schedule k of scores (or of a single schedule's scores) as [metric, value] rows for a sheet
+    def rows(self, scores, k=None):
+        pick = (lambda v: v) if k is None else (lambda v: v[k])
+        rows = []
+        for name, values in scores.items():
+            value = pick(values)
+            if name in ("facChoices", "scholChoices"):
+                rows += [[f"{name} rank {r + 1}", int(value[r])] for r in range(self.nRanks)]
+            elif isinstance(value, (float, np.floating)):
+                rows.append([name, round(float(value), 3)])
+            else:
+                rows.append([name, int(value)])
+        return rows
+
+    def report(self, scores, k=None):
+        score = {name: values if k is None else values[k] for name, values in scores.items()}
+        print(f"Schedule quality: {score['interviews']} interviews, {score['deficit']} people with too few")
+        print(f"\tfaculty choices kept by rank: {', '.join(str(x) for x in score['facChoices'])}; scholar choices: {', '.join(str(x) for x in score['scholChoices'])}")
+        print(f"\t{score['chosen']} interviews with a chosen partner; {score['reciprocal']} reciprocal ({100 * score['reciprocalShare']:.0f}% of {self.nMutual} reciprocal choices)")
+        print(f"\tRA affinity mean {score['raAffinityMean']:.2f}, min {score['raAffinityMin']:.0f}; {100 * score['inUniShare']:.0f}% in-university, {100 * score['backupShare']:.0f}% backup")
+        print(f"\tGini of interview counts: faculty {score['facGini']:.3f}, scholars {score['scholGini']:.3f}; idle slots between interviews: faculty {score['facGaps']}, scholars {score['scholGaps']}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Sharded scheduling for very large events. Universities are grouped into clusters linked by scholar preferences: two
+universities are linked by every scholar who listed both, and the most strongly linked ones are merged while a
+cluster stays within its share of the event, so most scholars have every university they listed in one cluster.
+Every faculty member belongs to the cluster of their university and every scholar to the cluster holding most of
+the universities they listed.
+Each cluster is an ordinary ScheduleModel restricted to its own people, and the clusters are scheduled in parallel
+worker processes with the usual greedy tries. They share nobody, so their schedules are merged as they are. A
+reconciliation pass over the whole event then adds choices between people in different clusters, in-university
+matches for scholars whose universities span clusters, the cross-university backup fill, and the local search for
+anyone still short. The work per cluster grows with the cluster, not with the event, so the whole run stays close to
+linear in the number of people.
+"""
+
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from improve import improve_schedule
+from instrument import Metrics
+from scheduler import ScheduleModel, build_schedule, fill_scholars, randomize_order, schedule_rank
+from slots import SlotState
+
+SHARDTRIES = 5  # greedy tries per cluster; a cluster stops at its first try that leaves nobody in it short who could
+# reach their minimum within the cluster (see prune.py)
+SLACK = 1.2  # linked universities are merged while the cluster stays within SLACK times its share of the event
+
+
+# Group universities into at most nShards clusters, balanced by people (active faculty at the university, and scholars
+# whose first listed university it is). Returns a list of lists of universities.
+def university_clusters(model, ScholarUni, nShards):
+    size = {}
+    for fac in model.Faculty:
+        if fac not in model.facCancel:
+            uni = model.Faculty[fac][2]
+            size[uni] = size.get(uni, 0) + 1
+    links = {}
+    for schol in model.Scholars:
+        unis = [u for u in dict.fromkeys(ScholarUni[schol][1:]) if u in size]
+        if unis:
+            size[unis[0]] += 1
+        for a in range(len(unis)):
+            for b in range(a + 1, len(unis)):
+                key = (unis[a], unis[b]) if unis[a] < unis[b] else (unis[b], unis[a])
+                links[key] = links.get(key, 0) + 1
+
+    # merge the most strongly linked universities first, while the merged cluster stays within its share
+    clusterOf = {u: u for u in size}  # university -> the university that names its cluster
+    members = {u: [u] for u in size}
+    load = dict(size)
+    target = SLACK * sum(size.values()) / nShards
+    for (a, b), n in sorted(links.items(), key=lambda x: -x[1]):
+        ca, cb = clusterOf[a], clusterOf[b]
+        if ca == cb or load[ca] + load[cb] > target:
+            continue
+        for u in members[cb]:
+            clusterOf[u] = ca
+        members[ca] += members.pop(cb)
+        load[ca] += load.pop(cb)
+
+    # then pack the clusters into nShards, largest first into the lightest
+    shards = [[] for _ in range(min(nShards, len(members)))]
+    shardLoad = [0] * len(shards)
+    for c in sorted(members, key=lambda c: -load[c]):
+        k = shardLoad.index(min(shardLoad))
+        shards[k] += members[c]
+        shardLoad[k] += load[c]
+    return shards
+
+
+# The split of an event into clusters, with a restricted ScheduleModel for each
+class ShardPlan:
+    def __init__(self, model, ScholarUni, nShards):
+        self.universities = university_clusters(model, ScholarUni, nShards)
+        shardOfUni = {u: k for k, unis in enumerate(self.universities) for u in unis}
+        nShards = len(self.universities)
+        self.faculty = [[] for _ in range(nShards)]  # shard -> its faculty
+        self.scholars = [[] for _ in range(nShards)]  # shard -> its scholars
+        self.facShard = {}  # faculty -> shard
+        self.scholShard = {}  # scholar -> shard
+        self.spanning = []  # scholars who listed universities in more than one shard
+        for fac in model.Faculty:
+            if fac not in model.facCancel:
+                k = shardOfUni[model.Faculty[fac][2]]
+                self.faculty[k].append(fac)
+                self.facShard[fac] = k
+        for schol in model.Scholars:
+            listed = [shardOfUni[u] for u in ScholarUni[schol][1:] if u in shardOfUni]
+            if listed:
+                # the shard with most of their universities; ties go to the shard of the first one listed
+                k = max(dict.fromkeys(listed), key=listed.count)
+                if len(set(listed)) > 1:
+                    self.spanning.append(schol)
+            else:
+                # nowhere they listed has faculty: the shard with the fewest scholars per faculty member
+                k = min(range(nShards), key=lambda k: (len(self.scholars[k]) + 1) / max(len(self.faculty[k]), 1))
+            self.scholars[k].append(schol)
+            self.scholShard[schol] = k
+        self.models = [shard_model(model, self.faculty[k], self.scholars[k]) for k in range(nShards)]
+
+    def __len__(self):
+        return len(self.models)
+
+    def report(self):
+        for k in range(len(self)):
+            print(f"\tCluster {k + 1}: {len(self.faculty[k])} faculty, {len(self.scholars[k])} scholars; {', '.join(sorted(self.universities[k]))}")
+        print(f"\t{len(self.spanning)} scholars listed universities in more than one cluster")
+
+
+# A ScheduleModel for only the given faculty and scholars: choices and candidates outside the group are dropped
+def shard_model(model, faculty, scholars):
+    facSet = set(faculty)
+    scholSet = set(scholars)
+
+    def keep(choices, people, allowed):
+        return {p: [c for c in chosen if c in allowed] for p, chosen in choices.items() if p in people}
+
+    return ScheduleModel({fac: model.Faculty[fac] for fac in faculty}, {schol: model.Scholars[schol] for schol in scholars},
+                         model.FacAvail, model.facCancel, keep(model.FacChoices, facSet, scholSet),
+                         keep(model.ScholChoices, scholSet, facSet), keep(model.FacChosenBy, facSet, scholSet),
+                         keep(model.ScholChosenBy, scholSet, facSet), model.affinity,
+                         model.candidates.restricted(facSet, scholSet), model.MAXInt, model.MINFacInt, model.MINScholInt,
+                         localSearch=model.localSearch, slotStrategy=model.slotStrategy, grid=model.grid)
+
+
+# Each worker process keeps its own copy of the cluster models
+_shardModels = None
+
+
+def _init_shard_worker(models):
+    global _shardModels
+    _shardModels = models
+
+
+# Up to nTries greedy tries of cluster k from one seed; returns (k, best state, its nrecipChoice, tries run, metric totals)
+def _schedule_shard(k, seed, nTries):
+    model = _shardModels[k]
+    rng = random.Random(seed)
+    metrics = Metrics()
+    floor = model.try_bound().floor
+    best = None
+    ntried = 0
+    for _ in range(nTries):
+        ntried += 1
+        state, nrecipChoice = build_schedule(model, rng, report=False, metrics=metrics,
+                                             abortAbove=None if best is None else best[0][0])
+        rank = schedule_rank(state, model, state.stats.deficit())
+        if best is None or rank < best[0]:
+            best = (rank, state, nrecipChoice)
+        if rank[0] <= floor:
+            break
+    return k, best[1], best[2], ntried, metrics.totals()
+
+
+# Choices between people in different clusters, in the order of the faculty and scholar choice passes.
+# Returns (attempts, failures, reciprocal choice interviews found).
+def reconcile_choices(state, model, plan, rng):
+    attempts = failures = nrecipChoice = 0
+    for i in range(5):
+        for fac in randomize_order(model.FacChoices.keys(), rng):
+            chosen = model.FacChoices[fac]
+            if fac not in state.facFree or i >= len(chosen):
+                continue
+            schol = chosen[i]
+            if schol not in model.Scholars or plan.scholShard[schol] == plan.facShard[fac] or fac in state.SCHOLsched[schol]:
+                continue
+            attempts += 1
+            if state.place(fac, schol, "FC", rng) < 0:
+                failures += 1
+    for i in range(5):
+        for schol in sorted(model.Scholars.keys(), key=lambda x: state.nSCHOLsched[x]):
+            chosen = model.ScholChoices.get(schol, ())
+            if i >= len(chosen):
+                continue
+            fac = chosen[i]
+            if fac not in state.facFree or plan.scholShard[schol] == plan.facShard[fac]:
+                continue
+            if fac in state.SCHOLsched[schol]:
+                nrecipChoice += 1
+                continue
+            attempts += 1
+            if state.place(fac, schol, "SC", rng) < 0:
+                failures += 1
+    return attempts, failures, nrecipChoice
+
+
+# One sharded try: schedule every cluster of plan (on nWorkers processes), merge them and reconcile the whole event.
+# Returns (state, nrecipChoice) like scheduler.build_schedule. Per-phase metrics of the clusters' tries and of each
+# reconciliation step go into metrics.
+def sharded_schedule(model, plan, nWorkers, seed=None, metrics=None, report=True):
+    streams = [int(s.generate_state(1, np.uint64)[0]) for s in np.random.SeedSequence(seed).spawn(len(plan) + 1)]
+    phaseStart = time.perf_counter()
+    results = []
+    if nWorkers > 1:
+        # like scheduler.multi_start, workers are forked where possible so the models are not copied to each of them
+        ctx = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=min(nWorkers, len(plan)), mp_context=ctx, initializer=_init_shard_worker,
+                                 initargs=(plan.models,)) as pool:
+            futures = [pool.submit(_schedule_shard, k, streams[k], SHARDTRIES) for k in range(len(plan))]
+            for future in as_completed(futures):
+                results.append(future.result())
+    else:
+        _init_shard_worker(plan.models)
+        for k in range(len(plan)):
+            results.append(_schedule_shard(k, streams[k], SHARDTRIES))
+    results.sort(key=lambda r: r[0])
+
+    # the clusters share nobody, so every interview carries over as it is
+    state = SlotState(model.Faculty, model.Scholars, model.FacAvail, model.facCancel, model.MAXInt, model.slotStrategy, model.grid,
+                      model.MINFacInt, model.MINScholInt)
+    nrecipChoice = 0
+    ntried = 0
+    for k, shardState, shardRecip, tries, totals in results:
+        for fac, row in shardState.FACsched.items():
+            for t, schol in enumerate(row):
+                if schol != "" and schol != "NA":
+                    state.assign(fac, schol, t, shardState.FACschedWhy[fac][t])
+        state.deadEnds += shardState.deadEnds
+        nrecipChoice += shardRecip
+        ntried += tries
+        if metrics is not None:
+            metrics.merge(totals)
+    if metrics is not None:
+        metrics.record("shards", time.perf_counter() - phaseStart, shards=len(plan), tries=ntried)
+    if report:
+        print(f"Scheduled {len(plan)} clusters ({ntried} tries)")
+
+    rng = random.Random(streams[-1])
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts, failures, recip = reconcile_choices(state, model, plan, rng)
+    nrecipChoice += recip
+    if metrics is not None:
+        metrics.record("reconcile: choices", time.perf_counter() - phaseStart, attempts=attempts, failures=failures,
+                       deadends=state.deadEnds - deadEnds, reciprocal=recip)
+
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts, failures = fill_scholars(state, plan.spanning, model.candidates.SF, model.MAXInt, rng)
+    if metrics is not None:
+        metrics.record("reconcile: spanning scholars", time.perf_counter() - phaseStart, attempts=attempts,
+                       failures=failures, deadends=state.deadEnds - deadEnds, scholars=len(plan.spanning))
+
+    phaseStart = time.perf_counter()
+    deadEnds = state.deadEnds
+    attempts, failures = fill_scholars(state, model.Scholars, model.candidates.SFbk, model.MAXInt, rng)
+    if metrics is not None:
+        metrics.record("reconcile: backup", time.perf_counter() - phaseStart, attempts=attempts, failures=failures,
+                       deadends=state.deadEnds - deadEnds)
+
+    if model.localSearch:
+        phaseStart = time.perf_counter()
+        counts = improve_schedule(state, model, rng)
+        if metrics is not None:
+            metrics.record("reconcile: local search", time.perf_counter() - phaseStart, **counts)
+    return state, nrecipChoice
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+The grid of interview slots. An event is one or more sessions (days, or a morning and an afternoon), each with its
+own slot times and optionally a capacity: the most interviews one person has within that session, so a long day is
+not booked back to back. Slots are numbered across the whole event in session order; slot t is bit t of the
+bitmasks in slots.py and column t of every schedule sheet, so 40 slots work the same way as the default 8.
+A grid is read from a JSON file laid out like DEFAULTGRID:
+    {"sessions": [{"name": "Day 1", "times": ["9:00-9:10", ...], "capacity": 6}, ...],
+     "availability": {"eastern time": 12, "pacific time": [36, 37, ...]}}
+availability gives, for each timezone of the faculty choices sheet, the column holding the answer for the first slot
+(the other slots follow in the next columns), or a list with the column of each slot. A slot without a column
+counts as available. Without a file, the event is the single session of DEFAULTGRID.
+"""
+
+import json
+
+DEFAULTGRID = {
+    "sessions": [{
+        "name": "Interviews",
+        "times": [
+            "9:45-9:55P/11:45-11:55C",
+            "10:00-10:10P/12:00-12:10C",
+            "10:15-10:25P/12:15-12:45C",
+            "10:30-10:40P/12:30-12:40C",
+            "11:15-11:25P/1:15-1:25C",
+            "11:30-11:40P/1:30-1:40C",
+            "11:45-11:55P/1:45-1:55C",
+            "12:00-12:10P/2:00-2:10C"
+        ],
+        "capacity": None
+    }],
+    # Columns of the faculty choices sheet that hold the availability answers, by timezone
+    # (double check columns! eastern is the default)
+    "availability": {
+        "eastern time": list(range(12, 19)),
+        "central time": list(range(20, 27)),
+        "mountain time": list(range(28, 35)),
+        "pacific time": list(range(36, 44))
+    }
+}
+
+
+class SlotGrid:
+    def __init__(self, sessions, availability):
+        self.sessionNames = []  # session -> name
+        self.capacity = []  # session -> most interviews per person in it, or None for no limit
+        self.sessionMasks = []  # session -> bitmask of its slots
+        self.times = []  # slot -> time
+        self.session = []  # slot -> session
+        for s, session in enumerate(sessions):
+            times = [str(t) for t in session["times"]]
+            if not times:
+                raise ValueError(f"session {session.get('name', s + 1)} has no slot times")
+            capacity = session.get("capacity")
+            if capacity is not None and capacity < 1:
+                raise ValueError(f"session {session.get('name', s + 1)} has capacity {capacity}; it must be at least 1")
+            self.sessionNames.append(str(session.get("name", f"Session {s + 1}")))
+            self.capacity.append(capacity)
+            self.sessionMasks.append(((1 << len(times)) - 1) << len(self.times))
+            self.times += times
+            self.session += [s] * len(times)
+        # timezone -> column of each slot's availability answer; may be shorter than the grid
+        self.availability = {}
+        for timezone, cols in availability.items():
+            if isinstance(cols, int):
+                cols = range(cols, cols + len(self.times))
+            self.availability[timezone.strip().lower()] = [int(c) for c in cols]
+
+    def __len__(self):
+        return len(self.times)
+
+    # True if any session limits the interviews a person has in it
+    def capped(self):
+        return any(c is not None for c in self.capacity)
+
+    # Column headers for the schedule sheets: the slot times, prefixed with the session name if there is more than one
+    def labels(self):
+        if len(self.sessionNames) == 1:
+            return list(self.times)
+        return [f"{self.sessionNames[s]} {t}" for s, t in zip(self.session, self.times)]
+
+    # The grid of the first nSlots slots only (see --max-interviews)
+    def truncate(self, nSlots):
+        sessions = []
+        for s, name in enumerate(self.sessionNames):
+            times = [t for t, session in zip(self.times[:nSlots], self.session) if session == s]
+            if times:
+                sessions.append({"name": name, "times": times, "capacity": self.capacity[s]})
+        return SlotGrid(sessions, self.availability)
+
+    # Everything that decides what a schedule can look like, for comparing grids (e.g. before resuming a checkpoint)
+    def layout(self):
+        return (tuple(self.sessionNames), tuple(self.capacity), tuple(self.times), tuple(self.session))
+
+
+# The grid in path (a JSON file, see NOTES), or the default grid if path is None
+def load_slot_grid(path=None):
+    if path is None:
+        config = DEFAULTGRID
+    else:
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    return SlotGrid(config["sessions"], config.get("availability", DEFAULTGRID["availability"]))
+
+
+# A grid of nSessions sessions of perSession slots each, for synthetic events; availability answers for each timezone
+# start at the same columns as the default grid's and run on for the whole grid
+def uniform_grid(nSessions, perSession, capacity=None):
+    sessions = [{"name": f"Session {s + 1}", "times": [f"slot {k + 1}" for k in range(perSession)], "capacity": capacity}
+                for s in range(nSessions)]
+    step = nSessions * perSession + 1
+    availability = {timezone: 12 + step * k for k, timezone in enumerate(DEFAULTGRID["availability"])}
+    return SlotGrid(sessions, availability)
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Slot bookkeeping for one scheduling try. Each person's free interview slots are stored as an integer bitmask
+(bit i set = slot i is open), so finding a slot that is free for both a faculty member and a scholar is a single AND,
+and the number of open slots is a popcount.
+Which of the common open slots an interview goes into is up to a slot strategy (SLOTSTRATEGIES). Every failed
+placement between two people who both still have open slots, just never the same one, is counted as a dead end.
+If the slot grid (slotgrid.py) caps the interviews a person has in a session, the rest of that session is closed for
+them as soon as they reach the cap and reopened if they drop below it, so every search sees a capped session as full.
+Counts over the whole schedule (how many people have n interviews, who is below their minimum, total interviews) are
+kept up to date by every assign and unassign in a ScheduleStats, so reports and the success test never rescan everyone.
+"""
+
+
+# pick a random set bit of mask using the random.Random rng; returns the slot index
+def random_bit(mask, rng):
+    k = rng.randrange(mask.bit_count())
+    for _ in range(k):
+        mask &= mask - 1  # drop the lowest set bit
+    return (mask & -mask).bit_length() - 1
+
+
+# the indices of the set bits of mask, lowest first
+def set_bits(mask):
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# Slot strategies: each picks one slot out of common, the slots open for both people, given the slot state.
+# "random" spreads interviews evenly; "early"/"late" pack everyone's day at one end, which keeps the other end open
+# in one piece; "constrained" takes the slot the fewest people still have open, using up scarce slots while it can;
+# "uncontended" takes the slot where the most faculty are still open per open scholar, leaving contended slots to others.
+def pick_random(state, common, rng):
+    return random_bit(common, rng)
+
+
+def pick_early(state, common, rng):
+    return (common & -common).bit_length() - 1
+
+
+def pick_late(state, common, rng):
+    return common.bit_length() - 1
+
+
+def pick_constrained(state, common, rng):
+    return min(set_bits(common), key=lambda t: state.facOpen[t] + state.scholOpen[t])
+
+
+def pick_uncontended(state, common, rng):
+    return max(set_bits(common), key=lambda t: state.facOpen[t] / (state.scholOpen[t] or 1))
+
+
+SLOTSTRATEGIES = {"random": pick_random, "early": pick_early, "late": pick_late, "constrained": pick_constrained,
+                  "uncontended": pick_uncontended}
+
+
+# Live statistics of one schedule, updated by SlotState on every assign and unassign
+class ScheduleStats:
+    __slots__ = ("MINFacInt", "MINScholInt", "facHist", "scholHist", "facFill", "facShort", "scholShort", "interviews")
+
+    def __init__(self, MAXInt, MINFacInt, MINScholInt):
+        self.MINFacInt = MINFacInt
+        self.MINScholInt = MINScholInt
+        self.facHist = [0] * (MAXInt + 1)  # number of faculty with n interviews
+        self.scholHist = [0] * (MAXInt + 1)  # number of scholars with n interviews
+        self.facFill = [0] * (MAXInt + 1)  # number of faculty with n slots closed (booked, unavailable or capped)
+        self.facShort = set()  # faculty below their minimum
+        self.scholShort = set()  # scholars below their minimum
+        self.interviews = 0
+
+    def add_faculty(self, fac, closed):
+        self.facHist[0] += 1
+        self.facFill[closed] += 1
+        if self.MINFacInt > 0:
+            self.facShort.add(fac)
+
+    def add_scholar(self, schol):
+        self.scholHist[0] += 1
+        if self.MINScholInt > 0:
+            self.scholShort.add(schol)
+
+    # fac and schol now have nFac and nSchol interviews, after a change of +1 or -1
+    def booked(self, fac, schol, nFac, nSchol, change):
+        self.interviews += change
+        self.facHist[nFac - change] -= 1
+        self.facHist[nFac] += 1
+        self.scholHist[nSchol - change] -= 1
+        self.scholHist[nSchol] += 1
+        if nFac == self.MINFacInt and change > 0:
+            self.facShort.discard(fac)
+        elif nFac == self.MINFacInt - 1 and change < 0:
+            self.facShort.add(fac)
+        if nSchol == self.MINScholInt and change > 0:
+            self.scholShort.discard(schol)
+        elif nSchol == self.MINScholInt - 1 and change < 0:
+            self.scholShort.add(schol)
+
+    # a faculty member went from before to after closed slots
+    def refilled(self, before, after):
+        if before != after:
+            self.facFill[before] -= 1
+            self.facFill[after] += 1
+
+    # people below their minimum
+    def deficit(self):
+        return len(self.facShort) + len(self.scholShort)
+
+    # fewest interviews anyone has, from a histogram (len(hist) - 1 if there is nobody)
+    @staticmethod
+    def lowest(hist):
+        return next((n for n, count in enumerate(hist) if count), len(hist) - 1)
+
+
+class SlotState:
+    def __init__(self, Faculty, Scholars, FacAvail, facCancel, MAXInt, strategy="random", grid=None, MINFacInt=0,
+                 MINScholInt=0):
+        self.MAXInt = MAXInt
+        self.stats = ScheduleStats(MAXInt, MINFacInt, MINScholInt)
+        self.grid = grid if grid is not None and grid.capped() else None  # only needed to enforce session capacities
+        self.strategy = strategy
+        self.pick = SLOTSTRATEGIES[strategy]
+        self.deadEnds = 0  # failed placements where both people had open slots, but none in common
+        self.facOpen = [0] * MAXInt  # number of faculty with slot t open
+        self.scholOpen = [0] * MAXInt  # number of scholars with slot t open
+        self.FACsched = {}
+        self.FACschedWhy = {}  # why a slot was filled: FC=faculty choice; SC=scholar choice; RA=random assignment
+        self.nFACsched = {}
+        self.facFree = {}  # bitmask of open slots for each faculty
+        self.SCHOLsched = {}
+        self.SCHOLschedWhy = {}
+        self.nSCHOLsched = {}
+        self.scholFree = {}  # bitmask of open slots for each scholar
+        self.facSessions = {}  # interviews of each faculty in each session, if sessions are capped
+        self.scholSessions = {}
+
+        # Initialize faculty schedules; slots they are not available for are marked NA and never opened
+        for fac in Faculty:
+            if fac in facCancel:
+                continue
+            self.nFACsched[fac] = 0
+            self.FACsched[fac] = []
+            self.FACschedWhy[fac] = []
+            mask = 0
+            for i in range(MAXInt):
+                if FacAvail[fac][i] == 0:
+                    self.FACsched[fac].append("NA")
+                    self.FACschedWhy[fac].append("NA")
+                else:
+                    self.FACsched[fac].append("")
+                    self.FACschedWhy[fac].append("")
+                    mask |= 1 << i
+                    self.facOpen[i] += 1
+            self.facFree[fac] = mask
+            self.stats.add_faculty(fac, MAXInt - mask.bit_count())
+            if self.grid is not None:
+                self.facSessions[fac] = [0] * len(self.grid.capacity)
+
+        # Initialize scholar schedules
+        allSlots = (1 << MAXInt) - 1
+        for schol in Scholars:
+            self.nSCHOLsched[schol] = 0
+            self.SCHOLsched[schol] = ["" for _ in range(MAXInt)]
+            self.SCHOLschedWhy[schol] = ["" for _ in range(MAXInt)]
+            self.scholFree[schol] = allSlots
+            self.stats.add_scholar(schol)
+            if self.grid is not None:
+                self.scholSessions[schol] = [0] * len(self.grid.capacity)
+        self.scholOpen = [len(self.scholFree)] * MAXInt
+
+    def fac_slots_left(self, fac):
+        return self.facFree[fac].bit_count()
+
+    def schol_slots_left(self, schol):
+        return self.scholFree[schol].bit_count()
+
+    def assign(self, fac, schol, slot, why):
+        closed = self.MAXInt - self.facFree[fac].bit_count()
+        self.FACsched[fac][slot] = schol
+        self.FACschedWhy[fac][slot] = why
+        self.SCHOLsched[schol][slot] = fac
+        self.SCHOLschedWhy[schol][slot] = why
+        self.facFree[fac] &= ~(1 << slot)
+        self.scholFree[schol] &= ~(1 << slot)
+        self.facOpen[slot] -= 1
+        self.scholOpen[slot] -= 1
+        self.nFACsched[fac] += 1
+        self.nSCHOLsched[schol] += 1
+        if self.grid is not None:
+            self.count_session(fac, schol, slot, 1)
+        self.stats.booked(fac, schol, self.nFACsched[fac], self.nSCHOLsched[schol], 1)
+        self.stats.refilled(closed, self.MAXInt - self.facFree[fac].bit_count())
+
+    def unassign(self, fac, schol, slot):
+        closed = self.MAXInt - self.facFree[fac].bit_count()
+        self.FACsched[fac][slot] = ""
+        self.FACschedWhy[fac][slot] = ""
+        self.SCHOLsched[schol][slot] = ""
+        self.SCHOLschedWhy[schol][slot] = ""
+        self.facFree[fac] |= 1 << slot
+        self.scholFree[schol] |= 1 << slot
+        self.facOpen[slot] += 1
+        self.scholOpen[slot] += 1
+        self.nFACsched[fac] -= 1
+        self.nSCHOLsched[schol] -= 1
+        if self.grid is not None:
+            self.count_session(fac, schol, slot, -1)
+        self.stats.booked(fac, schol, self.nFACsched[fac], self.nSCHOLsched[schol], -1)
+        self.stats.refilled(closed, self.MAXInt - self.facFree[fac].bit_count())
+
+    # Add change to both people's interview count in the session of slot, closing the rest of the session for anyone
+    # who reaches its capacity and reopening it for anyone who drops below
+    def count_session(self, fac, schol, slot, change):
+        s = self.grid.session[slot]
+        capacity = self.grid.capacity[s]
+        if capacity is None:
+            return
+        sessionMask = self.grid.sessionMasks[s] & ((1 << self.MAXInt) - 1)
+        for person, counts, free, sched, nOpen in ((fac, self.facSessions, self.facFree, self.FACsched, self.facOpen),
+                                                   (schol, self.scholSessions, self.scholFree, self.SCHOLsched, self.scholOpen)):
+            counts[person][s] += change
+            if counts[person][s] == capacity and change > 0:
+                closed = free[person] & sessionMask
+                free[person] &= ~closed
+                for t in set_bits(closed):
+                    nOpen[t] -= 1
+            elif counts[person][s] == capacity - 1 and change < 0:
+                for t in set_bits(sessionMask & ~free[person]):
+                    if sched[person][t] == "":
+                        free[person] |= 1 << t
+                        nOpen[t] += 1
+
+    # schedule fac and schol in a slot that is open for both, chosen by the slot strategy; returns the slot, or -1 if there is none
+    def place(self, fac, schol, why, rng):
+        common = self.facFree[fac] & self.scholFree[schol]
+        if not common:
+            if self.facFree[fac] and self.scholFree[schol]:
+                self.deadEnds += 1
+            return -1
+        slot = self.pick(self, common, rng)
+        self.assign(fac, schol, slot, why)
+        return slot
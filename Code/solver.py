@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Exact alternative to the randomized greedy tries: the whole day is solved at once as a time-indexed bipartite matching,
+x[f, s, t] = 1 if faculty f meets scholar s in slot t, with a mixed-integer program (HiGHS through scipy.optimize.milp).
+Per-person minimums are soft (a shortfall is allowed but heavily penalized), so the solve always returns a schedule;
+maximums and faculty availability are hard constraints. One solve is deterministic; there is nothing to retry.
+"""
+
+import numpy as np
+
+try:
+    from scipy.optimize import milp, LinearConstraint, Bounds
+    from scipy.sparse import coo_array
+except ImportError:  # scipy is only needed for this backend
+    milp = None
+
+from slots import SlotState
+
+# Objective weights: choices dominate interest affinity, in-university affinity beats backup affinity,
+# every interview is worth a little so schedules are filled, and each missing interview below a minimum costs the most
+FILLWEIGHT = 1
+CHOICEWEIGHT = 100  # times (NCHOICES - rank) for a faculty or scholar choice
+NCHOICES = 5
+BACKUPWEIGHT = 0.5  # scale on the backup (other university) affinity
+SHORTWEIGHT = 10000  # per interview a person is short of their minimum
+
+
+# weight of scheduling faculty f with scholar s; why is FC/SC/RA like the greedy passes
+def pair_weight(model, fac, schol, facRank, scholRank):
+    affinity = model.affinity
+    i = affinity.facIndex[fac]
+    j = affinity.scholIndex[schol]
+    weight = FILLWEIGHT + affinity.inUni[i, j] + BACKUPWEIGHT * affinity.backup[i, j]
+    why = "RA"
+    if scholRank is not None:
+        weight += CHOICEWEIGHT * (NCHOICES - scholRank)
+        why = "SC"
+    if facRank is not None:
+        weight += CHOICEWEIGHT * (NCHOICES - facRank)
+        why = "FC"
+    return weight, why
+
+
+def solve_milp(model, timeLimit=None, allPairs=False):
+    if milp is None:
+        raise ImportError("the milp solver backend needs scipy (pip install scipy)")
+
+    MAXInt = model.MAXInt
+    facList = [fac for fac in model.Faculty if fac not in model.facCancel]
+    scholList = list(model.Scholars)
+    facPos = {fac: i for i, fac in enumerate(facList)}
+    scholPos = {schol: j for j, schol in enumerate(scholList)}
+
+    # rank of each choice, keyed by (fac, schol)
+    facRank = {}
+    for fac, chosen in model.FacChoices.items():
+        for r, schol in enumerate(chosen):
+            facRank.setdefault((fac, schol), r)
+    scholRank = {}
+    for schol, chosen in model.ScholChoices.items():
+        for r, fac in enumerate(chosen):
+            scholRank.setdefault((fac, schol), r)
+
+    # candidate pairs: only pairs with a choice or some shared interest, as the greedy passes, unless allPairs; every
+    # pair makes the program far too large for a full event
+    pairs = []
+    weights = []
+    whys = []
+    for fac in facList:
+        i = model.affinity.facIndex[fac]
+        for schol in scholList:
+            j = model.affinity.scholIndex[schol]
+            key = (fac, schol)
+            if not allPairs and key not in facRank and key not in scholRank \
+                    and model.affinity.inUni[i, j] == 0 and model.affinity.backup[i, j] == 0:
+                continue
+            weight, why = pair_weight(model, fac, schol, facRank.get(key), scholRank.get(key))
+            pairs.append(key)
+            weights.append(weight)
+            whys.append(why)
+
+    # one binary variable per (pair, open slot)
+    varPair = []
+    varSlot = []
+    for p, (fac, schol) in enumerate(pairs):
+        for t in range(MAXInt):
+            if model.FacAvail[fac][t] != 0:
+                varPair.append(p)
+                varSlot.append(t)
+    varPair = np.array(varPair, dtype=np.int64)
+    varSlot = np.array(varSlot, dtype=np.int64)
+    nx = len(varPair)
+    nF = len(facList)
+    nS = len(scholList)
+    pairFac = np.array([facPos[fac] for fac, _ in pairs], dtype=np.int64)
+    pairSchol = np.array([scholPos[schol] for _, schol in pairs], dtype=np.int64)
+    varFac = pairFac[varPair]
+    varSchol = pairSchol[varPair]
+
+    # variables are x (nx binaries), then faculty shortfalls (nF) and scholar shortfalls (nS)
+    nvar = nx + nF + nS
+    cost = np.concatenate([-np.array(weights, dtype=float)[varPair], np.full(nF + nS, SHORTWEIGHT, dtype=float)])
+    ones = np.ones(nx)
+    constraints = []
+
+    def add_rows(rows, nrows, lb, ub, extraCols=None, extraRows=None):
+        cols = np.arange(nx)
+        data = ones
+        if extraCols is not None:
+            rows = np.concatenate([rows, extraRows])
+            cols = np.concatenate([cols, extraCols])
+            data = np.concatenate([data, np.ones(len(extraCols))])
+        A = coo_array((data, (rows, cols)), shape=(nrows, nvar)).tocsr()
+        constraints.append(LinearConstraint(A, lb, ub))
+
+    # each faculty slot and each scholar slot holds at most one interview
+    add_rows(varFac * MAXInt + varSlot, nF * MAXInt, -np.inf, 1)
+    add_rows(varSchol * MAXInt + varSlot, nS * MAXInt, -np.inf, 1)
+    # a pair meets at most once
+    add_rows(varPair, len(pairs), -np.inf, 1)
+    # per-person maximum, and minimum less any shortfall
+    add_rows(varFac, nF, -np.inf, MAXInt)
+    add_rows(varSchol, nS, -np.inf, MAXInt)
+    # per-person maximum within each session of the slot grid
+    if model.grid is not None and model.grid.capped():
+        nSessions = len(model.grid.capacity)
+        varSession = np.array(model.grid.session, dtype=np.int64)[varSlot]
+        capacity = np.array([np.inf if c is None else c for c in model.grid.capacity])
+        add_rows(varFac * nSessions + varSession, nF * nSessions, -np.inf, np.tile(capacity, nF))
+        add_rows(varSchol * nSessions + varSession, nS * nSessions, -np.inf, np.tile(capacity, nS))
+    add_rows(varFac, nF, model.MINFacInt, np.inf, nx + np.arange(nF), np.arange(nF))
+    add_rows(varSchol, nS, model.MINScholInt, np.inf, nx + nF + np.arange(nS), np.arange(nS))
+
+    integrality = np.concatenate([np.ones(nx), np.zeros(nF + nS)])
+    upper = np.concatenate([np.ones(nx), np.full(nF, model.MINFacInt), np.full(nS, model.MINScholInt)])
+    options = {"disp": model.verbose}
+    if timeLimit is not None:
+        options["time_limit"] = timeLimit
+    res = milp(cost, constraints=constraints, integrality=integrality, bounds=Bounds(0, upper), options=options)
+    if res.x is None:
+        raise RuntimeError(f"milp solver did not find a schedule: {res.message}")
+    print(f"milp solver: {res.message} ({nx} slot assignments considered)")
+
+    state = SlotState(model.Faculty, model.Scholars, model.FacAvail, model.facCancel, MAXInt, grid=model.grid,
+                      MINFacInt=model.MINFacInt, MINScholInt=model.MINScholInt)
+    nrecipChoice = 0
+    for k in np.flatnonzero(res.x[:nx] > 0.5):
+        fac, schol = pairs[varPair[k]]
+        state.assign(fac, schol, int(varSlot[k]), whys[varPair[k]])
+        if (fac, schol) in facRank and (fac, schol) in scholRank:
+            nrecipChoice += 1
+    return state, nrecipChoice
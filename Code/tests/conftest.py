@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Shared setup for the tests: the scheduler modules live side by side in Code/ and import each other by name,
+so that directory goes on the path. Events are synthetic ones from benchmark.generate_event, written as TSV so a
+cell can be blanked before loading.
+"""
+
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+CODEDIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CODEDIR)
+
+import benchmark
+import ingest
+from affinity import build_affinity
+from registry import build_registry
+from scheduler import ScheduleModel
+from slotgrid import load_slot_grid
+
+INPUTNAMES = ("Faculty_Cancel", "Scholar_Cancel", "Faculty_Registration", "Scholar_Registration", "Faculty_Choices",
+              "Scholar_Choices")
+
+
+# Run the loaders over an event's Data directory in the order createSchedule.py does; returns the inputs dictionary
+def load_event(dataDir):
+    inputs = {"slotGrid": load_slot_grid()}
+    files = {name: ingest.input_file(os.path.join(dataDir, name)) for name in INPUTNAMES}
+    ingest.load_faculty_cancel(files["Faculty_Cancel"], inputs)
+    ingest.load_scholar_cancel(files["Scholar_Cancel"], inputs)
+    ingest.load_faculty_registration(files["Faculty_Registration"], inputs)
+    ingest.load_scholar_registration(files["Scholar_Registration"], inputs)
+    inputs["registry"] = build_registry(inputs)
+    inputs["affinity"] = build_affinity(inputs["registry"], inputs["facCancel"])
+    ingest.load_faculty_choices(files["Faculty_Choices"], inputs)
+    ingest.load_scholar_choices(files["Scholar_Choices"], inputs)
+    return inputs
+
+
+def make_model(inputs, minInt=3, localSearch=True):
+    grid = inputs["slotGrid"]
+    affinity = inputs["affinity"]
+    facCancel = inputs["facCancel"]
+    return ScheduleModel(inputs["Faculty"], inputs["Scholars"], inputs["FacAvail"], facCancel, inputs["FacChoices"],
+                         inputs["ScholChoices"], inputs["FacChosenBy"], inputs["ScholChosenBy"], affinity,
+                         affinity.candidate_index(facCancel), len(grid), minInt, minInt, localSearch=localSearch,
+                         grid=grid)
+
+
+# Run createSchedule.py in batch mode on the event in dataDir, writing to outDir; returns the finished process
+def run_schedule(dataDir, outDir, *args, seed=1):
+    command = [sys.executable, "createSchedule.py", "--batch", "--seed", str(seed), "--input-dir",
+               os.path.dirname(dataDir), "--output-dir", outDir] + [str(a) for a in args]
+    return subprocess.run(command, cwd=CODEDIR, capture_output=True, text=True, timeout=300)
+
+
+# Both sides of every interview agree, nothing is booked in a slot the faculty member is not available for, and the
+# counts and live statistics match the schedules
+def check_consistent(state, model):
+    for fac, slots in state.FACsched.items():
+        booked = [(t, schol) for t, schol in enumerate(slots) if schol not in ("", "NA")]
+        for t, schol in booked:
+            assert state.SCHOLsched[schol][t] == fac
+            assert model.FacAvail[fac][t]
+        assert state.nFACsched[fac] == len(booked)
+    for schol, slots in state.SCHOLsched.items():
+        booked = [t for t, fac in enumerate(slots) if fac != ""]
+        assert state.nSCHOLsched[schol] == len(booked) <= model.MAXInt
+        for t in booked:
+            assert state.FACsched[slots[t]][t] == schol
+    assert state.stats.interviews == sum(state.nFACsched.values()) == sum(state.nSCHOLsched.values())
+    assert len(state.stats.facShort) == sum(n < model.MINFacInt for n in state.nFACsched.values())
+    assert len(state.stats.scholShort) == sum(n < model.MINScholInt for n in state.nSCHOLsched.values())
+
+
+# The reasons mirror the schedules, every open slot (and only those) is set in the free bitmasks and counted open,
+# and nobody has more interviews in a session than its capacity, which closes the rest of that session for them
+def check_slot_state(state):
+    grid = state.grid
+    for sched, whys, free, sessions, nOpen in ((state.FACsched, state.FACschedWhy, state.facFree, state.facSessions, state.facOpen),
+                                               (state.SCHOLsched, state.SCHOLschedWhy, state.scholFree, state.scholSessions, state.scholOpen)):
+        for t in range(state.MAXInt):
+            assert nOpen[t] == sum((mask >> t) & 1 for mask in free.values())
+        for person, slots in sched.items():
+            perSession = [0] * (len(grid.capacity) if grid is not None else 1)
+            for t, other in enumerate(slots):
+                if other in ("", "NA"):
+                    assert whys[person][t] == other
+                else:
+                    assert whys[person][t] in ("FC", "SC", "RA")
+                    perSession[grid.session[t] if grid is not None else 0] += 1
+            expected = 0
+            for t, other in enumerate(slots):
+                capacity = grid.capacity[grid.session[t]] if grid is not None else None
+                if other == "" and (capacity is None or perSession[grid.session[t]] < capacity):
+                    expected |= 1 << t
+            assert free[person] == expected
+            if grid is not None:
+                # only the capped sessions are counted
+                assert sessions[person] == [n if c is not None else 0 for n, c in zip(perSession, grid.capacity)]
+                assert all(c is None or n <= c for n, c in zip(perSession, grid.capacity))
+    for fac, slots in state.FACsched.items():
+        for t, schol in enumerate(slots):
+            if schol not in ("", "NA"):
+                assert state.SCHOLschedWhy[schol][t] == state.FACschedWhy[fac][t]
+
+
+# A small event whose first scholar left the research category and university questions blank
+@pytest.fixture(scope="session")
+def event(tmp_path_factory):
+    dataDir = str(tmp_path_factory.mktemp("event") / "Data")
+    benchmark.generate_event(dataDir, 30, 20, fmt="tsv", seed=1)
+    path = os.path.join(dataDir, "Scholar_Registration.tsv")
+    sheet = pd.read_csv(path, sep="\t", header=None, dtype=str, keep_default_na=False)
+    sheet.iloc[1, ingest.scholRegHeaderColumns["ResearchCat"]] = ""
+    sheet.iloc[1, ingest.scholRegHeaderColumns["SchoolChoice"]] = ""
+    sheet.to_csv(path, sep="\t", header=False, index=False)
+    return dataDir
+
+
+@pytest.fixture(scope="session")
+def inputs(event):
+    return load_event(event)
+
+
+@pytest.fixture(scope="session")
+def tiny_inputs(tmp_path_factory):
+    dataDir = str(tmp_path_factory.mktemp("tiny") / "Data")
+    benchmark.generate_event(dataDir, 8, 6, nUnis=2, nInterests=6, fmt="tsv", seed=2)
+    return load_event(dataDir)
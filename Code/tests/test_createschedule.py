@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of createSchedule.py as a whole, run in batch mode on a synthetic event in a separate process.
+"""
+
+import os
+import subprocess
+import sys
+
+from conftest import CODEDIR
+
+
+# A first parallel round whose tries were all stopped before running leaves no schedule at all: the run says so and
+# fails, rather than crashing on the missing best schedule
+def test_no_schedule_when_the_first_round_is_stopped(event, tmp_path):
+    outDir = str(tmp_path / "OUT")
+    argv = ["createSchedule.py", "--batch", "--seed", "1", "--workers", "2", "--input-dir", os.path.dirname(event),
+            "--output-dir", outDir]
+    script = ("import runpy, sys, scheduler\n"
+              "scheduler.multi_start = lambda *args, **kwargs: (None, 0, None, 4, None)\n"
+              f"sys.argv = {argv!r}\n"
+              "runpy.run_path('createSchedule.py', run_name='__main__')\n")
+    result = subprocess.run([sys.executable, "-c", script], cwd=CODEDIR, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 1
+    assert "no schedule was made" in result.stdout
+    assert "Traceback" not in result.stderr
+    assert not os.path.exists(os.path.join(outDir, "CompleteFacultySchedule.xlsx"))
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the individual schedule export (export.py and --export-mode): one workbook per person with the baseline
+sheet titles, one sheet per person in a single workbook, and a zip of the same workbooks the files mode writes,
+whether written by one process or several.
+"""
+
+import io
+import os
+import zipfile
+
+import pandas as pd
+import pytest
+
+from conftest import run_schedule
+from export import CHUNKSIZE, export_schedules, sheet_names
+
+TIMES = ["9:00", "9:15", "9:30"]
+LINK = "https://example.org/links"
+
+
+def sheets(source):
+    return pd.read_excel(source, sheet_name=None, header=None, keep_default_na=False)
+
+
+# Enough people for more than one chunk, with and without people of interest left unscheduled
+def people(n=CHUNKSIZE + 10):
+    return [(f"Person {k}", [f"Partner {k}", "NA", f"Partner {k + 1}"], [(f"Missed {k}", f"missed{k}@u.edu")] * (k % 3))
+            for k in range(n)]
+
+
+@pytest.mark.parametrize("nWorkers", [1, 2])
+def test_export_modes_agree(tmp_path, nWorkers):
+    group = people()
+    outDir = str(tmp_path / "Schedules")
+    for mode in ("files", "workbook", "zip"):
+        export_schedules(group, outDir, "Name", "Missed:", TIMES, LINK, mode, nWorkers, "Schedule")
+
+    files = {name: sheets(os.path.join(outDir, name)) for name in os.listdir(outDir)}
+    assert sorted(files) == sorted(f"{name}.xlsx" for name, slots, missing in group)
+    for name, slots, missing in group:
+        workbook = files[f"{name}.xlsx"]
+        assert list(workbook) == ["Schedule"]
+        sheet = workbook["Schedule"]
+        assert sheet.iloc[0].tolist()[:4] == ["Name"] + TIMES
+        assert sheet.iloc[1].tolist()[:4] == [name] + slots
+        assert sheet.iloc[3, 0] == "Please find all meeting links here"
+        assert len(sheet) == (6 + len(missing) if missing else 4)
+
+    # the single workbook has the same sheets, one per person, named after them
+    single = sheets(outDir + ".xlsx")
+    assert list(single) == [name for name, slots, missing in group]
+    for name in single:
+        assert single[name].equals(files[f"{name}.xlsx"]["Schedule"])
+
+    # the zip holds the same workbooks as the files mode
+    with zipfile.ZipFile(outDir + ".zip") as archive:
+        assert sorted(archive.namelist()) == sorted(files)
+        for entry in archive.namelist():
+            zipped = sheets(io.BytesIO(archive.read(entry)))
+            assert list(zipped) == ["Schedule"] and zipped["Schedule"].equals(files[entry]["Schedule"])
+
+
+def test_sheet_names_are_valid_and_unique():
+    names = sheet_names(["Ana Lee", "ana lee", "A/B: [x]?", "x" * 40, "x" * 40, ""])
+    assert names == ["Ana Lee", "ana lee (2)", "AB x", "x" * 31, "x" * 27 + " (2)", "Sheet"]
+
+
+# The whole run, once per mode: the per-person workbooks keep the baseline sheet titles (ScholarSchedule and
+# FacultySchedule), and every mode writes the same schedules for the same seed
+def test_createschedule_export_modes(event, tmp_path):
+    outputs = {}
+    for mode in ("files", "workbook", "zip"):
+        outDir = str(tmp_path / mode)
+        result = run_schedule(event, outDir, "--export-mode", mode)
+        assert result.returncode == 0, result.stdout + result.stderr
+        outputs[mode] = outDir
+
+    for folder, title in (("ScholarSchedules", "ScholarSchedule"), ("FacultySchedules", "FacultySchedule")):
+        filesDir = os.path.join(outputs["files"], folder)
+        files = {name: sheets(os.path.join(filesDir, name)) for name in os.listdir(filesDir)}
+        assert files
+        for workbook in files.values():
+            assert list(workbook) == [title]
+        assert not os.path.exists(os.path.join(outputs["workbook"], folder))
+        single = sheets(os.path.join(outputs["workbook"], folder + ".xlsx"))
+        assert len(single) == len(files)
+        with zipfile.ZipFile(os.path.join(outputs["zip"], folder + ".zip")) as archive:
+            assert sorted(archive.namelist()) == sorted(files)
+            for entry in archive.namelist():
+                zipped = sheets(io.BytesIO(archive.read(entry)))
+                assert list(zipped) == [title] and zipped[title].equals(files[entry][title])
+        for name, workbook in files.items():
+            assert single[name[:-len(".xlsx")]].equals(workbook[title])
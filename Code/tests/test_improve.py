@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the local search (improve.py) on greedy schedules that leave people short, in grids whose sessions are
+capped (two sessions of four slots with up to three interviews each, and four of two slots with one each). A few
+interviews are cancelled first, so that some fixes are direct placements. Every single fix is checked: nobody is pushed below their minimum, nothing is double
+booked, and the schedules, reasons, free bitmasks and session counts stay in step through moves and ejections.
+"""
+
+import random
+
+import improve
+from conftest import check_consistent, check_slot_state, make_model
+from scheduler import build_schedule
+from slotgrid import uniform_grid
+
+
+def test_improve_keeps_the_schedule_consistent(inputs, monkeypatch):
+    fixPerson = improve.fix_person
+    changes = []
+
+    def checked(state, model, partners, person, isFac, rng, counts):
+        facBefore = dict(state.nFACsched)
+        scholBefore = dict(state.nSCHOLsched)
+        change = fixPerson(state, model, partners, person, isFac, rng, counts)
+        changes.append(change)
+        check_consistent(state, model)
+        check_slot_state(state)
+        for fac, n in facBefore.items():
+            assert state.nFACsched[fac] >= min(n, model.MINFacInt)
+        for schol, n in scholBefore.items():
+            assert state.nSCHOLsched[schol] >= min(n, model.MINScholInt)
+        before = facBefore if isFac else scholBefore
+        after = state.nFACsched if isFac else state.nSCHOLsched
+        assert after[person] == before[person] + (change is not None)
+        return change
+
+    monkeypatch.setattr(improve, "fix_person", checked)
+    for grid, minInt in ((uniform_grid(2, 4, 3), 4), (uniform_grid(4, 2, 1), 3)):
+        model = make_model(dict(inputs, slotGrid=grid), minInt=minInt, localSearch=False)
+        for seed in range(3):
+            state, _ = build_schedule(model, random.Random(seed), report=False)
+            for fac in sorted(state.FACsched)[::5]:
+                t = next((t for t, schol in enumerate(state.FACsched[fac]) if schol not in ("", "NA")), None)
+                if t is not None:
+                    state.unassign(fac, state.FACsched[fac][t], t)
+            check_slot_state(state)
+            deficit = state.stats.deficit()
+            counts = improve.improve_schedule(state, model, random.Random(seed))
+            assert counts["short"] == state.stats.deficit() <= deficit
+    # the search got to use every kind of fix
+    assert {"placed", "moved", "ejected"} <= set(changes)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the input readers: the raw Qualtrics exports shipped in Data/ (found regardless of case, columns located by
+header text, name-only cancellations), blank answers, the snapshot cache and the format sniffing of delimited files.
+"""
+
+import os
+import re
+import shutil
+
+import pandas as pd
+import pytest
+
+import ingest
+from conftest import INPUTNAMES, load_event
+
+DATADIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "Data")
+
+
+# The shipped exports, copied so the parse caches are not written next to the originals
+@pytest.fixture(scope="module")
+def shipped(tmp_path_factory):
+    dataDir = str(tmp_path_factory.mktemp("shipped"))
+    for name in os.listdir(DATADIR):
+        if name.endswith(".tsv"):
+            shutil.copy(os.path.join(DATADIR, name), dataDir)
+    return dataDir
+
+
+def test_input_file_ignores_case(shipped):
+    assert ingest.input_file(os.path.join(shipped, "Faculty_Cancel")) == os.path.join(shipped, "Faculty_CANCEL.tsv")
+    assert ingest.input_file(os.path.join(shipped, "Scholar_Cancel")) == os.path.join(shipped, "Scholar_CANCEL.tsv")
+    assert ingest.input_file(os.path.join(shipped, "Missing")) == os.path.join(shipped, "Missing.xlsx")
+
+
+def test_shipped_exports(shipped):
+    inputs = load_event(shipped)
+
+    # cancellations are names only; each matched a registration and was dropped
+    assert len(inputs["facCancelNames"]) == 8 and len(inputs["scholCancelNames"]) == 5
+    for key in inputs["facCancelNames"]:
+        assert key not in inputs["facultyNAMEtoEMAIL"]
+    for key in inputs["scholCancelNames"]:
+        assert key not in inputs["scholN2E"]
+    assert len(inputs["Faculty"]) == 105 and len(inputs["Scholars"]) == 100
+
+    # fields come from the columns with the right headers, not from the positions of a converted workbook
+    emma = "emma.smith@u.edu"
+    assert inputs["Faculty"][emma][1] == "https://u.zoom.us/j/77898328486"
+    assert inputs["Faculty"][emma][4:] == ["computational biology/medical informatics", "human genetics",
+                                           "epidemiology & biostatistics"]
+    assert inputs["FacAvail"][emma] == [0, 0, 0, 0, 0, 1, 1, 1]
+    assert inputs["FacChoices"][emma][:2] == ["natalia.adams@university.edu", "mariana.barnes@university.edu"]
+    sofia = "sofia.rodriguez@university.edu"
+    assert inputs["Scholars"][sofia][2:] == ["epidemiology & biostatistics", "computational biology/medical informatics",
+                                             "human genetics"]
+    assert inputs["ScholChoices"][sofia][:2] == ["noah.jones@u.edu", "sofia.robinson@u.edu"]  # Lillian Baker cancelled
+    interests = [fac[4:] for fac in inputs["Faculty"].values()] + [schol[2:] for schol in inputs["Scholars"].values()]
+    for personInterests in interests:
+        assert all(re.search("[a-z]", interest) for interest in personInterests)
+        assert "no preference" not in personInterests
+
+
+def test_shipped_snapshot_files(shipped):
+    # every input of createSchedule.py resolves to a shipped file
+    for name in INPUTNAMES:
+        assert os.path.exists(ingest.input_file(os.path.join(shipped, name)))
+
+
+# The scholar of the event fixture who left the category and university questions blank is read, and the snapshot
+# cache hands the parsed inputs back unchanged
+def test_blank_answers_and_snapshot(event, inputs):
+    blank = [email for email in inputs["Scholars"] if email.endswith(".scholar0@scholar.edu")]
+    assert blank, "the scholar with blank answers was not read"
+    assert blank[0] in inputs["cat2schol"][""]
+    assert inputs["ScholarUni"][blank[0]] == [0]
+
+    # the snapshot cache hands back the same inputs while the files are unchanged
+    files = [ingest.input_file(os.path.join(event, name)) for name in INPUTNAMES]
+    snapshotFile = ingest.cache_path(files[0], "inputs.pkl")
+    ingest.save_snapshot(snapshotFile, files, inputs)
+    cached = ingest.load_snapshot(snapshotFile, files)
+    assert cached is not None
+    for key in ("Faculty", "Scholars", "FacAvail", "FacChoices", "ScholChoices", "ScholarUni", "cat2schol"):
+        assert cached[key] == inputs[key]
+    assert (cached["affinity"].inUni == inputs["affinity"].inUni).all()
+
+
+ROWS = [["Name", "Email", "Statement"],
+        ["Zoë Álvarez", "zoe@u.edu", "Line one\nline two, with a comma\tand a tab"],
+        ["Ana Õrn", "ana@u.edu", ""]]
+
+
+def write_delimited(path, rows, encoding, delimiter):
+    import csv
+    with open(path, "w", newline="", encoding=encoding) as fh:
+        csv.writer(fh, delimiter=delimiter).writerows(rows)
+
+
+@pytest.mark.parametrize("encoding, delimiter, expected", [
+    ("utf-16", "\t", "utf-16"),
+    ("utf-16-le", "\t", "utf-16-le"),
+    ("cp1252", "\t", "cp1252"),
+    ("utf-8", ",", "utf-8"),
+    ("utf-8-sig", ",", "utf-8-sig"),
+])
+def test_sniff_format(tmp_path, encoding, delimiter, expected):
+    path = str(tmp_path / "export.txt")
+    write_delimited(path, ROWS, encoding, delimiter)
+    assert ingest.sniff_format(path) == (expected, delimiter)
+
+    # the quoted multi-line statement is one cell, and an empty cell reads as NaN like pd.read_excel
+    df = ingest.read_table(path)
+    assert df.shape == (3, 3)
+    assert df.iloc[1].tolist() == ROWS[1]
+    assert df.iloc[2, 0] == "Ana Õrn"
+    assert df.iloc[2, 2] != df.iloc[2, 2]
+
+
+# Blank interest and choice cells read as empty and are dropped. Before the column-wise loaders they became the
+# token "nan", which counted as a shared research interest between everyone who left the same question blank.
+def test_blank_cells_are_dropped(tmp_path):
+    import benchmark
+    dataDir = str(tmp_path / "Data")
+    benchmark.generate_event(dataDir, 12, 10, fmt="tsv", seed=3)
+
+    def blank(name, row, cols):
+        path = os.path.join(dataDir, name + ".tsv")
+        sheet = pd.read_csv(path, sep="\t", header=None, dtype=str, keep_default_na=False)
+        for col in cols:
+            sheet.iloc[row, col] = ""
+        sheet.to_csv(path, sep="\t", header=False, index=False)
+        return sheet.iloc[row]
+
+    facInt = [ingest.facRegHeaderColumns[f"ResearchInt{i}"] for i in range(1, 4)]
+    scholInt = [ingest.scholRegHeaderColumns[f"ResearchInt{i}"] for i in range(1, 4)]
+    fac = blank("Faculty_Registration", 3, facInt + [col + 1 for col in facInt])[ingest.facRegHeaderColumns["email"]]
+    schols = [blank("Scholar_Registration", row, scholInt + [col + 1 for col in scholInt])[
+        ingest.scholRegHeaderColumns["email"]] for row in (1, 2)]
+    choiceRow = blank("Faculty_Choices", 5, ingest.facChoiceColumns["Choices"][:1])
+    chooser = choiceRow[ingest.facChoiceColumns["email"]]
+    keptNames = [choiceRow[col] for col in ingest.facChoiceColumns["Choices"] if choiceRow[col]]
+
+    inputs = load_event(dataDir)
+    fac, schols, chooser = fac.lower(), [schol.lower() for schol in schols], chooser.lower()
+    assert inputs["Faculty"][fac][3:] == [0]
+    for schol in schols:
+        assert inputs["Scholars"][schol][1:] == [0]
+    assert "" not in inputs["registry"].interests.ids and "nan" not in inputs["registry"].interests.ids
+
+    # no interest is shared, so there is no affinity among the people who left the interests blank
+    affinity = inputs["affinity"]
+    for schol in schols:
+        assert affinity.score(fac, schol) == 0 and affinity.score(fac, schol, backup=True) == 0
+
+    # the blanked first choice is skipped and the others are still matched to scholars
+    assert len(keptNames) == len(ingest.facChoiceColumns["Choices"]) - 1
+    kept = {inputs["scholN2E"][name.lower().replace(" ", "")] for name in keptNames}
+    assert set(inputs["FacChoices"][chooser]) == kept
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the per-phase metrics (instrument.py): the JSON lines add up to the in-memory totals, including the totals
+merged from worker processes, so a --metrics file has the scheduling passes whether or not the tries ran on workers.
+"""
+
+import json
+
+import pytest
+
+from conftest import run_schedule
+from instrument import Metrics
+from prune import PASSES
+
+
+def read_records(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+# Sum the records of a --metrics file per phase: (seconds, runs, counters)
+def file_totals(records):
+    seconds, runs, counters = {}, {}, {}
+    for record in records:
+        phase = record["phase"]
+        seconds[phase] = seconds.get(phase, 0.0) + record["seconds"]
+        runs[phase] = runs.get(phase, 0) + record.get("runs", 1)
+        mine = counters.setdefault(phase, {})
+        for name, value in record.items():
+            if name not in ("time", "phase", "seconds", "runs"):
+                mine[name] = mine.get(name, 0) + value
+    return seconds, runs, counters
+
+
+def test_merged_totals_are_written(tmp_path):
+    path = str(tmp_path / "metrics.jsonl")
+    metrics = Metrics(path)
+    metrics.record("FC pass", 0.5, attempts=3)
+    worker = Metrics()
+    worker.record("FC pass", 0.25, attempts=2, failures=1)
+    worker.record("FC pass", 0.25, attempts=4)
+    worker.record("SC pass", 1.0, attempts=1)
+    metrics.merge(worker.totals())
+    metrics.close()
+
+    records = read_records(path)
+    assert len(records) == 3
+    assert records[1]["runs"] == 2 and records[1]["attempts"] == 6
+    seconds, runs, counters = file_totals(records)
+    assert seconds == pytest.approx(metrics.seconds)
+    assert runs == metrics.runs
+    assert counters == metrics.counters
+
+
+# The passes of the tries are in the file with one worker (one record per pass) and with two (one per pass and round)
+@pytest.mark.parametrize("nWorkers", [1, 2])
+def test_metrics_file_has_the_passes(event, tmp_path, nWorkers):
+    path = str(tmp_path / "metrics.jsonl")
+    result = run_schedule(event, str(tmp_path / "OUT"), "--workers", nWorkers, "--max-tries", 4, "--metrics", path,
+                          "--summary")
+    assert result.returncode == 0, result.stdout + result.stderr
+    seconds, runs, counters = file_totals(read_records(path))
+    for phase in PASSES:
+        assert runs.get(phase, 0) >= 1, f"no {phase} records"
+        assert runs[phase] == runs[PASSES[0]]
+    # the summary table printed at the end has the same runs as the file
+    rows = [line.split() for line in result.stdout.splitlines() if line.startswith(PASSES[0] + " ")]
+    assert len(rows) == 1 and int(rows[0][2]) == runs[PASSES[0]]
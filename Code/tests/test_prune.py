@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the bounds for abandoning greedy tries (prune.py): without the local search, the people certain to end a
+try short after any pass never outnumber the people that try really ends with short, and the floor counts exactly
+the people short of usable slots or possible partners.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+import scheduler
+from affinity import AffinityMatrix
+from conftest import make_model
+from scheduler import ScheduleModel, build_schedule
+from slotgrid import uniform_grid
+from slots import SlotState
+
+
+# Run each try to completion, recording certain_short at every pass boundary instead of abandoning, and compare with
+# the try's final deficit: the bound must never claim more people short than the same try ends with.
+@pytest.mark.parametrize("minInt", [3, 5, 7])
+def test_certain_short_is_sound(inputs, monkeypatch, minInt):
+    model = make_model(inputs, minInt=minInt, localSearch=False)
+    bound = model.try_bound()
+    bounds = []
+
+    def record(state, model, done, abortAbove, tryStart, report, metrics):
+        bounds.append(bound.certain_short(state, model, done))
+        return False
+
+    monkeypatch.setattr(scheduler, "abandon", record)
+    for seed in range(4):
+        bounds.clear()
+        state, _ = build_schedule(model, random.Random(seed), report=False)
+        assert len(bounds) == 4
+        assert bound.floor <= max(bounds) <= state.stats.deficit()
+
+
+# Faculty A and B, scholars X, Y and Z, four slots and a minimum of two. X has a positive affinity with B only, and Z
+# with A only but also chose B, so X is the one person short of partners. Split into two sessions of two slots capped
+# at one interview each, A (available in the first session only) is also short of usable slots.
+def test_floor_hand_built():
+    Faculty = {"A": None, "B": None}
+    Scholars = {"X": None, "Y": None, "Z": None}
+    FacAvail = {"A": [1, 1, 0, 0], "B": [1, 1, 1, 1]}
+    inUni = np.array([[0, 2, 0], [1, 0, 0]], dtype=np.int16)
+    backup = np.array([[0, 0, 1], [0, 3, 0]], dtype=np.int16)
+    affinity = AffinityMatrix(["A", "B"], ["X", "Y", "Z"], inUni, backup)
+
+    for grid, facFloor in ((None, set()), (uniform_grid(2, 2, 1), {"A"})):
+        model = ScheduleModel(Faculty, Scholars, FacAvail, {}, {}, {"Z": ["B"]}, {"B": ["Z"]}, {}, affinity, None,
+                              4, 2, 2, grid=grid)
+        bound = model.try_bound()
+        assert bound.facPartners == {"A": 2, "B": 3}
+        assert bound.scholPartners == {"X": 1, "Y": 2, "Z": 2}
+        assert bound.facFloor == facFloor and bound.scholFloor == {"X"}
+        assert bound.floor == len(facFloor) + 1
+
+        # before anything is scheduled, the people certain to end short are exactly the floor
+        state = SlotState(Faculty, Scholars, FacAvail, {}, 4, grid=grid, MINFacInt=2, MINScholInt=2)
+        assert bound.certain_short(state, model, 0) == bound.floor
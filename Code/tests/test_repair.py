@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the incremental repair: a schedule is published, people cancel, and the repaired schedule drops their
+interviews while everyone else keeps theirs apart from the interviews the repair reports as moved.
+"""
+
+import os
+import random
+from types import SimpleNamespace
+
+import pandas as pd
+
+from conftest import check_consistent, make_model
+from repair import load_published, repair_schedule
+from scheduler import ScheduleModel, build_schedule
+from slots import SlotState
+
+
+# Write the faculty schedule the way createSchedule.py publishes it: names on FacultySchedule, reasons on AssignmentReasons
+def publish(state, inputs, path):
+    facultyEMAILtoNAME = inputs["facultyEMAILtoNAME"]
+    names = []
+    whys = []
+    for fac in sorted(state.FACsched, key=lambda x: facultyEMAILtoNAME[x]):
+        slots = state.FACsched[fac]
+        names.append([facultyEMAILtoNAME[fac]] + ["NA" if s in ("", "NA") else inputs["scholE2N"][s] for s in slots])
+        whys.append([facultyEMAILtoNAME[fac]] + ["NA" if s in ("", "NA") else w for s, w in zip(slots, state.FACschedWhy[fac])])
+    columns = ["FacultyName"] + [f"Slot {t}" for t in range(state.MAXInt)]
+    with pd.ExcelWriter(path, engine="xlsxwriter") as writer:
+        pd.DataFrame(names, columns=columns).to_excel(writer, index=False, sheet_name="FacultySchedule")
+        pd.DataFrame(whys, columns=columns).to_excel(writer, index=False, sheet_name="AssignmentReasons")
+
+
+def interviews(state):
+    return {(fac, schol, t) for fac, slots in state.FACsched.items() for t, schol in enumerate(slots)
+            if schol not in ("", "NA")}
+
+
+def test_repair_after_cancellations(inputs, tmp_path):
+    model = make_model(inputs)
+    state, _ = build_schedule(model, random.Random(5), report=False)
+    before = interviews(state)
+    path = str(tmp_path / "CompleteFacultySchedule.xlsx")
+    publish(state, inputs, path)
+
+    # one faculty member and two scholars who all had interviews cancel late
+    lostFac = max(state.nFACsched, key=lambda x: state.nFACsched[x])
+    lostSchols = sorted(s for s in state.nSCHOLsched if state.nSCHOLsched[s] and lostFac not in state.SCHOLsched[s])[:2]
+    facCancel = dict(inputs["facCancel"], **{lostFac: 1})
+    Scholars = {s: v for s, v in inputs["Scholars"].items() if s not in lostSchols}
+    late = dict(inputs, facCancel=facCancel, Scholars=Scholars)
+    lateModel = make_model(late)
+
+    repaired, dropped, lost = load_published(path, lateModel, inputs["facultyEMAILtoNAME"], inputs["scholE2N"])
+    gone = {(f, s, t) for f, s, t in before if f == lostFac or s in lostSchols}
+    assert len(dropped) == len(gone)
+    assert interviews(repaired) == before - gone
+    for person in lost:
+        assert sum(person in (f, s) for f, s, t in gone) == lost[person]
+
+    added, moved = repair_schedule(repaired, lateModel, lost, random.Random(5))
+    check_consistent(repaired, lateModel)
+    after = interviews(repaired)
+    for fac, schol, t in after:
+        assert fac != lostFac and schol not in lostSchols
+
+    # everyone else's interviews stay where they were unless the repair reports them moved, and the rest are new
+    movedTo = {}
+    for fac, schol, oldSlot, newSlot in moved:
+        assert (fac, schol, oldSlot) in before - gone or (fac, schol) in {(f, s) for f, s, t in added}
+        movedTo[fac, schol] = newSlot
+    kept = {(fac, schol, movedTo.get((fac, schol), t)) for fac, schol, t in before - gone}
+    assert kept <= after
+    assert {(fac, schol) for fac, schol, t in after - kept} == {(fac, schol) for fac, schol, t in added}
+    assert len(after) == len(kept) + len(added)
+
+
+# Faculty F lost an interview, and the scholar S who also lost one picks F during the scholar pass. F's goal is one
+# more than F had after the drop, so the faculty pass must not then add a second interview for F (a goal taken after
+# the scholar pass would).
+def test_repair_goals_from_counts_before_repair():
+    Faculty = {"F": None}
+    Scholars = {"S": None, "T": None, "U": None}
+    FacAvail = {"F": [1, 1, 1, 1]}
+    candidates = SimpleNamespace(FS={"F": ["T"]}, FSbk={"F": []}, SF={s: [] for s in Scholars},
+                                 SFbk={s: [] for s in Scholars})
+    model = ScheduleModel(Faculty, Scholars, FacAvail, {}, {}, {"S": ["F"]}, {"F": ["S"]}, {}, None, candidates,
+                          4, 0, 0)
+    state = SlotState(Faculty, Scholars, FacAvail, {}, 4)
+    state.assign("F", "U", 0, "RA")
+    lost = {"F": 1, "S": 1}
+
+    added, moved = repair_schedule(state, model, lost, random.Random(0))
+    assert sorted((fac, schol) for fac, schol, t in added) == [("F", "S")]
+    assert state.nFACsched["F"] == 2 and state.nSCHOLsched["T"] == 0
+    assert moved == []
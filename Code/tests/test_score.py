@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the vectorized schedule metrics (score.py) against a plain loop over the slot states, on a stack of
+schedules that includes an empty one and ones without any RA interview, in a grid of two sessions.
+"""
+
+import random
+
+import numpy as np
+import pytest
+
+from conftest import make_model
+from scheduler import build_schedule
+from score import ScheduleScorer
+from slotgrid import uniform_grid
+from slots import SlotState
+
+
+def gini(counts):
+    n = len(counts)
+    total = sum(counts)
+    if n == 0 or total == 0:
+        return 0.0
+    return sum(abs(a - b) for a in counts for b in counts) / (2 * n * total)
+
+
+# Open slots between a person's first and last interview of each session
+def gaps(row, isOpen, sessions):
+    total = 0
+    for a, b in sessions:
+        booked = [t for t in range(a, b) if row[t] not in ("", "NA")]
+        if booked:
+            total += sum(1 for t in range(booked[0], booked[-1] + 1) if isOpen(row[t]))
+    return total
+
+
+def brute_force(state, model, scorer):
+    affinity = model.affinity
+    faculty = scorer.faculty
+    booked = [(fac, schol, state.FACschedWhy[fac][t]) for fac in faculty for t, schol in enumerate(state.FACsched[fac])
+              if schol not in ("", "NA")]
+    facCount = [state.nFACsched[fac] for fac in faculty]
+    scholCount = [state.nSCHOLsched[schol] for schol in model.Scholars]
+
+    def rank(choices, person, other):
+        chosen = choices.get(person, [])
+        return chosen.index(other) if other in chosen else -1
+
+    facChoices = [0] * scorer.nRanks
+    scholChoices = [0] * scorer.nRanks
+    chosen = reciprocal = 0
+    raValues = []
+    inUni = backup = 0
+    for fac, schol, why in booked:
+        facRank, scholRank = rank(model.FacChoices, fac, schol), rank(model.ScholChoices, schol, fac)
+        if facRank >= 0:
+            facChoices[facRank] += 1
+        if scholRank >= 0:
+            scholChoices[scholRank] += 1
+        chosen += facRank >= 0 or scholRank >= 0
+        reciprocal += facRank >= 0 and scholRank >= 0
+        if why == "RA":
+            raValues.append(affinity.score(fac, schol) + affinity.score(fac, schol, backup=True))
+        inUni += affinity.score(fac, schol) > 0
+        backup += affinity.score(fac, schol, backup=True) > 0
+    nMutual = sum(1 for fac in faculty for schol in model.FacChoices.get(fac, [])
+                  if schol in model.Scholars and fac in model.ScholChoices.get(schol, []))
+    return {
+        "deficit": sum(n < model.MINFacInt for n in facCount) + sum(n < model.MINScholInt for n in scholCount),
+        "interviews": len(booked),
+        "facChoices": facChoices,
+        "scholChoices": scholChoices,
+        "chosen": chosen,
+        "reciprocal": reciprocal,
+        "reciprocalShare": reciprocal / nMutual,
+        "raAffinityMean": np.mean(raValues) if raValues else np.nan,
+        "raAffinityMin": min(raValues) if raValues else np.nan,
+        "inUniShare": inUni / len(booked) if booked else 0.0,
+        "backupShare": backup / len(booked) if booked else 0.0,
+        "facGini": gini(facCount),
+        "scholGini": gini(scholCount),
+        "facGaps": sum(gaps(state.FACsched[fac], lambda x: x == "", scorer.sessions) for fac in faculty),
+        "scholGaps": sum(gaps(state.SCHOLsched[schol], lambda x: x == "", scorer.sessions) for schol in model.Scholars),
+    }
+
+
+# The RA interviews of a schedule in encoded order (faculty rows, then slots), with their affinity
+def ra_interviews(state, model, scorer):
+    affinity = model.affinity
+    return [(fac, schol, t, affinity.score(fac, schol) + affinity.score(fac, schol, backup=True))
+            for fac in scorer.faculty for t, schol in enumerate(state.FACsched[fac])
+            if schol not in ("", "NA") and state.FACschedWhy[fac][t] == "RA"]
+
+
+# Greedy schedules; one with no RA interviews left; one with only two, the last of them the lowest; and an empty
+# schedule. They are stacked so that schedules without RA interviews come between and after the others.
+@pytest.fixture(scope="module")
+def schedules(inputs):
+    model = make_model(dict(inputs, slotGrid=uniform_grid(2, 4)))
+    scorer = ScheduleScorer(model)
+    states = []
+    for seed in range(5):
+        state, _ = build_schedule(model, random.Random(seed), report=False)
+        states.append(state)
+    noRA, lastLowest = states[3], states[4]
+    for fac, schol, t, value in ra_interviews(noRA, model, scorer):
+        noRA.unassign(fac, schol, t)
+    raLeft = ra_interviews(lastLowest, model, scorer)
+    high = max(range(len(raLeft) - 1), key=lambda k: raLeft[k][3])
+    low = min(range(high + 1, len(raLeft)), key=lambda k: raLeft[k][3])
+    assert raLeft[low][3] < raLeft[high][3]
+    for k, (fac, schol, t, value) in enumerate(raLeft):
+        if k != high and k != low:
+            lastLowest.unassign(fac, schol, t)
+    empty = SlotState(model.Faculty, model.Scholars, model.FacAvail, model.facCancel, model.MAXInt, grid=model.grid,
+                      MINFacInt=model.MINFacInt, MINScholInt=model.MINScholInt)
+    return model, [states[0], noRA, states[1], empty, states[2], lastLowest, noRA, empty]
+
+
+def test_score_matches_brute_force(schedules):
+    model, states = schedules
+    scorer = ScheduleScorer(model)
+    assert scorer.nMutual > 0 and len(scorer.sessions) == 2
+    encoded = [scorer.encode(state) for state in states]
+    stacked = scorer.score(np.stack([e[0] for e in encoded]), np.stack([e[1] for e in encoded]))
+    for k, state in enumerate(states):
+        expected = brute_force(state, model, scorer)
+        single = scorer.score(*encoded[k])
+        for name, value in expected.items():
+            np.testing.assert_allclose(stacked[name][k], value, err_msg=f"{name} of schedule {k}")
+            np.testing.assert_allclose(single[name], value, err_msg=f"{name} of schedule {k} alone")
+
+
+def test_rank_matches_sorting(schedules):
+    model, states = schedules
+    scorer = ScheduleScorer(model)
+    encoded = [scorer.encode(state) for state in states]
+    scores = scorer.score(np.stack([e[0] for e in encoded]), np.stack([e[1] for e in encoded]))
+    expected = [brute_force(state, model, scorer) for state in states]
+    order = sorted(range(len(states)), key=lambda k: (expected[k]["deficit"], -expected[k]["interviews"],
+                                                      -expected[k]["chosen"]))
+    assert scorer.rank(scores).tolist() == order
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of sharded scheduling (shard.py): the clusters split the event without sharing anyone, their schedules merge
+without double booking anyone, and a sharded try is the same for a fixed seed however many worker processes run it.
+"""
+
+import shard
+from conftest import check_consistent, check_slot_state, make_model
+from shard import ShardPlan, sharded_schedule
+
+
+def interviews(state):
+    return {(fac, schol, t) for fac, slots in state.FACsched.items() for t, schol in enumerate(slots)
+            if schol not in ("", "NA")}
+
+
+def test_plan_splits_everyone_once(inputs):
+    model = make_model(inputs)
+    plan = ShardPlan(model, inputs["ScholarUni"], 3)
+    assert len(plan) > 1
+    assert sorted(fac for faculty in plan.faculty for fac in faculty) == sorted(
+        fac for fac in model.Faculty if fac not in model.facCancel)
+    assert sorted(schol for scholars in plan.scholars for schol in scholars) == sorted(model.Scholars)
+    for k, shardModel in enumerate(plan.models):
+        assert set(shardModel.Scholars) == set(plan.scholars[k])
+        for fac in plan.faculty[k]:
+            assert model.Faculty[fac][2] in plan.universities[k]
+            assert all(plan.scholShard[schol] == k for schol in shardModel.FacChoices.get(fac, []))
+
+
+# Without the local search the reconciliation only adds interviews, so every cluster's schedule must be in the merged
+# one as it is. The clusters share nobody, so nobody can be booked twice by two of them.
+def test_merge_keeps_every_cluster(inputs, monkeypatch):
+    model = make_model(inputs, localSearch=False)
+    plan = ShardPlan(model, inputs["ScholarUni"], 3)
+    scheduleShard = shard._schedule_shard
+    shardStates = []
+
+    def keep(k, seed, nTries):
+        result = scheduleShard(k, seed, nTries)
+        shardStates.append(result[1])
+        return result
+
+    monkeypatch.setattr(shard, "_schedule_shard", keep)
+    state, nrecipChoice = sharded_schedule(model, plan, 1, seed=11, report=False)
+    assert len(shardStates) == len(plan)
+    check_consistent(state, model)
+    check_slot_state(state)
+
+    merged = interviews(state)
+    seen = set()
+    for shardState in shardStates:
+        booked = interviews(shardState)
+        people = {fac for fac, schol, t in booked} | {schol for fac, schol, t in booked}
+        assert not people & seen
+        seen |= people
+        assert booked <= merged
+    for fac, n in state.nFACsched.items():
+        assert n == sum(1 for f, schol, t in merged if f == fac)
+    for schol, n in state.nSCHOLsched.items():
+        assert n == sum(1 for fac, s, t in merged if s == schol)
+
+
+def test_sharded_schedule_is_seeded(inputs):
+    model = make_model(inputs)
+    plan = ShardPlan(model, inputs["ScholarUni"], 3)
+    runs = [sharded_schedule(model, plan, nWorkers, seed=11, report=False) for nWorkers in (1, 1, 2, 2)]
+    for state, nrecipChoice in runs[1:]:
+        check_consistent(state, model)
+        assert state.FACsched == runs[0][0].FACsched
+        assert state.FACschedWhy == runs[0][0].FACschedWhy
+        assert nrecipChoice == runs[0][1]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Tests of the session capacities in the slot state (slots.py): reaching a session's capacity closes the rest of that
+session for the person, dropping below it reopens exactly their empty slots there, and uncapped sessions never close.
+"""
+
+import random
+
+from conftest import check_slot_state
+from slotgrid import SlotGrid
+from slots import SlotState
+
+
+def test_count_session_closes_and_reopens():
+    # Mon holds at most two interviews per person, Tue has no limit; G is not available for Mon's third slot
+    grid = SlotGrid([{"name": "Mon", "times": ["9:00", "9:15", "9:30"], "capacity": 2},
+                     {"name": "Tue", "times": ["9:00", "9:15", "9:30"], "capacity": None}], {})
+    Faculty = {"F": None, "G": None}
+    Scholars = {"S1": None, "S2": None, "S3": None}
+    FacAvail = {"F": [1] * 6, "G": [1, 1, 0, 1, 1, 1]}
+    state = SlotState(Faculty, Scholars, FacAvail, {}, 6, grid=grid)
+    check_slot_state(state)
+
+    # filling Mon for F closes its last Mon slot for F only
+    state.assign("F", "S1", 0, "FC")
+    assert state.facFree["F"] == 0b111110
+    state.assign("F", "S2", 1, "SC")
+    assert state.facFree["F"] == 0b111000
+    assert state.facSessions["F"] == [2, 0]
+    assert state.scholFree["S1"] == 0b111110 and state.scholFree["S2"] == 0b111101
+    assert state.facOpen[:3] == [1, 1, 0]  # G is not available for slot 2, and F's session is full
+    check_slot_state(state)
+
+    # so a placement for F can only go to Tue, which never closes
+    assert state.place("F", "S3", "RA", random.Random(0)) >= 3
+    state.assign("F", "S1", next(t for t in (3, 4, 5) if state.FACsched["F"][t] == ""), "RA")
+    assert state.facFree["F"].bit_count() == 1
+    check_slot_state(state)
+
+    # S1 fills Mon with G: S1's last Mon slot closes, G keeps its open one
+    state.assign("G", "S1", 1, "RA")
+    assert state.scholFree["S1"] & 0b111 == 0
+    assert state.facFree["G"] & 0b111 == 0b001
+    check_slot_state(state)
+
+    # freeing a Mon interview reopens the person's empty Mon slots, but not one they are unavailable for
+    state.unassign("F", "S2", 1)
+    assert state.facFree["F"] & 0b111 == 0b110
+    assert state.facSessions["F"] == [1, 0]  # Tue is not counted
+    check_slot_state(state)
+    state.assign("G", "S2", 0, "RA")
+    assert state.facFree["G"] & 0b111 == 0
+    state.unassign("G", "S1", 1)
+    assert state.facFree["G"] & 0b111 == 0b010  # slot 2 stays NA
+    assert state.FACsched["G"][2] == "NA"
+    assert state.scholFree["S1"] & 0b111 == 0b110
+    check_slot_state(state)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+NOTES:
+Smoke tests over synthetic events (see conftest.py): one seeded greedy try and one milp solve of a tiny event. They
+check that the pieces run end to end and leave a consistent schedule, not how good the schedule is; the tests of
+each feature are in test_<module>.py.
+"""
+
+import random
+
+import pytest
+
+from conftest import check_consistent, make_model
+from scheduler import build_schedule
+from solver import solve_milp
+
+
+def test_greedy_try_is_seeded(inputs):
+    model = make_model(inputs)
+    state, nrecipChoice = build_schedule(model, random.Random(7), report=False)
+    check_consistent(state, model)
+    assert state.stats.interviews > 0
+
+    again, nrecipAgain = build_schedule(model, random.Random(7), report=False)
+    assert again.FACsched == state.FACsched
+    assert again.FACschedWhy == state.FACschedWhy
+    assert nrecipAgain == nrecipChoice
+
+
+def test_milp_tiny_event(tiny_inputs):
+    pytest.importorskip("scipy")
+    model = make_model(tiny_inputs, minInt=2)
+    state, nrecipChoice = solve_milp(model, timeLimit=60)
+    check_consistent(state, model)
+    assert state.stats.interviews > 0
+
+    # by default only pairs with a choice or some shared interest are scheduled
+    affinity = model.affinity
+    for fac, slots in state.FACsched.items():
+        for schol in slots:
+            if schol in ("", "NA"):
+                continue
+            i, j = affinity.facIndex[fac], affinity.scholIndex[schol]
+            chosen = schol in model.FacChoices.get(fac, []) or fac in model.ScholChoices.get(schol, [])
+            assert chosen or affinity.inUni[i, j] > 0 or affinity.backup[i, j] > 0